@@ -1,19 +1,18 @@
 from fastapi import APIRouter, Depends
 import logging
-import time
 from app.core.validators import validate_request, ASK_FOURAY_RULES
 from app.schemas import FourayRequest, FourayResponse
 from app.api.deps import require_auth
 from app.services import get_google_drive_service_for_system, ServiceFactory
 from app.core.exceptions import BadRequestException
-from fastapi.responses import StreamingResponse
+from app.utils import sse_response
 
 router = APIRouter()
 
 
 @router.post("/fouray", response_model=FourayResponse, dependencies=[Depends(require_auth)],
              description="Handles Fouray application requests", summary="Process Fouray request")
-async def ask_fouray_app(request: FourayRequest):
+async def ask_fouray_app(request: FourayRequest, drive_service=Depends(get_google_drive_service_for_system)):
     additional_data = request.additional_data or {}
 
     try:
@@ -26,22 +25,11 @@ async def ask_fouray_app(request: FourayRequest):
         if extra_fields:
             raise BadRequestException(f"Invalid fields for {request.request_type}: {', '.join(extra_fields)}")
 
-        start_time = time.time()
-        drive_service = await get_google_drive_service_for_system()
-        end_time = time.time()
-        time_taken = end_time - start_time
-        print(f"Time taken to get drive service: {time_taken:.2f} seconds")
-
         service = ServiceFactory.get_service(request.request_type)
 
         if "streaming" in additional_data and additional_data["streaming"]:
-            # ask the fouray model
-            async def event_stream():
-                async for chunk in service.stream_process(drive_service, **additional_data):
-                    yield f"data: {chunk}\n\n"  # Server-Sent Events format Working
-
-            return StreamingResponse(event_stream(), media_type="text/event-stream",
-                                     headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+            # ask the fouray model; the SSE writer frames each chunk once
+            return sse_response(service.stream_process(drive_service, **additional_data), request.request_type)
         else:
             # ask the fouray model
             response = await service.process(drive_service, **additional_data)
@@ -1,11 +1,10 @@
 import logging
-import time
 from fastapi import APIRouter, Depends
 from app.api.deps import require_auth
 from app.core.exceptions import BadRequestException, InternalServerErrorException
 from app.core.validators import validate_request, TRANSLATE_RULES
 from app.schemas import TranslateRequest, TranslateResponse
-from fastapi.responses import StreamingResponse
+from app.utils import sse_response
 from app.services import get_google_drive_service_for_system, ServiceFactory
 from app.services.translate_agent_service import translate_content_stream
 
@@ -15,7 +14,7 @@ router = APIRouter()
 @router.post("/content", response_model=TranslateResponse,
              dependencies=[Depends(require_auth)],
              description="Translate content to given language and region context", summary="Translate content")
-async def translate_content(request: TranslateRequest):
+async def translate_content(request: TranslateRequest, drive_service=Depends(get_google_drive_service_for_system)):
     additional_data = request.additional_data or {}
 
     try:
@@ -28,19 +27,8 @@ async def translate_content(request: TranslateRequest):
         if extra_fields:
             raise BadRequestException(f"Invalid fields for {request.request_type}: {', '.join(extra_fields)}")
 
-        start_time = time.time()
-        drive_service = await get_google_drive_service_for_system()
-        end_time = time.time()
-        time_taken = end_time - start_time
-        print(f"Time taken to get drive service: {time_taken:.2f} seconds")
-
-        # ask the fouray model
-        async def event_stream():
-            async for chunk in translate_content_stream(drive_service, **additional_data):
-                yield f"data: {chunk}\n\n"  # Server-Sent Events format Working
-
-        return StreamingResponse(event_stream(), media_type="text/event-stream",
-                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        # ask the fouray model; the SSE writer frames each chunk once
+        return sse_response(translate_content_stream(drive_service, **additional_data), "translate")
 
     except Exception as e:
         logging.error(f"Error in ask_fouray_app: {str(e)}")
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
+from typing import Dict
 import os
 
 
@@ -17,15 +18,64 @@ class Settings(BaseSettings):
     DB_STR: str = Field(..., description="Database connection string")
     SYNC_DB_STR: str = Field(..., description="Sync Database connection string")
     SCHEDULER_INTERVAL_HOURS: int = Field(48, description="Scheduler interval in hours")
+    DRIVE_INDEX_TTL_SECONDS: int = Field(86400, ge=1, description="Full Drive folder index rebuild interval")
+    DRIVE_CHANGES_POLL_SECONDS: int = Field(60, ge=0, description="Min interval between Drive changes feed polls")
+    DRIVE_SYNC_CONCURRENCY: int = Field(4, ge=1, description="Concurrent Drive downloads during template sync")
     INSTRUCTIONS_AND_COMMANDS_FOLDER_NAME: str = Field(..., description="Instructions and commands folder name")
     INSTRUCTIONS_FILE_NAME: str = Field(..., description="Instructions file name")
     COMMANDS_FILE_NAME: str = Field(..., description="Commands file name")
     OPENAI_MODEL: str = Field(..., description="OpenAI model")
     OPENAI_LOWER_MODEL: str = Field(..., description="OpenAI lower model")
+    OPENAI_HTTP2: bool = Field(True, description="Use HTTP/2 for OpenAI calls when the h2 package is installed")
+    OPENAI_MAX_CONNECTIONS: int = Field(200, ge=1, description="Max pooled connections to the OpenAI API")
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = Field(50, ge=0, description="Max idle keep-alive connections to the OpenAI API")
+    OPENAI_DEFAULT_MODEL_CONCURRENCY: int = Field(32, ge=1, description="Max in-flight calls per OpenAI model")
+    OPENAI_MODEL_CONCURRENCY: Dict[str, int] = Field({}, description='Per-model overrides, e.g. {"gpt-4o": 64}')
     NUM_HISTORY_RESPONSES: int = Field(5, description="Number of history responses")
+    STREAM_WORKER_THREADS: int = Field(64, ge=1, description="Worker threads driving blocking agent streams")
+    AGENT_WORKER_THREADS: int = Field(128, ge=1, description="Worker threads running non-streaming agents that do sync I/O (storage, tools)")
+    STREAM_QUEUE_SIZE: int = Field(64, ge=1, description="Chunks buffered per stream before the worker blocks")
+    SSE_FLUSH_INTERVAL_MS: int = Field(25, ge=0, description="Max time SSE events are coalesced before a flush (0 = flush each event)")
+    SSE_FLUSH_BYTES: int = Field(16384, ge=1, description="Buffered SSE bytes that force a flush")
+    SSE_HEARTBEAT_SECONDS: float = Field(15, gt=0, description="Idle time before an SSE keep-alive comment")
+    MEMORY_PROFILING_ENABLED: bool = Field(False, description="Record per-request memory deltas (tracemalloc, RSS)")
+    MEMORY_PROFILING_TRACE_FRAMES: int = Field(1, ge=1, description="Stack frames kept per tracemalloc allocation")
+    MEMORY_PROFILING_WATCH_TYPES: str = Field("", description="Comma-separated type names to count per request, e.g. Agent,Session")
+    AUDIO_TRANSCRIPTION_MODEL: str = Field("whisper-1", description="OpenAI speech-to-text model")
+    AUDIO_SEGMENT_SECONDS: int = Field(600, ge=30, description="Length of each audio segment sent for transcription")
+    AUDIO_SEGMENT_OVERLAP_SECONDS: int = Field(5, ge=0, description="Overlap between consecutive audio segments")
+    AUDIO_TRANSCRIBE_CONCURRENCY: int = Field(4, ge=1, description="Audio segments extracted and transcribed concurrently per file")
+    AUDIO_MAX_UPLOAD_BYTES: int = Field(24 * 1024 * 1024, ge=1, description="Largest file sent to transcription in one request")
+    AUDIO_SUMMARY_CHUNK_CHARS: int = Field(12000, ge=1000, description="Transcript characters summarized per map step")
     VECTOR_SEARCH_LIMIT: int = Field(40, description="Vector search limit")
+    TENANT_CACHE_MAX_ENTRIES: int = Field(256, ge=1, description="Max cached tenant storage/memory/vector DB objects")
+    TENANT_CACHE_TTL_SECONDS: int = Field(3600, ge=1, description="Idle lifetime of cached tenant resources")
+    SYNC_DB_POOL_SIZE: int = Field(10, ge=1, description="Shared sync engine pool size")
+    SYNC_DB_MAX_OVERFLOW: int = Field(20, ge=0, description="Shared sync engine max overflow")
+    VECTOR_UPSERT_CONCURRENCY: int = Field(4, ge=1, description="Concurrent embedding/upsert batches per ingestion")
+    VECTOR_INDEX_TYPE: str = Field("hnsw", description="ANN index type for tenant vector tables (hnsw or ivfflat)")
+    VECTOR_INDEX_MIN_ROWS: int = Field(1000, ge=0, description="Minimum rows before a tenant table gets an ANN index")
+    VECTOR_HNSW_EF_SEARCH: int = Field(100, ge=1, description="Default HNSW ef_search for vector searches")
+    VECTOR_IVFFLAT_PROBES: int = Field(10, ge=1, description="Default IVFFlat probes for vector searches")
+    VECTOR_INDEX_TUNING: Dict[str, Dict[str, int]] = Field({}, description='Per-tenant overrides, e.g. {"legal_gv": {"ef_search": 200}}')
+    VECTOR_INDEX_MAINTENANCE_INTERVAL_HOURS: int = Field(24, description="Vector index maintenance interval in hours")
     REDIS_URL: str = Field(..., description="Redis URL")
     CACHE_EXPIRY_SECONDS: int = Field(2629800, description="Cache expiry in seconds")
+    TEMPLATE_CACHE_TTL_SECONDS: int = Field(21600, ge=1, description="Max age of process-local prompt templates")
+    TEMPLATE_STALE_EXPIRY_SECONDS: int = Field(7776000, description="Expiry of stale template copies served while revalidating")
+    TEMPLATE_LOCK_TIMEOUT_SECONDS: float = Field(30, gt=0, description="Redis lock lifetime for a template reload")
+    TEMPLATE_LOCK_WAIT_SECONDS: float = Field(10, gt=0, description="Max wait on another worker's template reload")
+    EMBEDDING_CACHE_ENABLED: bool = Field(False, description="Share chunk embeddings across tenants through Redis")
+    EMBEDDING_CACHE_EXPIRY_SECONDS: int = Field(2629800, description="Embedding cache expiry in seconds")
+    QUERY_EMBEDDING_CACHE_ENABLED: bool = Field(True, description="Cache search query embeddings in-process")
+    QUERY_EMBEDDING_CACHE_REDIS_ENABLED: bool = Field(True, description="Also share query embeddings through Redis")
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES: int = Field(2048, ge=1, description="In-process query embedding cache size")
+    RERANKER: str = Field("cohere", description="Search reranker: cohere, local or none")
+    RERANK_MIN_CANDIDATES: int = Field(1, ge=0, description="Rerank only when a search returns more candidates than this")
+    RERANK_CACHE_ENABLED: bool = Field(True, description="Cache rerank results in-process")
+    RERANK_CACHE_REDIS_ENABLED: bool = Field(True, description="Also share cached rerank results through Redis")
+    RERANK_CACHE_MAX_ENTRIES: int = Field(1024, ge=1, description="In-process rerank cache size")
+    RERANK_CACHE_EXPIRY_SECONDS: int = Field(86400, description="Rerank cache expiry in seconds")
     PRODUCT_SECTIONS: str = Field(..., description="Product sections")
     ALLOWED_ORIGINS: str = Field(..., description="Allowed hosts")
     AGENT_CONFIG_FILE_NAME: str = Field(..., description="Agent config file name")
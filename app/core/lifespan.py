@@ -2,7 +2,10 @@ from contextlib import asynccontextmanager
 from app.db.session import async_engine
 from app.db.models.base import Base
 from app.scheduler import start_scheduler
-from app.utils import redis_client
+from app.services.drive_service import init_google_drive_service_for_system
+from app.services.storage_cache import tenant_registry
+from app.utils.agent_templates import agent_templates
+from app.utils import redis_client, template_cache, openai_client_pool, agent_manager
 
 
 @asynccontextmanager
@@ -14,12 +17,22 @@ async def lifespan(app):
         async with async_engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         await redis_client.connect_async()  # Ensure Redis is connected at startup
+        await template_cache.start()  # Listen for prompt template invalidations
+        try:
+            await init_google_drive_service_for_system()  # Build the shared Drive client once
+        except Exception as e:
+            print(f"❌ Error initializing Google Drive service: {str(e)}")
+        agent_templates.warmup()  # Build the per-request-type agent templates once
+        agent_manager.warmup()  # Build the vision/audio/query/webpage utility agents once
         await start_scheduler()  # Start the scheduler
         print("🔵 Starting up: Initializing DB Completed")
         yield  # Yield for app lifecycle
     finally:
         # Shutdown: close database connection
         print("🛑 Shutting down: Closing DB Connection")
+        await template_cache.stop()
+        await openai_client_pool.aclose()  # 🚀 Close pooled OpenAI connections
         await redis_client.close_async()  # 🚀 Close redis connection properly
         await async_engine.dispose()  # 🚀 Close connection properly
+        tenant_registry.close()  # 🚀 Dispose the shared sync engine used by tenant resources
         print("🛑 Shutting down: Closing DB Connection Completed")
@@ -1,6 +1,7 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from app.services.redis_service import update_redis_from_drive
+from app.services.vector_index_service import maintain_vector_indexes
 from app.core import settings
 
 scheduler = AsyncIOScheduler()
@@ -14,6 +15,14 @@ async def start_scheduler():
         coalesce=True,
         misfire_grace_time=settings.SCHEDULER_INTERVAL_HOURS,
     )
+    scheduler.add_job(
+        maintain_vector_indexes,
+        'interval',
+        hours=settings.VECTOR_INDEX_MAINTENANCE_INTERVAL_HOURS,
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=settings.VECTOR_INDEX_MAINTENANCE_INTERVAL_HOURS,
+    )
     try:
         scheduler.start()
     except Exception as e:
@@ -1,40 +1,864 @@
-from typing import Optional, Dict, Any, List
+import asyncio
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+from openai import AsyncOpenAI
 from phi.document import Document
+from phi.embedder.openai import OpenAIEmbedder
+from phi.vectordb.distance import Distance
 from phi.vectordb.pgvector import PgVector
-from sqlalchemy.sql.expression import bindparam, select, func
+from phi.vectordb.pgvector.index import Ivfflat, HNSW
+from phi.vectordb.search import SearchType
+from sqlalchemy import Connection, create_engine
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.expression import bindparam, select, func, update, desc, text
 from phi.utils.log import logger
 from hashlib import md5
 from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
 from datetime import datetime, timezone
+from app.utils.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from app.utils.rerank_cache import RerankCache
+
+
+@dataclass(frozen=True)
+class VectorSearchQuery:
+    """
+    Immutable per-call search parameters, so one cached CustomPgVector can serve concurrent searches.
+    Unset limit/filters fall back to the instance defaults.
+    """
+    query: str = ""
+    search_type: SearchType = SearchType.vector
+    limit: Optional[int] = None
+    filters: Optional[Dict[str, Any]] = None
+    vector_score_weight: float = 0.5
+    # Rerank policy: False skips the reranker, None/True rerank only above rerank_min_candidates results
+    rerank: Optional[bool] = None
+    rerank_min_candidates: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """
+    Lightweight search hit: only the columns callers read, never the embedding.
+    ``score`` is the similarity, text rank, hybrid score or rerank score (higher is better).
+    """
+    content: str
+    name: Optional[str] = None
+    meta_data: Optional[Dict[str, Any]] = None
+    score: Optional[float] = None
 
 
 class CustomPgVector(PgVector):
-    def __init__(self, *args, default_limit: int = 40, filters: Optional[Dict[str, Any]] = None, **kwargs):
+    def __init__(self, *args, default_limit: int = 40, filters: Optional[Dict[str, Any]] = None,
+                 upsert_concurrency: int = 4, embedding_cache: Optional[EmbeddingCache] = None,
+                 async_engine: Optional[AsyncEngine] = None, index_min_rows: int = 1000,
+                 rerank_min_candidates: int = 1, rerank_cache: Optional[RerankCache] = None,
+                 query_embedding_cache: Optional[QueryEmbeddingCache] = None, **kwargs):
         super().__init__(*args, **kwargs)
+        # phi's default HNSW() is one instance shared by every PgVector; copy it so tenant tuning stays per table
+        if self.vector_index is not None:
+            self.vector_index = self.vector_index.model_copy(deep=True)
+        self.index_min_rows = index_min_rows
+        self.rerank_min_candidates = rerank_min_candidates
+        self.rerank_cache = rerank_cache
+        self.query_embedding_cache = query_embedding_cache
         self.default_limit = default_limit
         self.filters_args = filters
+        self.upsert_concurrency = max(1, upsert_concurrency)
+        self.embedding_cache = embedding_cache
+        # Async sessions share the application's asyncpg pool instead of owning a sync engine per tenant
+        self.async_session = async_sessionmaker(bind=async_engine, expire_on_commit=False) if async_engine else None
+        self._async_embedding_client: Optional[AsyncOpenAI] = None
+        self._filters_index_ready = False
+
+    def _resolve_limit(self, limit: Optional[int]) -> int:
+        return limit if limit is not None else self.default_limit
+
+    def _resolve_filters(self, filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return filters if filters is not None else (self.filters_args or {})
 
-    def vector_search(self, query: str, limit: Optional[int] = None, filters: Optional[Dict[str, Any]] = None):
-        limit = self.default_limit
-        filters = self.filters_args or {}
-        docs = super().vector_search(query=query, limit=limit, filters=filters)
+    def run_query(self, search_query: VectorSearchQuery) -> List[Document]:
+        """
+        Run a search described by an immutable VectorSearchQuery without touching instance state.
+        """
+        if search_query.search_type == SearchType.vector:
+            return self.vector_search(query=search_query.query, limit=search_query.limit,
+                                      filters=search_query.filters, rerank=search_query.rerank,
+                                      rerank_min_candidates=search_query.rerank_min_candidates)
+        elif search_query.search_type == SearchType.keyword:
+            return self.keyword_search(query=search_query.query, limit=search_query.limit,
+                                       filters=search_query.filters)
+        elif search_query.search_type == SearchType.hybrid:
+            return self.hybrid_search(query=search_query.query, limit=search_query.limit,
+                                      filters=search_query.filters,
+                                      vector_score_weight=search_query.vector_score_weight)
+        logger.error(f"Invalid search type '{search_query.search_type}'.")
+        return []
+
+    def vector_search(self, query: str, limit: Optional[int] = None, filters: Optional[Dict[str, Any]] = None,
+                      rerank: Optional[bool] = None, rerank_min_candidates: Optional[int] = None) -> List[Document]:
+        limit = self._resolve_limit(limit)
+        filters = self._resolve_filters(filters)
+        try:
+            query_embedding = self._get_query_embedding(query)
+            if query_embedding is None:
+                logger.error(f"Error getting embedding for Query: {query}")
+                return []
+            stmt = self._vector_stmt(query_embedding, limit, filters, self._document_columns())
+            try:
+                with self.Session() as sess, sess.begin():
+                    self._set_index_search_params(sess)
+                    results = sess.execute(stmt).fetchall()
+            except Exception as e:
+                logger.error(f"Error performing semantic search: {e}")
+                logger.error("Table might not exist, creating for future use")
+                self.create()
+                return []
+            docs = [self._row_to_document(result) for result in results]
+            if self._should_rerank(len(docs), rerank, rerank_min_candidates):
+                docs = self._rerank_documents(query, docs)
+        except Exception as e:
+            logger.error(f"Error during vector search: {e}")
+            return []
         print(f"📄 {len(docs)} documents fetched from vector DB (vector_search)")
         return docs
 
     def search(self, query: str, limit: Optional[int] = None, filters: Optional[Dict[str, Any]] = None):
-        limit = self.default_limit
-        filters = self.filters_args or {}
-        docs = super().search(query=query, limit=limit, filters=filters)
+        # Agent knowledge searches always use the instance defaults set at construction time
+        docs = self.run_query(VectorSearchQuery(query=query, search_type=self.search_type,
+                                                limit=self.default_limit, filters=self._resolve_filters(None),
+                                                vector_score_weight=self.vector_score_weight))
         print(f"📄 {len(docs)} documents fetched from vector DB (search)")
         return docs
 
     def keyword_search(self, query: str, limit: Optional[int] = None, filters: Optional[Dict[str, Any]] = None):
-        limit = self.default_limit
-        filters = self.filters_args or {}
+        limit = self._resolve_limit(limit)
+        filters = self._resolve_filters(filters)
         docs = super().keyword_search(query=query, limit=limit, filters=filters)
         print(f"📄 {len(docs)} documents fetched from vector DB (search)")
         return docs
 
+    def hybrid_search(self, query: str, limit: Optional[int] = None, filters: Optional[Dict[str, Any]] = None,
+                      vector_score_weight: Optional[float] = None) -> List[Document]:
+        """
+        Hybrid search with the vector/text weight passed per call instead of read from the instance.
+        """
+        limit = self._resolve_limit(limit)
+        filters = self._resolve_filters(filters)
+        vector_score_weight = self.vector_score_weight if vector_score_weight is None else vector_score_weight
+        if not 0 <= vector_score_weight <= 1:
+            raise ValueError("vector_score_weight must be between 0 and 1")
+
+        try:
+            query_embedding = self._get_query_embedding(query)
+            if query_embedding is None:
+                logger.error(f"Error getting embedding for Query: {query}")
+                return []
+
+            stmt = self._hybrid_stmt(query, query_embedding, limit, filters, vector_score_weight)
+            logger.debug(f"Hybrid search query: {stmt}")
+            try:
+                with self.Session() as sess, sess.begin():
+                    self._set_index_search_params(sess)
+                    results = sess.execute(stmt).fetchall()
+            except Exception as e:
+                logger.error(f"Error performing hybrid search: {e}")
+                return []
+
+            docs = [self._row_to_document(result) for result in results]
+            print(f"📄 {len(docs)} documents fetched from vector DB (hybrid_search)")
+            return docs
+        except Exception as e:
+            logger.error(f"Error during hybrid search: {e}")
+            return []
+
+    def _hybrid_stmt(self, query: str, query_embedding: List[float], limit: int, filters: Optional[Dict[str, Any]],
+                     vector_score_weight: float, columns=None):
+        ts_vector = func.to_tsvector(self.content_language, self.table.c.content)
+        processed_query = self.enable_prefix_matching(query) if self.prefix_match else query
+        ts_query = func.websearch_to_tsquery(self.content_language, bindparam("query", value=processed_query))
+        text_rank = func.ts_rank_cd(ts_vector, ts_query)
+
+        if self.distance == Distance.l2:
+            vector_score = 1 / (1 + self.table.c.embedding.l2_distance(query_embedding))
+        elif self.distance == Distance.max_inner_product:
+            vector_score = (self.table.c.embedding.max_inner_product(query_embedding) + 1) / 2
+        else:
+            vector_score = 1 / (1 + self.table.c.embedding.cosine_distance(query_embedding))
+
+        hybrid_score = (vector_score_weight * vector_score) + ((1 - vector_score_weight) * text_rank)
+        stmt = select(*(columns or self._document_columns()), hybrid_score.label("score"))
+        if filters is not None:
+            stmt = stmt.where(self.table.c.filters.contains(filters))
+        return stmt.order_by(desc("score")).limit(limit)
+
+    def _document_columns(self):
+        return [
+            self.table.c.id,
+            self.table.c.name,
+            self.table.c.meta_data,
+            self.table.c.content,
+            self.table.c.embedding,
+            self.table.c.usage,
+        ]
+
+    def _row_to_document(self, result) -> Document:
+        return Document(
+            id=result.id,
+            name=result.name,
+            meta_data=result.meta_data,
+            content=result.content,
+            embedder=self.embedder,
+            embedding=result.embedding,
+            usage=result.usage,
+        )
+
+    def _get_query_embedding(self, query: str) -> Optional[List[float]]:
+        """
+        Embed a search query through the query embedding cache, when one is configured.
+        """
+        if self.query_embedding_cache is None:
+            return self.embedder.get_embedding(query)
+        cache_key = self.query_embedding_cache.key(self._embedder_model_id(), self.dimensions, query)
+        embedding = self.query_embedding_cache.get(cache_key)
+        if embedding is None:
+            embedding = self.embedder.get_embedding(query)
+            if embedding:
+                self.query_embedding_cache.set(cache_key, embedding)
+        return embedding
+
+    def _set_index_search_params(self, sess) -> None:
+        if isinstance(self.vector_index, Ivfflat):
+            sess.execute(text(f"SET LOCAL ivfflat.probes = {self.vector_index.probes}"))
+        elif isinstance(self.vector_index, HNSW):
+            sess.execute(text(f"SET LOCAL hnsw.ef_search = {self.vector_index.ef_search}"))
+
+    def _vector_stmt(self, query_embedding: List[float], limit: int, filters: Optional[Dict[str, Any]], columns):
+        # score is a similarity (higher is closer) derived from the distance used for ordering
+        if self.distance == Distance.l2:
+            distance = self.table.c.embedding.l2_distance(query_embedding)
+            score = 1 / (1 + distance)
+        elif self.distance == Distance.max_inner_product:
+            # pgvector's <#> returns the negative inner product
+            distance = self.table.c.embedding.max_inner_product(query_embedding)
+            score = -distance
+        else:
+            distance = self.table.c.embedding.cosine_distance(query_embedding)
+            score = 1 - distance
+        stmt = select(*columns, score.label("score"))
+        if filters is not None:
+            stmt = stmt.where(self.table.c.filters.contains(filters))
+        return stmt.order_by(distance).limit(limit)
+
+    def _keyword_stmt(self, query: str, limit: int, filters: Optional[Dict[str, Any]], columns):
+        ts_vector = func.to_tsvector(self.content_language, self.table.c.content)
+        processed_query = self.enable_prefix_matching(query) if self.prefix_match else query
+        ts_query = func.websearch_to_tsquery(self.content_language, bindparam("query", value=processed_query))
+        text_rank = func.ts_rank_cd(ts_vector, ts_query)
+        stmt = select(*columns, text_rank.label("score"))
+        if filters is not None:
+            stmt = stmt.where(self.table.c.filters.contains(filters))
+        return stmt.order_by(text_rank.desc()).limit(limit)
+
+    # -------------------- Projected search (no embedding column) --------------------
+
+    def _projected_columns(self):
+        return [self.table.c.name, self.table.c.meta_data, self.table.c.content]
+
+    def _projected_stmt(self, search_query: VectorSearchQuery, query_embedding: Optional[List[float]]):
+        limit = self._resolve_limit(search_query.limit)
+        filters = self._resolve_filters(search_query.filters)
+        columns = self._projected_columns()
+        if search_query.search_type == SearchType.vector:
+            return self._vector_stmt(query_embedding, limit, filters, columns)
+        elif search_query.search_type == SearchType.keyword:
+            return self._keyword_stmt(search_query.query, limit, filters, columns)
+        elif search_query.search_type == SearchType.hybrid:
+            if not 0 <= search_query.vector_score_weight <= 1:
+                raise ValueError("vector_score_weight must be between 0 and 1")
+            return self._hybrid_stmt(search_query.query, query_embedding, limit, filters,
+                                     search_query.vector_score_weight, columns=columns)
+        raise ValueError(f"Invalid search type '{search_query.search_type}'.")
+
+    @staticmethod
+    def _needs_query_embedding(search_query: VectorSearchQuery) -> bool:
+        return search_query.search_type in (SearchType.vector, SearchType.hybrid)
+
+    # -------------------- Reranking --------------------
+
+    def _should_rerank(self, candidates: int, rerank: Optional[bool], rerank_min_candidates: Optional[int]) -> bool:
+        if self.reranker is None or rerank is False:
+            return False
+        min_candidates = self.rerank_min_candidates if rerank_min_candidates is None else rerank_min_candidates
+        return candidates > min_candidates
+
+    def _reranker_id(self) -> str:
+        return f"{type(self.reranker).__name__}:{getattr(self.reranker, 'model', '')}"
+
+    def _rerank_documents(self, query: str, documents: List[Document]) -> List[Document]:
+        """
+        Rerank through the rerank cache, keyed by query and the set of candidate content hashes.
+        """
+        if self.rerank_cache is None:
+            return self.reranker.rerank(query=query, documents=documents)
+
+        hashes = [md5(doc.content.encode()).hexdigest() for doc in documents]
+        key = self.rerank_cache.key(self._reranker_id(), query, hashes)
+        ranking = self.rerank_cache.get(key)
+        if ranking is not None:
+            by_hash: Dict[str, List[Document]] = {}
+            for content_hash, doc in zip(hashes, documents):
+                by_hash.setdefault(content_hash, []).append(doc)
+            reranked = []
+            for content_hash, score in ranking:
+                if by_hash.get(content_hash):
+                    doc = by_hash[content_hash].pop(0)
+                    doc.reranking_score = score
+                    reranked.append(doc)
+            return reranked
+
+        hash_by_doc = {id(doc): content_hash for doc, content_hash in zip(documents, hashes)}
+        reranked = self.reranker.rerank(query=query, documents=documents)
+        # CohereReranker returns the original, unscored documents on failure; don't cache those
+        if reranked and all(doc.reranking_score is not None for doc in reranked):
+            self.rerank_cache.set(key, [(hash_by_doc[id(doc)], doc.reranking_score) for doc in reranked])
+        return reranked
+
+    def _rerank_results(self, query: str, results: List[SearchResult]) -> List[SearchResult]:
+        documents = [Document(name=r.name, meta_data=r.meta_data or {}, content=r.content) for r in results]
+        reranked = self._rerank_documents(query, documents)
+        return [SearchResult(content=d.content, name=d.name, meta_data=d.meta_data,
+                             score=d.reranking_score) for d in reranked]
+
+    def run_projected_query(self, search_query: VectorSearchQuery) -> List[SearchResult]:
+        """
+        Like run_query, but selects only name/meta_data/content plus the ranking score and returns
+        SearchResult rows instead of Document objects, so embeddings never leave the database.
+        """
+        try:
+            query_embedding = None
+            if self._needs_query_embedding(search_query):
+                query_embedding = self._get_query_embedding(search_query.query)
+                if not query_embedding:
+                    logger.error(f"Error getting embedding for Query: {search_query.query}")
+                    return []
+            stmt = self._projected_stmt(search_query, query_embedding)
+            with self.Session() as sess, sess.begin():
+                if query_embedding is not None:
+                    self._set_index_search_params(sess)
+                rows = sess.execute(stmt).fetchall()
+        except Exception as e:
+            logger.error(f"Error during projected {search_query.search_type} search: {e}")
+            return []
+
+        results = [SearchResult(content=row.content, name=row.name, meta_data=row.meta_data, score=row.score)
+                   for row in rows]
+        if search_query.search_type == SearchType.vector and self._should_rerank(
+                len(results), search_query.rerank, search_query.rerank_min_candidates):
+            results = self._rerank_results(search_query.query, results)
+        print(f"📄 {len(results)} documents fetched from vector DB (projected {search_query.search_type.value})")
+        return results
+
+    async def arun_projected_query(self, search_query: VectorSearchQuery) -> List[SearchResult]:
+        """
+        Async counterpart of run_projected_query on the shared asyncpg pool.
+        """
+        if self.async_session is None:
+            return await asyncio.to_thread(self.run_projected_query, search_query)
+        try:
+            query_embedding = None
+            if self._needs_query_embedding(search_query):
+                query_embedding = await self._aget_query_embedding(search_query.query)
+                if not query_embedding:
+                    logger.error(f"Error getting embedding for Query: {search_query.query}")
+                    return []
+            stmt = self._projected_stmt(search_query, query_embedding)
+            async with self.async_session() as sess, sess.begin():
+                if query_embedding is not None:
+                    await self._aset_index_search_params(sess)
+                rows = (await sess.execute(stmt)).fetchall()
+        except Exception as e:
+            logger.error(f"Error during projected {search_query.search_type} search: {e}")
+            return []
+
+        results = [SearchResult(content=row.content, name=row.name, meta_data=row.meta_data, score=row.score)
+                   for row in rows]
+        if search_query.search_type == SearchType.vector and self._should_rerank(
+                len(results), search_query.rerank, search_query.rerank_min_candidates):
+            results = await asyncio.to_thread(self._rerank_results, search_query.query, results)
+        print(f"📄 {len(results)} documents fetched from vector DB (projected {search_query.search_type.value})")
+        return results
+
+    # -------------------- ANN index management --------------------
+
+    def _vector_index_name(self) -> str:
+        if self.vector_index.name:
+            return self.vector_index.name
+        index_type = "ivfflat" if isinstance(self.vector_index, Ivfflat) else "hnsw"
+        return f"{self.table_name}_{index_type}_index"
+
+    def _index_distance_ops(self) -> str:
+        return {
+            Distance.l2: "vector_l2_ops",
+            Distance.max_inner_product: "vector_ip_ops",
+            Distance.cosine: "vector_cosine_ops",
+        }.get(self.distance, "vector_cosine_ops")
+
+    def tune_search(self, ef_search: Optional[int] = None, probes: Optional[int] = None) -> None:
+        """
+        Set this tenant's recall/latency knobs, applied with SET LOCAL on every vector and hybrid search.
+        ``ef_search`` only applies to HNSW and ``probes`` only to IVFFlat.
+        """
+        if ef_search is not None and isinstance(self.vector_index, HNSW):
+            self.vector_index.ef_search = ef_search
+        if probes is not None and isinstance(self.vector_index, Ivfflat):
+            self.vector_index.probes = probes
+
+    def _vector_index_info(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            Optional[Dict[str, Any]]: None when the index is missing, else its validity and storage options.
+            A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind.
+        """
+        with self.Session() as sess:
+            row = sess.execute(text(
+                "SELECT i.indisvalid, c.reloptions FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE n.nspname = :schema AND c.relname = :name"
+            ), {"schema": self.schema, "name": self._vector_index_name()}).first()
+        if row is None:
+            return None
+        options = dict(option.split("=", 1) for option in (row.reloptions or []))
+        return {"valid": bool(row.indisvalid), "options": options}
+
+    def _ivfflat_lists(self, row_count: int) -> int:
+        if not self.vector_index.dynamic_lists:
+            return self.vector_index.lists
+        # Same sizing rule as phi: rows / 1000 up to 1M rows, sqrt(rows) beyond
+        if row_count < 1000000:
+            return max(int(row_count / 1000), 1)
+        return max(int(row_count ** 0.5), 1)
+
+    def _index_using_clause(self, row_count: int) -> str:
+        ops = self._index_distance_ops()
+        if isinstance(self.vector_index, Ivfflat):
+            return f"ivfflat (embedding {ops}) WITH (lists = {self._ivfflat_lists(row_count)})"
+        return (f"hnsw (embedding {ops}) "
+                f"WITH (m = {self.vector_index.m}, ef_construction = {self.vector_index.ef_construction})")
+
+    @contextmanager
+    def _index_build_connection(self, concurrently: bool) -> Iterator[Connection]:
+        """
+        Connection for an index build with the index's build settings (e.g. maintenance_work_mem) applied.
+        The settings must not outlive the build on a pooled connection: a plain build runs in one
+        transaction with transaction-local settings; CREATE/DROP INDEX CONCURRENTLY cannot run inside a
+        transaction block, so it gets a dedicated unpooled connection that is closed after the build.
+        """
+        build_settings = (self.vector_index.configuration or {}).items()
+        if not concurrently:
+            with self.db_engine.begin() as conn:
+                for key, value in build_settings:
+                    conn.execute(text("SELECT set_config(:key, :value, true)"), {"key": key, "value": str(value)})
+                yield conn
+            return
+
+        engine = create_engine(self.db_engine.url, poolclass=NullPool)
+        try:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                for key, value in build_settings:
+                    conn.execute(text("SELECT set_config(:key, :value, false)"), {"key": key, "value": str(value)})
+                yield conn
+        finally:
+            engine.dispose()
+
+    def _build_index(self, index_name: str, row_count: int, concurrently: bool, replace: Optional[str] = None) -> None:
+        keyword = "CONCURRENTLY " if concurrently else ""
+        with self._index_build_connection(concurrently) as conn:
+            conn.execute(text(f'DROP INDEX {keyword}IF EXISTS "{self.schema}"."{index_name}"'))
+            conn.execute(text(
+                f'CREATE INDEX {keyword}"{index_name}" ON {self.table.fullname} '
+                f"USING {self._index_using_clause(row_count)}"
+            ))
+            if replace:
+                # Swap the freshly built index in for the old one so searches never lose their index
+                conn.execute(text(f'DROP INDEX {keyword}IF EXISTS "{self.schema}"."{replace}"'))
+                conn.execute(text(f'ALTER INDEX "{self.schema}"."{index_name}" RENAME TO "{replace}"'))
+            conn.execute(text(f"ANALYZE {self.table.fullname}"))
+
+    def ensure_vector_index(self, rebuild: bool = False, concurrently: bool = True) -> str:
+        """
+        Create the tenant's HNSW/IVFFlat index if missing or invalid, or rebuild it when ``rebuild`` is set.
+        Tables below ``index_min_rows`` are skipped: sequential scans are fast there and IVFFlat needs data
+        to train its lists. With ``concurrently`` the table stays readable and writable during the build.
+
+        Returns:
+            str: "created", "rebuilt" or "skipped".
+        """
+        if self.vector_index is None:
+            return "skipped"
+        index_name = self._vector_index_name()
+        try:
+            info = self._vector_index_info()
+            if info is not None and info["valid"] and not rebuild:
+                return "skipped"
+            row_count = self.get_count()
+            if info is None and row_count < self.index_min_rows:
+                return "skipped"
+
+            start = time.perf_counter()
+            if info is not None and info["valid"]:
+                self._build_index(f"{index_name}_rebuild", row_count, concurrently, replace=index_name)
+                action = "rebuilt"
+            else:
+                self._build_index(index_name, row_count, concurrently)
+                action = "created"
+            print(f"🧭 Vector index '{index_name}' {action} on {row_count} rows "
+                  f"in {time.perf_counter() - start:.2f}s")
+            return action
+        except Exception as e:
+            logger.error(f"Error building vector index '{index_name}' on '{self.table.fullname}': {e}")
+            raise
+
+    def maintain_vector_index(self) -> Dict[str, Any]:
+        """
+        Periodic maintenance: build missing/invalid indexes and rebuild IVFFlat indexes whose list count has
+        drifted to less than half of what the current row count calls for. Also adds the filters GIN index to
+        tables created before it existed, which never go through ``create()`` again.
+
+        Returns:
+            Dict[str, Any]: Table name, row count and the action taken.
+        """
+        rebuild = False
+        row_count = self.get_count()
+        if isinstance(self.vector_index, Ivfflat) and self.vector_index.dynamic_lists:
+            info = self._vector_index_info()
+            if info is not None and info["valid"]:
+                current_lists = int(info["options"].get("lists", self.vector_index.lists))
+                rebuild = self._ivfflat_lists(row_count) >= 2 * current_lists
+        action = self.ensure_vector_index(rebuild=rebuild)
+        self.ensure_filters_index()
+        return {"table": self.table.fullname, "rows": row_count, "action": action}
+
+    # -------------------- Filter-only fetch --------------------
+
+    def create(self) -> None:
+        super().create()
+        self.ensure_filters_index()
+
+    def ensure_filters_index(self) -> None:
+        """
+        Create the GIN (jsonb_path_ops) index backing ``filters @> :f`` lookups, once per instance.
+        """
+        if self._filters_index_ready:
+            return
+        try:
+            with self.Session() as sess, sess.begin():
+                sess.execute(text(
+                    f'CREATE INDEX IF NOT EXISTS "{self.table_name}_filters_gin_index" ON {self.table.fullname} '
+                    f"USING GIN (filters jsonb_path_ops);"
+                ))
+            self._filters_index_ready = True
+        except Exception as e:
+            logger.error(f"Error creating filters GIN index on '{self.table.fullname}': {e}")
+
+    def _filters_stmt(self, filters: Dict[str, Any], limit: Optional[int]):
+        stmt = (
+            select(self.table.c.content)
+            .where(self.table.c.filters.contains(filters))
+            .order_by(self.table.c.name, self.table.c.meta_data["chunk"], self.table.c.id)
+        )
+        return stmt.limit(limit) if limit is not None else stmt
+
+    def fetch_by_filters(self, filters: Dict[str, Any], limit: Optional[int] = None) -> List[str]:
+        """
+        Fetch raw chunk contents matching ``filters`` without full-text ranking, Document objects or embeddings.
+        Rows are ordered by document name and ``meta_data.chunk``.
+
+        Args:
+            filters (Dict[str, Any]): JSONB containment filter, e.g. {"uid": ...} or {"sku": ...}.
+            limit (Optional[int]): Maximum number of chunks, all matching chunks when None.
+
+        Returns:
+            List[str]: Chunk contents in document/chunk order.
+        """
+        try:
+            with self.Session() as sess, sess.begin():
+                contents = list(sess.execute(self._filters_stmt(filters, limit)).scalars())
+        except Exception as e:
+            logger.error(f"Error fetching documents by filters: {e}")
+            return []
+        print(f"📄 {len(contents)} documents fetched from vector DB (fetch_by_filters)")
+        return contents
+
+    async def afetch_by_filters(self, filters: Dict[str, Any], limit: Optional[int] = None) -> List[str]:
+        """
+        Async counterpart of fetch_by_filters on the shared asyncpg pool.
+        """
+        if self.async_session is None:
+            return await asyncio.to_thread(self.fetch_by_filters, filters, limit)
+        try:
+            async with self.async_session() as sess, sess.begin():
+                contents = list((await sess.execute(self._filters_stmt(filters, limit))).scalars())
+        except Exception as e:
+            logger.error(f"Error fetching documents by filters: {e}")
+            return []
+        print(f"📄 {len(contents)} documents fetched from vector DB (afetch_by_filters)")
+        return contents
+
+    # -------------------- Async search / upsert (shared asyncpg pool) --------------------
+
+    def _async_columns(self):
+        # Embeddings are never loaded on the async path, callers only need content and metadata
+        return [
+            self.table.c.id,
+            self.table.c.name,
+            self.table.c.meta_data,
+            self.table.c.content,
+            self.table.c.usage,
+        ]
+
+    def _async_row_to_document(self, result) -> Document:
+        return Document(
+            id=result.id,
+            name=result.name,
+            meta_data=result.meta_data,
+            content=result.content,
+            embedder=self.embedder,
+            usage=result.usage,
+        )
+
+    def _get_async_embedding_client(self) -> AsyncOpenAI:
+        if self._async_embedding_client is None:
+            client_params: Dict[str, Any] = {}
+            if self.embedder.api_key:
+                client_params["api_key"] = self.embedder.api_key
+            if self.embedder.organization:
+                client_params["organization"] = self.embedder.organization
+            if self.embedder.base_url:
+                client_params["base_url"] = self.embedder.base_url
+            if self.embedder.client_params:
+                client_params.update(self.embedder.client_params)
+            self._async_embedding_client = AsyncOpenAI(**client_params)
+        return self._async_embedding_client
+
+    async def _aget_query_embedding(self, query: str) -> Optional[List[float]]:
+        cache_key = None
+        if self.query_embedding_cache is not None:
+            cache_key = self.query_embedding_cache.key(self._embedder_model_id(), self.dimensions, query)
+            cached = await self.query_embedding_cache.get_async(cache_key)
+            if cached is not None:
+                return cached
+        if not isinstance(self.embedder, OpenAIEmbedder):
+            embedding = await asyncio.to_thread(self.embedder.get_embedding, query)
+        else:
+            response = await self._get_async_embedding_client().embeddings.create(
+                **self._embedding_request_params([query]))
+            embedding = response.data[0].embedding if response.data else None
+        if embedding and cache_key is not None:
+            await self.query_embedding_cache.set_async(cache_key, embedding)
+        return embedding
+
+    async def _aset_index_search_params(self, sess) -> None:
+        if isinstance(self.vector_index, Ivfflat):
+            await sess.execute(text(f"SET LOCAL ivfflat.probes = {self.vector_index.probes}"))
+        elif isinstance(self.vector_index, HNSW):
+            await sess.execute(text(f"SET LOCAL hnsw.ef_search = {self.vector_index.ef_search}"))
+
+    async def _aexecute_search(self, stmt, label: str, set_index_params: bool = False):
+        async with self.async_session() as sess, sess.begin():
+            if set_index_params:
+                await self._aset_index_search_params(sess)
+            results = (await sess.execute(stmt)).fetchall()
+        docs = [self._async_row_to_document(result) for result in results]
+        print(f"📄 {len(docs)} documents fetched from vector DB ({label})")
+        return docs
+
+    async def arun_query(self, search_query: VectorSearchQuery) -> List[Document]:
+        """
+        Async counterpart of run_query. Falls back to run_query on a worker thread when no async engine is set.
+        """
+        if self.async_session is None:
+            return await asyncio.to_thread(self.run_query, search_query)
+        if search_query.search_type == SearchType.vector:
+            return await self.avector_search(query=search_query.query, limit=search_query.limit,
+                                             filters=search_query.filters, rerank=search_query.rerank,
+                                             rerank_min_candidates=search_query.rerank_min_candidates)
+        elif search_query.search_type == SearchType.keyword:
+            return await self.akeyword_search(query=search_query.query, limit=search_query.limit,
+                                              filters=search_query.filters)
+        elif search_query.search_type == SearchType.hybrid:
+            return await self.ahybrid_search(query=search_query.query, limit=search_query.limit,
+                                             filters=search_query.filters,
+                                             vector_score_weight=search_query.vector_score_weight)
+        logger.error(f"Invalid search type '{search_query.search_type}'.")
+        return []
+
+    async def avector_search(self, query: str, limit: Optional[int] = None, filters: Optional[Dict[str, Any]] = None,
+                             rerank: Optional[bool] = None,
+                             rerank_min_candidates: Optional[int] = None) -> List[Document]:
+        limit = self._resolve_limit(limit)
+        filters = self._resolve_filters(filters)
+        try:
+            query_embedding = await self._aget_query_embedding(query)
+            if query_embedding is None:
+                logger.error(f"Error getting embedding for Query: {query}")
+                return []
+            stmt = self._vector_stmt(query_embedding, limit, filters, self._async_columns())
+            try:
+                docs = await self._aexecute_search(stmt, "avector_search", set_index_params=True)
+            except Exception as e:
+                logger.error(f"Error performing semantic search: {e}")
+                return []
+            if self._should_rerank(len(docs), rerank, rerank_min_candidates):
+                docs = await asyncio.to_thread(self._rerank_documents, query, docs)
+            return docs
+        except Exception as e:
+            logger.error(f"Error during vector search: {e}")
+            return []
+
+    async def akeyword_search(self, query: str, limit: Optional[int] = None,
+                              filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        limit = self._resolve_limit(limit)
+        filters = self._resolve_filters(filters)
+        try:
+            stmt = self._keyword_stmt(query, limit, filters, self._async_columns())
+            return await self._aexecute_search(stmt, "akeyword_search")
+        except Exception as e:
+            logger.error(f"Error during keyword search: {e}")
+            return []
+
+    async def ahybrid_search(self, query: str, limit: Optional[int] = None, filters: Optional[Dict[str, Any]] = None,
+                             vector_score_weight: Optional[float] = None) -> List[Document]:
+        limit = self._resolve_limit(limit)
+        filters = self._resolve_filters(filters)
+        vector_score_weight = self.vector_score_weight if vector_score_weight is None else vector_score_weight
+        if not 0 <= vector_score_weight <= 1:
+            raise ValueError("vector_score_weight must be between 0 and 1")
+        try:
+            query_embedding = await self._aget_query_embedding(query)
+            if query_embedding is None:
+                logger.error(f"Error getting embedding for Query: {query}")
+                return []
+            stmt = self._hybrid_stmt(query, query_embedding, limit, filters, vector_score_weight,
+                                     columns=self._async_columns())
+            return await self._aexecute_search(stmt, "ahybrid_search", set_index_params=True)
+        except Exception as e:
+            logger.error(f"Error during hybrid search: {e}")
+            return []
+
+    async def aupsert(self, documents: List[Document], filters: Optional[Dict[str, Any]] = None,
+                      batch_size: int = 100) -> None:
+        """
+        Async counterpart of upsert: batches run concurrently under a semaphore of ``upsert_concurrency``.
+        Falls back to upsert on a worker thread when no async engine is set.
+        """
+        if self.async_session is None:
+            return await asyncio.to_thread(self.upsert, documents, filters, batch_size)
+
+        batches = [(i, documents[i: i + batch_size]) for i in range(0, len(documents), batch_size)]
+        if not batches:
+            return
+
+        start_time = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.upsert_concurrency)
+
+        async def run_batch(start_index: int, batch_docs: List[Document]):
+            async with semaphore:
+                await self._aupsert_batch(start_index, batch_docs, filters)
+
+        try:
+            await asyncio.gather(*(run_batch(i, batch_docs) for i, batch_docs in batches))
+        except Exception as e:
+            logger.error(f"Error upserting documents: {e}")
+            raise
+        logger.info(f"Upserted {len(documents)} documents in {len(batches)} batches "
+                    f"({time.perf_counter() - start_time:.2f}s)")
+
+    async def _aupsert_batch(self, start_index: int, batch_docs: List[Document],
+                             filters: Optional[Dict[str, Any]] = None) -> None:
+        logger.debug(f"Processing batch starting at index {start_index}, size: {len(batch_docs)}")
+        batch_start = time.perf_counter()
+        async with self.async_session() as sess:
+            try:
+                batch_records, unchanged_records = await self._aprepare_batch_records(sess, batch_docs, filters)
+                prepare_time = time.perf_counter() - batch_start
+                if not batch_records and not unchanged_records:
+                    logger.warning(f"No records to upsert in batch starting at index {start_index}")
+                    return
+
+                if batch_records:
+                    await sess.execute(self._build_upsert_stmt(batch_records))
+                if unchanged_records:
+                    await sess.execute(self._build_touch_stmt(), unchanged_records)
+                await sess.commit()  # Commit batch independently
+                logger.info(f"Upserted batch of {len(batch_records)} documents, {len(unchanged_records)} unchanged "
+                            f"at index {start_index} (prepare {prepare_time:.2f}s, "
+                            f"total {time.perf_counter() - batch_start:.2f}s).")
+            except Exception as e:
+                logger.error(f"Error with batch starting at index {start_index}: {e}")
+                await sess.rollback()  # Rollback the current batch if there's an error
+                raise
+
+    async def _aprepare_batch_records(self, sess, batch_docs: List[Document], filters: Optional[Dict[str, Any]] = None
+                                      ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        now = datetime.now(timezone.utc)
+        prepared = self._hash_batch(batch_docs)
+        try:
+            result = await sess.execute(self._stored_hashes_stmt([_id for _, _id, _, _ in prepared]))
+            stored_hashes = {row.id: row.content_hash for row in result}
+        except Exception as e:
+            logger.warning(f"Could not fetch stored content hashes, embedding the whole batch: {e}")
+            await sess.rollback()
+            stored_hashes = {}
+        pending, unchanged_records = self._split_unchanged(prepared, stored_hashes, filters, now)
+        if not pending:
+            return [], unchanged_records
+
+        cached = {}
+        if self.embedding_cache is not None:
+            cached = await asyncio.to_thread(self._get_cached_embeddings,
+                                             [content_hash for *_, content_hash in pending])
+        to_embed = [(doc, content) for doc, _, content, content_hash in pending if content_hash not in cached]
+        embedded = {}
+        if to_embed:
+            results = await self._aembed_contents([doc for doc, _ in to_embed], [content for _, content in to_embed])
+            embedded = self._index_by_hash(to_embed, results)
+            if self.embedding_cache is not None:
+                await asyncio.to_thread(self._set_cached_embeddings,
+                                        {h: e for h, (e, _) in embedded.items() if e is not None})
+
+        return self._build_records(pending, cached, embedded, filters, now), unchanged_records
+
+    async def _aembed_contents(self, batch_docs: List[Document],
+                               contents: List[str]) -> List[Tuple[Optional[List[float]], Optional[Dict[str, Any]]]]:
+        if not isinstance(self.embedder, OpenAIEmbedder):
+            return await asyncio.to_thread(self._embed_contents, batch_docs, contents)
+        client = self._get_async_embedding_client()
+        try:
+            response = await client.embeddings.create(**self._embedding_request_params(contents))
+            usage = response.usage.model_dump() if response.usage else None
+            embeddings: List[Optional[List[float]]] = [None] * len(contents)
+            for item in response.data:
+                embeddings[item.index] = item.embedding
+            return [(embedding, usage) for embedding in embeddings]
+        except Exception as e:
+            logger.warning(f"Batch embedding failed, falling back to per-document embedding: {e}")
+
+        results = []
+        for doc, content in zip(batch_docs, contents):
+            try:
+                response = await client.embeddings.create(**self._embedding_request_params([content]))
+                usage = response.usage.model_dump() if response.usage else None
+                results.append((response.data[0].embedding, usage))
+            except Exception as e:
+                logger.error(f"Error processing document '{doc.name}': {e}")
+                results.append((None, None))
+        return results
+
     # def keyword_search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
     #     """
     #             Perform a keyword search on the 'content' column.
@@ -127,62 +951,266 @@ class CustomPgVector(PgVector):
         """
         Upsert (insert or update) documents in the database.
 
+        Each batch is embedded with a single multi-input embedding request and written in its own
+        session, batches run concurrently on a bounded worker pool (``upsert_concurrency``).
+        Chunks whose stored content hash is unchanged are not re-embedded.
+
         Args:
             documents (List[Document]): List of documents to upsert.
             filters (Optional[Dict[str, Any]]): Filters to apply to the documents.
             batch_size (int): Number of documents to upsert in each batch.
         """
+        batches = [(i, documents[i: i + batch_size]) for i in range(0, len(documents), batch_size)]
+        if not batches:
+            return
+
+        start_time = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=min(self.upsert_concurrency, len(batches)))
         try:
-            with self.Session() as sess:
-                for i in range(0, len(documents), batch_size):
-                    batch_docs = documents[i: i + batch_size]
-                    logger.debug(f"Processing batch starting at index {i}, size: {len(batch_docs)}")
-                    try:
-                        # Prepare documents for upserting
-                        batch_records = []
-                        for doc in batch_docs:
-                            try:
-                                doc.embed(embedder=self.embedder)
-                                cleaned_content = self._clean_content(doc.content)
-                                content_hash = md5(cleaned_content.encode()).hexdigest()
-                                _id = doc.id or content_hash
-                                record = {
-                                    "id": _id,
-                                    "name": doc.name,
-                                    "meta_data": doc.meta_data,
-                                    "filters": filters,
-                                    "content": cleaned_content,
-                                    "embedding": doc.embedding,
-                                    "usage": doc.usage,
-                                    "content_hash": content_hash,
-                                    "created_at": datetime.now(timezone.utc),
-                                }
-                                batch_records.append(record)
-                            except Exception as e:
-                                logger.error(f"Error processing document '{doc.name}': {e}")
-
-                        # Upsert the batch of records
-                        insert_stmt = postgresql.insert(self.table).values(batch_records)
-                        upsert_stmt = insert_stmt.on_conflict_do_update(
-                            index_elements=["id"],
-                            set_=dict(
-                                name=insert_stmt.excluded.name,
-                                meta_data=insert_stmt.excluded.meta_data,
-                                filters=insert_stmt.excluded.filters,
-                                content=insert_stmt.excluded.content,
-                                embedding=insert_stmt.excluded.embedding,
-                                usage=insert_stmt.excluded.usage,
-                                content_hash=insert_stmt.excluded.content_hash,
-                                created_at=datetime.now(timezone.utc),
-                            ),
-                        )
-                        sess.execute(upsert_stmt)
-                        sess.commit()  # Commit batch independently
-                        logger.info(f"Upserted batch of {len(batch_records)} documents.")
-                    except Exception as e:
-                        logger.error(f"Error with batch starting at index {i}: {e}")
-                        sess.rollback()  # Rollback the current batch if there's an error
-                        raise
+            futures = [executor.submit(self._upsert_batch, i, batch_docs, filters) for i, batch_docs in batches]
+            for future in as_completed(futures):
+                future.result()
         except Exception as e:
             logger.error(f"Error upserting documents: {e}")
+            executor.shutdown(wait=True, cancel_futures=True)
             raise
+        executor.shutdown(wait=True)
+        logger.info(f"Upserted {len(documents)} documents in {len(batches)} batches "
+                    f"({time.perf_counter() - start_time:.2f}s)")
+
+    def _upsert_batch(self, start_index: int, batch_docs: List[Document],
+                      filters: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Embed and upsert a single batch, committing or rolling back independently of other batches.
+        """
+        logger.debug(f"Processing batch starting at index {start_index}, size: {len(batch_docs)}")
+        batch_start = time.perf_counter()
+        with self.Session() as sess:
+            try:
+                # Prepare documents for upserting, skipping the embedder for unchanged chunks
+                batch_records, unchanged_records = self._prepare_batch_records(sess, batch_docs, filters)
+                prepare_time = time.perf_counter() - batch_start
+                if not batch_records and not unchanged_records:
+                    logger.warning(f"No records to upsert in batch starting at index {start_index}")
+                    return
+
+                # Upsert the batch of records
+                if batch_records:
+                    sess.execute(self._build_upsert_stmt(batch_records))
+                # Unchanged chunks keep their stored vector, only name/meta/filters are refreshed
+                if unchanged_records:
+                    sess.execute(self._build_touch_stmt(), unchanged_records)
+                sess.commit()  # Commit batch independently
+                logger.info(f"Upserted batch of {len(batch_records)} documents, {len(unchanged_records)} unchanged "
+                            f"at index {start_index} (prepare {prepare_time:.2f}s, "
+                            f"total {time.perf_counter() - batch_start:.2f}s).")
+            except Exception as e:
+                logger.error(f"Error with batch starting at index {start_index}: {e}")
+                sess.rollback()  # Rollback the current batch if there's an error
+                raise
+
+    def _prepare_batch_records(self, sess, batch_docs: List[Document], filters: Optional[Dict[str, Any]] = None
+                               ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Build upsert records for a batch.
+
+        Chunks whose id already holds the same content hash are returned as "unchanged" and never
+        embedded; the rest reuse cached embeddings where available and are embedded in one request.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]: Records to upsert and unchanged-row updates.
+        """
+        now = datetime.now(timezone.utc)
+        prepared = self._hash_batch(batch_docs)
+        stored_hashes = self._fetch_stored_hashes(sess, [_id for _, _id, _, _ in prepared])
+        pending, unchanged_records = self._split_unchanged(prepared, stored_hashes, filters, now)
+        if not pending:
+            return [], unchanged_records
+
+        cached = self._get_cached_embeddings([content_hash for *_, content_hash in pending])
+        to_embed = [(doc, content) for doc, _, content, content_hash in pending if content_hash not in cached]
+        embedded: Dict[str, Tuple[Optional[List[float]], Optional[Dict[str, Any]]]] = {}
+        if to_embed:
+            results = self._embed_contents([doc for doc, _ in to_embed], [content for _, content in to_embed])
+            embedded = self._index_by_hash(to_embed, results)
+            self._set_cached_embeddings({h: e for h, (e, _) in embedded.items() if e is not None})
+
+        return self._build_records(pending, cached, embedded, filters, now), unchanged_records
+
+    def _hash_batch(self, batch_docs: List[Document]) -> List[Tuple[Document, str, str, str]]:
+        prepared = []
+        for doc in batch_docs:
+            cleaned_content = self._clean_content(doc.content)
+            content_hash = md5(cleaned_content.encode()).hexdigest()
+            prepared.append((doc, doc.id or content_hash, cleaned_content, content_hash))
+        return prepared
+
+    @staticmethod
+    def _split_unchanged(prepared: List[Tuple[Document, str, str, str]], stored_hashes: Dict[str, str],
+                         filters: Optional[Dict[str, Any]], now: datetime):
+        unchanged_records = []
+        pending = []
+        for doc, _id, cleaned_content, content_hash in prepared:
+            if stored_hashes.get(_id) == content_hash:
+                unchanged_records.append({
+                    "b_id": _id,
+                    "b_name": doc.name,
+                    "b_meta_data": doc.meta_data,
+                    "b_filters": filters,
+                    "b_created_at": now,
+                })
+            else:
+                pending.append((doc, _id, cleaned_content, content_hash))
+        return pending, unchanged_records
+
+    @staticmethod
+    def _index_by_hash(to_embed: List[Tuple[Document, str]], results):
+        return {md5(content.encode()).hexdigest(): result for (_, content), result in zip(to_embed, results)}
+
+    @staticmethod
+    def _build_records(pending: List[Tuple[Document, str, str, str]], cached: Dict[str, List[float]],
+                       embedded: Dict[str, Tuple[Optional[List[float]], Optional[Dict[str, Any]]]],
+                       filters: Optional[Dict[str, Any]], now: datetime) -> List[Dict[str, Any]]:
+        batch_records = []
+        for doc, _id, cleaned_content, content_hash in pending:
+            if content_hash in cached:
+                embedding, usage = cached[content_hash], None
+            else:
+                embedding, usage = embedded.get(content_hash, (None, None))
+            if embedding is None:
+                continue
+            batch_records.append({
+                "id": _id,
+                "name": doc.name,
+                "meta_data": doc.meta_data,
+                "filters": filters,
+                "content": cleaned_content,
+                "embedding": embedding,
+                "usage": usage,
+                "content_hash": content_hash,
+                "created_at": now,
+            })
+        return batch_records
+
+    def _fetch_stored_hashes(self, sess, ids: List[str]) -> Dict[str, str]:
+        """
+        Bulk-fetch the stored content hash for each id in the batch (one SELECT per batch).
+        """
+        try:
+            return {row.id: row.content_hash for row in sess.execute(self._stored_hashes_stmt(ids))}
+        except Exception as e:
+            logger.warning(f"Could not fetch stored content hashes, embedding the whole batch: {e}")
+            sess.rollback()
+            return {}
+
+    def _stored_hashes_stmt(self, ids: List[str]):
+        return select(self.table.c.id, self.table.c.content_hash).where(self.table.c.id.in_(ids))
+
+    def _get_cached_embeddings(self, content_hashes: List[str]) -> Dict[str, List[float]]:
+        if self.embedding_cache is None:
+            return {}
+        return self.embedding_cache.get_many(self._embedder_model_id(), self.dimensions, content_hashes)
+
+    def _set_cached_embeddings(self, embeddings: Dict[str, List[float]]) -> None:
+        if self.embedding_cache is not None:
+            self.embedding_cache.set_many(self._embedder_model_id(), self.dimensions, embeddings)
+
+    def _embedder_model_id(self) -> str:
+        return getattr(self.embedder, "model", None) or type(self.embedder).__name__
+
+    def _embed_contents(self, batch_docs: List[Document],
+                        contents: List[str]) -> List[Tuple[Optional[List[float]], Optional[Dict[str, Any]]]]:
+        """
+        Embed contents with a single multi-input request, falling back to per-document embedding
+        when the embedder has no batch client or the batch request fails.
+        """
+        if isinstance(self.embedder, OpenAIEmbedder):
+            try:
+                response = self.embedder.client.embeddings.create(**self._embedding_request_params(contents))
+                usage = response.usage.model_dump() if response.usage else None
+                embeddings: List[Optional[List[float]]] = [None] * len(contents)
+                for item in response.data:
+                    embeddings[item.index] = item.embedding
+                # usage is reported for the whole request, not per document
+                return [(embedding, usage) for embedding in embeddings]
+            except Exception as e:
+                logger.warning(f"Batch embedding failed, falling back to per-document embedding: {e}")
+
+        results = []
+        for doc in batch_docs:
+            try:
+                doc.embed(embedder=self.embedder)
+                results.append((doc.embedding, doc.usage))
+            except Exception as e:
+                logger.error(f"Error processing document '{doc.name}': {e}")
+                results.append((None, None))
+        return results
+
+    def _embedding_request_params(self, contents: List[str]) -> Dict[str, Any]:
+        """
+        Mirror OpenAIEmbedder.response() request params for a multi-input request.
+        """
+        request_params: Dict[str, Any] = {
+            "input": contents,
+            "model": self.embedder.model,
+            "encoding_format": self.embedder.encoding_format,
+        }
+        if self.embedder.user is not None:
+            request_params["user"] = self.embedder.user
+        if self.embedder.model.startswith("text-embedding-3"):
+            request_params["dimensions"] = self.embedder.dimensions
+        if self.embedder.request_params:
+            request_params.update(self.embedder.request_params)
+        return request_params
+
+    def _build_upsert_stmt(self, batch_records: List[Dict[str, Any]]):
+        insert_stmt = postgresql.insert(self.table).values(batch_records)
+        return insert_stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_=dict(
+                name=insert_stmt.excluded.name,
+                meta_data=insert_stmt.excluded.meta_data,
+                filters=insert_stmt.excluded.filters,
+                content=insert_stmt.excluded.content,
+                embedding=insert_stmt.excluded.embedding,
+                usage=insert_stmt.excluded.usage,
+                content_hash=insert_stmt.excluded.content_hash,
+                created_at=datetime.now(timezone.utc),
+            ),
+        )
+
+    def _build_touch_stmt(self):
+        return (
+            update(self.table)
+            .where(self.table.c.id == bindparam("b_id"))
+            .values(
+                name=bindparam("b_name"),
+                meta_data=bindparam("b_meta_data"),
+                filters=bindparam("b_filters"),
+                created_at=bindparam("b_created_at"),
+            )
+        )
+
+    def __deepcopy__(self, memo):
+        """
+        Deep copy that shares engines, sessions, clients and caches instead of copying them.
+        """
+        from copy import deepcopy
+        from sqlalchemy.schema import MetaData
+
+        cls = self.__class__
+        copied_obj = cls.__new__(cls)
+        memo[id(self)] = copied_obj
+        shared = {"db_engine", "Session", "embedder", "embedding_cache", "query_embedding_cache", "rerank_cache",
+                  "reranker", "async_session", "_async_embedding_client"}
+        for k, v in self.__dict__.items():
+            if k in {"metadata", "table"}:
+                continue
+            elif k in shared:
+                setattr(copied_obj, k, v)
+            else:
+                setattr(copied_obj, k, deepcopy(v, memo))
+
+        copied_obj.metadata = MetaData(schema=copied_obj.schema)
+        copied_obj.table = copied_obj.get_table()
+        return copied_obj
@@ -1,4 +1,5 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+import asyncio
 import json
 from phi.agent import Agent
 from phi.document import Document
@@ -22,19 +23,33 @@ class ProductDescriptionAgent(Agent):
         """
         if self.knowledge is None:
             return "Knowledge base not available"
+        document, filters = self._feedback_document(section_name, result)
+        self.knowledge.load_document(document=document, upsert=True, filters=filters)
+        return "Successfully added to knowledge base"
+
+    async def aadd_to_knowledge(self, section_name: str, result: str) -> str:
+        """Async variant of add_to_knowledge that upserts through the vector DB's async engine when available."""
+        if self.knowledge is None:
+            return "Knowledge base not available"
+        vector_db = self.knowledge.vector_db
+        if not hasattr(vector_db, "aupsert"):
+            return await asyncio.to_thread(self.add_to_knowledge, section_name, result)
+        document, filters = self._feedback_document(section_name, result)
+        # load_document creates the tenant table on first use; the direct upsert has to do the same
+        await asyncio.to_thread(vector_db.create)
+        await vector_db.aupsert(documents=[document], filters=filters)
+        return "Successfully added to knowledge base"
+
+    def _feedback_document(self, section_name: str, result: str) -> Tuple[Document, Optional[Dict[str, Any]]]:
         document_name = self.name
         if document_name is None:
             document_name = section_name.replace(" ", "_").replace("?", "").replace("!", "").replace(".", "")
         document_content = json.dumps(
             {"section_name": section_name, "previous_response": self.previous_response, "user_feedback": result})
         print(f"Adding document to knowledge base: {document_name}: {document_content}")
-        self.knowledge.load_document(
-            document=Document(
-                name=document_name,
-                content=document_content,
-                meta_data=self.filters_ags  # {"source": "user_feedback", "name": document_name},
-            ),
-            upsert=True,
-            filters=self.filters_ags,
+        document = Document(
+            name=document_name,
+            content=document_content,
+            meta_data=self.filters_ags  # {"source": "user_feedback", "name": document_name},
         )
-        return "Successfully added to knowledge base"
+        return document, self.filters_ags
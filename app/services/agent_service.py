@@ -1,20 +1,19 @@
 import json
-import asyncio
 from typing import Optional
 from phi.agent import Agent
 from phi.memory import AgentMemory
 from phi.memory.agent import MemoryRetrieval
-from phi.model.openai import OpenAIChat
 from phi.knowledge.agent import AgentKnowledge
 from phi.vectordb.pgvector import SearchType
 
 from app.core.context import loggedin_user_var
 from app.services.ProductAgent import ProductDescriptionAgent
-from app.services.drive_service import fetch_drive_file_content
+from app.services.redis_service import load_cached_templates, register_template_files
 from app.core import settings
+from app.utils.agent_templates import agent_templates
 from app.services.storage_cache import get_cached_custom_vector_db, get_cached_storage, get_cached_memory_db
-from app.utils import redis_client
 from app.core.exceptions import InternalServerErrorException
+from app.utils import iterate_in_thread, JsonArrayStreamParser, memory_profiler, openai_models
 
 # -------------------- Environment Variables --------------------
 OPENAI_API_KEY = settings.OPENAI_API_KEY
@@ -33,6 +32,7 @@ CACHED_FILES = {
     "product_instructions_content": "product_instructions_content.md",
     "product_commands_content": "product_commands_content.md"
 }
+register_template_files(INSTRUCTION_COMMAND_FOLDER_NAME, CACHED_FILES)
 
 
 # -------------------- Async Load Instructions & Commands --------------------
@@ -41,16 +41,7 @@ CACHED_FILES = {
 async def load_instructions_and_commands(drive_service):
     """Load instructions and commands from Google Drive or Redis Cache asynchronously."""
 
-    content = {}
-    for key, file_name in CACHED_FILES.items():
-        cached_content = await redis_client.get_value_async(key)
-        if cached_content is None:
-            cached_content = await fetch_drive_file_content(drive_service, file_name,
-                                                            f"{INSTRUCTION_COMMAND_FOLDER_NAME}")
-            await redis_client.set_value_async(key, cached_content)
-        content[key] = cached_content
-
-    return content
+    return await load_cached_templates(drive_service, CACHED_FILES, INSTRUCTION_COMMAND_FOLDER_NAME)
 
 
 async def load_instructions_and_commands_for_sectional(drive_service, section_name: str):
@@ -59,19 +50,51 @@ async def load_instructions_and_commands_for_sectional(drive_service, section_na
     """
     sectional_commands_key = f"product_{section_name}_commands_content"
 
-    # Check Redis cache asynchronously
-    sectional_cached_commands_content = await redis_client.get_value_async(sectional_commands_key)
+    content = await load_cached_templates(drive_service, {sectional_commands_key: f"{sectional_commands_key}.md"},
+                                          INSTRUCTION_COMMAND_FOLDER_NAME)
+    return content[sectional_commands_key]
 
-    if sectional_cached_commands_content is None:
-        sectional_cached_commands_content = await fetch_drive_file_content(
-            drive_service, f"{sectional_commands_key}.md", INSTRUCTION_COMMAND_FOLDER_NAME
-        )
-        await redis_client.set_value_async(sectional_commands_key, sectional_cached_commands_content)
 
-    return sectional_cached_commands_content
+# -------------------- Initialize AI Agent --------------------
 
+agent_templates.register(
+    "product_description",
+    ProductDescriptionAgent,
+    name="product_description_writer",
+    description="Creates high-converting product descriptions by combining keyword relevance, buyer intent, and structured formatting.",
+    task="Generate SEO-optimized product descriptions in JSON format with clear feature-benefit mapping, target audience alignment, and grounded contextual data.",
+    prevent_hallucinations=True,
+    add_context=True,
+    markdown=True,
+    add_chat_history_to_messages=True,
+    read_chat_history=True,
+    num_history_responses=NUM_HISTORY_RESPONSES,
+    debug_mode=not IS_PROD,
+    prevent_prompt_leakage=True,
+    parse_response=True,
+    structured_outputs=True,
+    guidelines=[
+        "User feedback takes priority over all previous instructions. If the user requests a different word count, tone, or style, strictly follow the User feedback",
+        "Always start with an emotional hook that reflects the customer's pain point or desire.",
+        "Use benefit-first language — emphasize what the product does for the customer, not just what it is.",
+        "Use persuasive, confidence-building tone: clear, trustworthy, and empathetic.",
+        "Include sensory or relief-oriented words like 'soothing', 'refreshing', 'gentle', 'fast-acting', 'lasting'.",
+        "Avoid generic terms (e.g., 'good product'); always be specific (e.g., 'relieves acidity within 15 minutes').",
+        "Back claims with credibility phrases like 'clinically proven', 'trusted by experts', 'Ayurvedic formulation'.",
+        "Target the buyer’s lifestyle and situation (e.g., busy professionals, natural wellness seekers, etc.).",
+        "Ensure structure: title, teaser, 5 highlights, description, ingredient-benefit mapping, and detailed how-to-use.",
+        "Use formatting that improves readability: bullet points, short paragraphs, and structured JSON chunks.",
+        "Focus on emotional transformation: 'from discomfort to daily comfort', 'from burning sensation to calm stomach'.",
+        "Include post-usage care tips to reflect holistic well-being and thoughtfulness.",
+        "Mention dietary/lifestyle support tips to increase trust and show customer-centric care.",
+        "Speak as if you’re guiding the customer, not just selling — be a helpful advisor.",
+        "In ‘how_to_use’, include timing, routine, and precautions for safety and completeness.",
+        "Avoid overpromising or making unverifiable claims (e.g., 'cures all diseases'). Stick to 'supports', 'reduces', etc.",
+        "End descriptions with a subtle motivational nudge: 'Take control of your digestion — the natural way.'"
+        "End with a subtle, persuasive call-to-action (e.g., 'Try it today')."
+    ]
+)
 
-# -------------------- Initialize AI Agent --------------------
 
 async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> ProductDescriptionAgent:
     """Initialize the AI Agent asynchronously with knowledge and memory."""
@@ -95,46 +118,14 @@ async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> Produ
         num_memories=5,
     )
 
-    return ProductDescriptionAgent(
-        name="product_description_writer",
-        description="Creates high-converting product descriptions by combining keyword relevance, buyer intent, and structured formatting.",
-        task="Generate SEO-optimized product descriptions in JSON format with clear feature-benefit mapping, target audience alignment, and grounded contextual data.",
-        prevent_hallucinations=True,
+    return agent_templates.create(
+        "product_description",
         knowledge=AgentKnowledge(vector_db=vector_db),
         storage=storage,
         session_id=session_id,
         user_id=user_id,
         agent_id=agent_id,
-        add_context=True,
-        markdown=True,
-        add_chat_history_to_messages=True,
-        read_chat_history=True,
-        num_history_responses=NUM_HISTORY_RESPONSES,
-        debug_mode=not IS_PROD,
-        prevent_prompt_leakage=True,
-        parse_response=True,
-        structured_outputs=True,
-        memory=memory,
-        guidelines=[
-            "User feedback takes priority over all previous instructions. If the user requests a different word count, tone, or style, strictly follow the User feedback",
-            "Always start with an emotional hook that reflects the customer's pain point or desire.",
-            "Use benefit-first language — emphasize what the product does for the customer, not just what it is.",
-            "Use persuasive, confidence-building tone: clear, trustworthy, and empathetic.",
-            "Include sensory or relief-oriented words like 'soothing', 'refreshing', 'gentle', 'fast-acting', 'lasting'.",
-            "Avoid generic terms (e.g., 'good product'); always be specific (e.g., 'relieves acidity within 15 minutes').",
-            "Back claims with credibility phrases like 'clinically proven', 'trusted by experts', 'Ayurvedic formulation'.",
-            "Target the buyer’s lifestyle and situation (e.g., busy professionals, natural wellness seekers, etc.).",
-            "Ensure structure: title, teaser, 5 highlights, description, ingredient-benefit mapping, and detailed how-to-use.",
-            "Use formatting that improves readability: bullet points, short paragraphs, and structured JSON chunks.",
-            "Focus on emotional transformation: 'from discomfort to daily comfort', 'from burning sensation to calm stomach'.",
-            "Include post-usage care tips to reflect holistic well-being and thoughtfulness.",
-            "Mention dietary/lifestyle support tips to increase trust and show customer-centric care.",
-            "Speak as if you’re guiding the customer, not just selling — be a helpful advisor.",
-            "In ‘how_to_use’, include timing, routine, and precautions for safety and completeness.",
-            "Avoid overpromising or making unverifiable claims (e.g., 'cures all diseases'). Stick to 'supports', 'reduces', etc.",
-            "End descriptions with a subtle motivational nudge: 'Take control of your digestion — the natural way.'"
-            "End with a subtle, persuasive call-to-action (e.g., 'Try it today')."
-        ]
+        memory=memory
     )
 
 
@@ -146,16 +137,14 @@ async def prepare_agent_and_prompt(drive_service, **kwargs):
 
     agent = await get_agent(kwargs.get("session_id"), kwargs.get("agent_id"))
 
-    agent.model = OpenAIChat(
-        id=OPENAI_MODEL,
-        model=OPENAI_MODEL,
+    agent.model = openai_models.get(
+        OPENAI_MODEL,
         max_completion_tokens=5000,
         temperature=OPENAI_TEMP,
-        api_key=OPENAI_API_KEY,
         top_p=TOP_P,
         user=user_id,
         session_id=kwargs.get("session_id"),
-        response_format={"type": "json_object"},
+        response_format={"type": "json_object"}
     )
 
     cached_content = await load_instructions_and_commands(drive_service)
@@ -204,8 +193,7 @@ async def ask_fouray_product_description_stream(drive_service, **kwargs):
         if section_name and further_details and previous_response:
             agent.filters_ags = {"sku": product_sku, "source": "user_feedback", "section_name": section_name}
             agent.previous_response = previous_response if previous_response else ""
-            agent.add_to_knowledge(section_name, further_details)
-            await asyncio.sleep(1)  # Allow time for knowledge to be added
+            await agent.aadd_to_knowledge(section_name, further_details)
 
         knowledgebase_context = ""
         if product_sku:
@@ -231,11 +219,8 @@ async def fetch_filtered_knowledge(filters=None):
 
     try:
         async def search_knowledge():
-            vector_db.default_limit = VECTOR_SEARCH_LIMIT
-            vector_db.search_type = SearchType.keyword
-            vector_db.vector_score_weight = 0.0
-            vector_db.filters_args = filters
-            return await asyncio.to_thread(vector_db.keyword_search, query="")
+            # filter-only lookup, no ranking needed
+            return await vector_db.afetch_by_filters(filters, limit=VECTOR_SEARCH_LIMIT)
 
         search_results = await search_knowledge()
         chunks = []
@@ -243,9 +228,9 @@ async def fetch_filtered_knowledge(filters=None):
         sep = "\n------------\n"
         # chunks = [chunk.content for chunk in search_results]
         # return sep.join(chunks)
-        for d in search_results:
+        for content in search_results:
             try:
-                payload = json.loads(d.content)
+                payload = json.loads(content)
                 section_name = payload.get("section_name", "").strip()
                 previous_response = payload.get("previous_response", "").strip()
                 user_feedback = payload.get("user_feedback", "").strip()
@@ -255,7 +240,7 @@ async def fetch_filtered_knowledge(filters=None):
                                       f"- **Previous response:** {previous_response}\n"
                                       f"- **User feedback:** {user_feedback}\n")
             except Exception:
-                chunks.append(d.content)  # fallback for non‑JSON docs
+                chunks.append(content)  # fallback for non‑JSON docs
         return sep.join(chunks), sep.join(user_feedbacks)
 
     except Exception as e:
@@ -285,59 +270,20 @@ async def execute_search_and_generate_response_stream(knowledge_context: Optiona
     try:
         del knowledge_context
         del combined_prompt
-        import gc
-        gc.collect()
-        print("Memory clean up before streaming")
-
-        buffer = ""
-        inside_array = False
-        brace_depth = 0
-        object_buffer = ""
-        # This will return an iterator (not async)
-        for chunk in agent.run(prompt, stream=True):
-
-            value = getattr(chunk, "content", chunk)
-            if not isinstance(value, str):
-                continue
-
-            buffer += value
-
-            # Wait until we find the start of the "response": [ section
-            if not inside_array and "[" in buffer:
-                inside_array = True
-                buffer = buffer.split("[", 1)[1]
-                continue
-
-            if inside_array:
-                for char in value:
-                    if char == "{":
-                        if brace_depth == 0:
-                            object_buffer = ""
-                        brace_depth += 1
-                        object_buffer += char
-                    elif char == "}":
-                        brace_depth -= 1
-                        object_buffer += char
-                        if brace_depth == 0:
-                            try:
-                                obj = json.loads(object_buffer)
-                                yield f"data: {json.dumps(obj)}\n\n"
-                                await asyncio.sleep(0.01)
-                            except json.JSONDecodeError:
-                                # malformed or partial
-                                pass
-                            object_buffer = ""
-                    elif brace_depth > 0:
-                        object_buffer += char
-
-            await asyncio.sleep(0)
-        del prompt
-        del buffer
-        del inside_array
-        del brace_depth
-        del object_buffer
-        gc.collect()
-        print("Memory cleaned up")
+
+        with memory_profiler.track("product"):
+            parser = JsonArrayStreamParser()
+            # agent.run is a blocking iterator; drive it on a worker thread so the event loop stays free
+            async for chunk in iterate_in_thread(lambda: agent.run(prompt, stream=True)):
+
+                value = getattr(chunk, "content", chunk)
+                if not isinstance(value, str):
+                    continue
+
+                for obj in parser.feed(value):
+                    yield json.dumps(obj)
+            for obj in parser.close():
+                yield json.dumps(obj)
 
     except Exception as e:
         raise InternalServerErrorException(f"Streaming error: {str(e)}")
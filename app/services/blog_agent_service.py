@@ -1,19 +1,19 @@
 import json
-import asyncio
 import re
 from typing import Optional
 from phi.agent import Agent
 from phi.memory import AgentMemory
 from phi.memory.agent import MemoryRetrieval
-from phi.model.openai import OpenAIChat
 from phi.knowledge.agent import AgentKnowledge
 from phi.vectordb.pgvector import SearchType
 from app.core.context import loggedin_user_var
-from app.services.drive_service import fetch_drive_file_content
+from app.services.redis_service import load_cached_templates, register_template_files
 from app.core import settings
+from app.utils.agent_templates import agent_templates
 from app.services.storage_cache import get_cached_storage, get_cached_memory_db, get_cached_custom_vector_db
-from app.utils import redis_client
+from app.services.CustomPgVectorDb import VectorSearchQuery
 from app.core.exceptions import InternalServerErrorException
+from app.utils import iterate_in_thread, memory_profiler, arun_agent, openai_models
 
 # -------------------- Environment Variables --------------------
 OPENAI_API_KEY = settings.OPENAI_API_KEY
@@ -32,26 +32,39 @@ CACHED_FILES = {
     "blog_topic_generation_prompt": "prompt_master_Semantic_TopicMap_Generator_v1.md",
     "blog_semantic_keyword_cluster_prompt": "prompt_master_SemanticKeywordCluster_ByBlogType_v1.md"
 }
+register_template_files(INSTRUCTION_COMMAND_FOLDER_NAME, CACHED_FILES)
 
 
 # -------------------- Async Load Instructions, Commands and SOPs --------------------
 async def load_instructions_and_commands(drive_service):
     """Load instructions and commands from Google Drive or Redis Cache asynchronously."""
 
-    content = {}
-    for key, file_name in CACHED_FILES.items():
-        cached_content = await redis_client.get_value_async(key)
-        if cached_content is None:
-            cached_content = await fetch_drive_file_content(drive_service, file_name,
-                                                            f"{INSTRUCTION_COMMAND_FOLDER_NAME}")
-            await redis_client.set_value_async(key, cached_content)
-        content[key] = cached_content
-
-    return content
+    return await load_cached_templates(drive_service, CACHED_FILES, INSTRUCTION_COMMAND_FOLDER_NAME)
 
 
 # -------------------- Initialize AI Agent --------------------
 
+agent_templates.register(
+    "blog",
+    Agent,
+    name="semantic_blog_writer",
+    description="Writes structured blog content using vector clustering and search intent mapping.",
+    task="Generate JSON-based blog outlines with entity-aligned H2s, intent tags, and grounded reference points.",
+    prevent_hallucinations=True,
+    add_context=True,
+    markdown=True,
+    add_chat_history_to_messages=False,
+    read_chat_history=False,
+    # num_history_responses=NUM_HISTORY_RESPONSES,
+    num_history_responses=0,
+    debug_mode=not IS_PROD,
+    prevent_prompt_leakage=True,
+    parse_response=True,
+    structured_outputs=True,
+    search_knowledge=False
+)
+
+
 async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> Agent:
     """Initialize the AI Agent asynchronously with knowledge and memory."""
 
@@ -74,27 +87,13 @@ async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> Agent
         num_memories=2,
     )
 
-    return Agent(
-        name="semantic_blog_writer",
-        description="Writes structured blog content using vector clustering and search intent mapping.",
-        task="Generate JSON-based blog outlines with entity-aligned H2s, intent tags, and grounded reference points.",
-        prevent_hallucinations=True,
+    return agent_templates.create(
+        "blog",
         knowledge=AgentKnowledge(vector_db=vector_db),
         storage=storage,
         session_id=session_id,
         user_id=user_id,
         agent_id=agent_id,
-        add_context=True,
-        markdown=True,
-        add_chat_history_to_messages=False,
-        read_chat_history=False,
-        # num_history_responses=NUM_HISTORY_RESPONSES,
-        num_history_responses=0,
-        debug_mode=not IS_PROD,
-        prevent_prompt_leakage=True,
-        parse_response=True,
-        structured_outputs=True,
-        search_knowledge=False,
         memory=memory
     )
 
@@ -107,12 +106,10 @@ async def prepare_agent_and_prompt(drive_service, **kwargs):
 
     agent = await get_agent(kwargs.get("session_id"), kwargs.get("agent_id"))
 
-    agent.model = OpenAIChat(
-        id=settings.OPENAI_LOWER_MODEL,
-        model=settings.OPENAI_LOWER_MODEL,
+    agent.model = openai_models.get(
+        settings.OPENAI_LOWER_MODEL,
         max_completion_tokens=10000,
         temperature=OPENAI_TEMP,
-        api_key=OPENAI_API_KEY,
         top_p=TOP_P,
         user=user_id,
         session_id=kwargs.get("session_id"),
@@ -219,21 +216,14 @@ async def fetch_filtered_knowledge(filters=None, is_vector_search=False):
     try:
         async def search_knowledge():
             if is_vector_search:
-                vector_db.default_limit = VECTOR_SEARCH_LIMIT
-                vector_db.search_type = SearchType.vector
-                vector_db.vector_score_weight = 1.0
-                vector_db.filters_args = filters
-                return await asyncio.to_thread(vector_db.vector_search, query="")
-            else:
-                vector_db.default_limit = VECTOR_SEARCH_LIMIT
-                vector_db.search_type = SearchType.keyword
-                vector_db.vector_score_weight = 0.0
-                vector_db.filters_args = filters
-                return await asyncio.to_thread(vector_db.keyword_search, query="")
-
-        search_results = await search_knowledge()
+                search_query = VectorSearchQuery(query="", search_type=SearchType.vector, limit=VECTOR_SEARCH_LIMIT,
+                                                 filters=filters, vector_score_weight=1.0)
+                return [r.content for r in await vector_db.arun_projected_query(search_query)]
+            # filter-only lookup, no ranking needed
+            return await vector_db.afetch_by_filters(filters, limit=VECTOR_SEARCH_LIMIT)
+
+        chunks = await search_knowledge()
         sep = "\n------------\n"
-        chunks = [chunk.content for chunk in search_results]
         return sep.join(chunks)
 
     except Exception as e:
@@ -274,33 +264,26 @@ async def execute_search_and_generate_response_stream(knowledge_context: Optiona
 
         del knowledge_context
         del combined_prompt
-        import gc
-        gc.collect()
-        print("Memory clean up before streaming")
-
-        # This will return an iterator (not async)
-        for chunk in agent.run(prompt, stream=True):
-            value = getattr(chunk, "content", chunk)
-
-            try:
-                # First try to parse it as JSON
-                parsed = json.loads(value) if isinstance(value, str) else value
-            except json.JSONDecodeError:
-                parsed = value  # fallback if it's not valid JSON
-
-            if isinstance(parsed, dict) and "response" in parsed:
-                for item in parsed["response"]:
-                    yield json.dumps(item)
-            elif isinstance(parsed, list):
-                for item in parsed:
-                    yield json.dumps(item)
-            else:
-                yield str(parsed)
-
-            await asyncio.sleep(0)
-        del prompt
-        gc.collect()
-        print("Memory cleaned up")
+
+        with memory_profiler.track("blog"):
+            # agent.run is a blocking iterator; drive it on a worker thread so the event loop stays free
+            async for chunk in iterate_in_thread(lambda: agent.run(prompt, stream=True)):
+                value = getattr(chunk, "content", chunk)
+
+                try:
+                    # First try to parse it as JSON
+                    parsed = json.loads(value) if isinstance(value, str) else value
+                except json.JSONDecodeError:
+                    parsed = value  # fallback if it's not valid JSON
+
+                if isinstance(parsed, dict) and "response" in parsed:
+                    for item in parsed["response"]:
+                        yield json.dumps(item)
+                elif isinstance(parsed, list):
+                    for item in parsed:
+                        yield json.dumps(item)
+                else:
+                    yield str(parsed)
     except Exception as e:
         raise InternalServerErrorException(f"Streaming error: {str(e)}")
 
@@ -314,7 +297,7 @@ async def execute_search_and_generate_response(knowledge_context: Optional[str]
 
     try:
         # Run the agent asynchronously
-        result = await asyncio.to_thread(agent.run, prompt)
+        result = await arun_agent(agent, prompt)
         if not IS_PROD:
             print(result.content)
     except Exception as e:
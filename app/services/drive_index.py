@@ -0,0 +1,177 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core import settings
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+FILE_FIELDS = "id, name, mimeType, parents, modifiedTime, md5Checksum, size"
+
+
+class DriveFolderIndex:
+    """
+    Cached Google Drive folder tree (folder id -> name/parents, path -> id) and per-folder file listings.
+
+    The tree is listed once, then kept current from the Drive changes feed, polled at most every
+    ``changes_poll_seconds`` when a lookup happens. If the feed is unavailable the whole index is
+    rebuilt after ``ttl_seconds``. Path resolution follows the original walk: the first segment matches
+    folders without visible parents, later segments match children of the previous folder.
+    """
+
+    def __init__(self, ttl_seconds: int, changes_poll_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.changes_poll_seconds = changes_poll_seconds
+        self._folders: Dict[str, Dict[str, Any]] = {}
+        self._children: Dict[str, List[str]] = {}
+        self._paths: Dict[str, Optional[str]] = {}
+        self._files: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._file_folders: Dict[str, List[str]] = {}
+        self._page_token: Optional[str] = None
+        self._loaded_at = 0.0
+        self._polled_at = 0.0
+        self._lock = asyncio.Lock()
+
+    # -------------------- Drive listing --------------------
+
+    @staticmethod
+    def _list_all(service, query: str, fields: str) -> List[Dict[str, Any]]:
+        items, page_token = [], None
+        while True:
+            result = service.files().list(
+                q=query,
+                fields=f"nextPageToken, files({fields})",
+                pageSize=1000,
+                pageToken=page_token,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True
+            ).execute()
+            items.extend(result.get("files", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return items
+
+    def _load_tree(self, service) -> None:
+        page_token = service.changes().getStartPageToken(supportsAllDrives=True).execute().get("startPageToken")
+        folders = self._list_all(service, f"mimeType = '{FOLDER_MIME_TYPE}' and trashed = false",
+                                 "id, name, parents")
+        self._folders = {folder["id"]: folder for folder in folders}
+        self._files.clear()
+        self._file_folders.clear()
+        self._rebuild_children()
+        self._page_token = page_token
+        self._loaded_at = self._polled_at = time.monotonic()
+
+    def _rebuild_children(self) -> None:
+        children: Dict[str, List[str]] = {}
+        for folder_id, folder in self._folders.items():
+            for parent_id in folder.get("parents") or ["root"]:
+                children.setdefault(parent_id, []).append(folder_id)
+        self._children = children
+        self._paths.clear()
+
+    def _forget_file(self, file_id: str) -> None:
+        for folder_id in self._file_folders.pop(file_id, []):
+            self._files.pop(folder_id, None)
+
+    def _apply_changes(self, service) -> None:
+        folders_changed = False
+        page_token = self._page_token
+        while page_token:
+            result = service.changes().list(
+                pageToken=page_token,
+                fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}, trashed))",
+                pageSize=1000,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True
+            ).execute()
+            for change in result.get("changes", []):
+                file_id = change.get("fileId")
+                file = change.get("file") or {}
+                gone = change.get("removed") or file.get("trashed")
+                if file.get("mimeType") == FOLDER_MIME_TYPE or file_id in self._folders:
+                    folders_changed = True
+                    if gone:
+                        self._folders.pop(file_id, None)
+                    else:
+                        self._folders[file_id] = {"id": file_id, "name": file["name"], "parents": file.get("parents")}
+                else:
+                    # Drop cached listings that held the file and the listings of its (new) parents
+                    self._forget_file(file_id)
+                    for parent_id in file.get("parents") or []:
+                        self._files.pop(parent_id, None)
+            if result.get("newStartPageToken"):
+                self._page_token = result["newStartPageToken"]
+                break
+            page_token = result.get("nextPageToken")
+        if folders_changed:
+            self._rebuild_children()
+        self._polled_at = time.monotonic()
+
+    async def _ensure_fresh(self, service) -> None:
+        now = time.monotonic()
+        if self._folders and now - self._polled_at < self.changes_poll_seconds:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._folders and now - self._polled_at < self.changes_poll_seconds:
+                return
+            if not self._folders or now - self._loaded_at >= self.ttl_seconds or not self._page_token:
+                await asyncio.to_thread(self._load_tree, service)
+                return
+            try:
+                await asyncio.to_thread(self._apply_changes, service)
+            except Exception as e:
+                print(f"❌ Drive changes feed failed, rebuilding folder index: {str(e)}")
+                await asyncio.to_thread(self._load_tree, service)
+
+    # -------------------- Lookups --------------------
+
+    def _resolve(self, folder_path: str) -> Optional[str]:
+        parent_id = "root"
+        for part in folder_path.strip("/").split("/"):
+            match = next((folder_id for folder_id in self._children.get(parent_id, [])
+                          if self._folders[folder_id]["name"].strip() == part), None)
+            if match is None:
+                print(f"Folder not found in path: {part}")
+                return None
+            parent_id = match
+        return parent_id
+
+    async def get_folder_id(self, service, folder_path: str) -> Optional[str]:
+        """
+        Resolve a slash-separated folder path to its Drive id.
+        """
+        if not folder_path:
+            return None
+        await self._ensure_fresh(service)
+        if folder_path not in self._paths:
+            self._paths[folder_path] = self._resolve(folder_path)
+        return self._paths[folder_path]
+
+    async def list_files(self, service, folder_id: str, refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        List the non-folder files directly in ``folder_id`` by name, with id, modifiedTime and md5Checksum.
+        """
+        await self._ensure_fresh(service)
+        if refresh or folder_id not in self._files:
+            files = await asyncio.to_thread(
+                self._list_all, service,
+                f"'{folder_id}' in parents and mimeType != '{FOLDER_MIME_TYPE}' and trashed = false", FILE_FIELDS
+            )
+            self._files[folder_id] = {file["name"]: file for file in files}
+            for file in files:
+                self._file_folders.setdefault(file["id"], []).append(folder_id)
+        return self._files[folder_id]
+
+    async def get_file_id(self, service, folder_id: str, file_name: str) -> Optional[str]:
+        """
+        Resolve a file name inside ``folder_id``; a miss re-lists the folder once in case the file is new.
+        """
+        file = (await self.list_files(service, folder_id)).get(file_name)
+        if file is None:
+            file = (await self.list_files(service, folder_id, refresh=True)).get(file_name)
+        return file["id"] if file else None
+
+
+# Create a global instance
+drive_folder_index = DriveFolderIndex(settings.DRIVE_INDEX_TTL_SECONDS, settings.DRIVE_CHANGES_POLL_SECONDS)
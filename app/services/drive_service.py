@@ -1,14 +1,18 @@
 import os
 import asyncio
 import json
-import aiofiles
+import threading
+import httplib2
 # from cryptography.fernet import Fernet
 from fastapi import APIRouter
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
 from google.oauth2.credentials import Credentials
 from google.oauth2 import service_account
 from app.core.exceptions import InternalServerErrorException, ResourceNotFoundException
+from app.services.drive_index import drive_folder_index
 from app.utils.file_helper import remove_file
 
 # from app.services import process_file
@@ -17,7 +21,11 @@ from app.utils.file_helper import remove_file
 router = APIRouter()
 
 TEMP_FOLDER = './temp_files'
-SECRETS_FOLDER = 'app/secrets'
+DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive"]
+
+# Process-wide Drive service, built once at startup (or injected, e.g. a local fake in tests)
+_system_drive_service = None
+_system_drive_service_lock = asyncio.Lock()
 
 
 # -------------------- Google Drive Async Service --------------------
@@ -28,35 +36,78 @@ async def get_google_drive_service(access_token: str):
     return build("drive", "v3", credentials=creds)
 
 
-async def get_google_drive_service_for_system():
-    """Get authenticated Google Drive service using a service account."""
-    try:
+class _PerThreadHttpRequest(HttpRequest):
+    """
+    HttpRequest that executes on the calling thread's Http rather than the one current when it was built.
+    """
+
+    def __init__(self, http_for_thread, *args, **kwargs):
+        super().__init__(http_for_thread(), *args, **kwargs)
+        self._http_for_thread = http_for_thread
+
+    def execute(self, http=None, num_retries=0):
+        return super().execute(http=http or self._http_for_thread(), num_retries=num_retries)
+
+
+def build_google_drive_service_for_system():
+    """
+    Build a Drive service from the SERVICE_ACCOUNT_JSON credentials held in memory.
 
-        service_account_json_str = os.getenv("SERVICE_ACCOUNT_JSON")
-        if not service_account_json_str:
-            raise InternalServerErrorException("Service account JSON not found in environment variables.")
+    The service is shared by every request. httplib2 connections are not thread-safe and Drive calls run on
+    asyncio.to_thread workers, so each worker thread keeps one authorized Http and reuses its keep-alive
+    connections across requests; google-auth refreshes the access token on those connections as it nears
+    expiry. The Http is picked when a request executes, so a request built on the event loop and executed
+    on a worker still uses the worker's own Http.
+    """
+    service_account_json_str = os.getenv("SERVICE_ACCOUNT_JSON")
+    if not service_account_json_str:
+        raise InternalServerErrorException("Service account JSON not found in environment variables.")
+
+    credentials = service_account.Credentials.from_service_account_info(
+        json.loads(service_account_json_str), scopes=DRIVE_SCOPES
+    )
+
+    thread_http = threading.local()
+
+    def authorized_http() -> AuthorizedHttp:
+        if not hasattr(thread_http, "http"):
+            thread_http.http = AuthorizedHttp(credentials, http=httplib2.Http())
+        return thread_http.http
+
+    def build_request(http, *args, **kwargs):
+        return _PerThreadHttpRequest(authorized_http, *args, **kwargs)
 
-        service_account_json = json.loads(service_account_json_str)
+    return build("drive", "v3", http=authorized_http(), requestBuilder=build_request, cache_discovery=False)
 
-        # Ensure the secrets directory exists
-        os.makedirs(SECRETS_FOLDER, exist_ok=True)
 
-        service_account_file_path = os.path.join(SECRETS_FOLDER, 'service_account.json')
+def set_google_drive_service_for_system(service) -> None:
+    """Install the process-wide Drive service, e.g. a local fake exposing the same files() API."""
+    global _system_drive_service
+    _system_drive_service = service
 
-        # Write JSON to file asynchronously
-        async with aiofiles.open(service_account_file_path, 'w') as file:
-            await file.write(json.dumps(service_account_json))
 
-        # Authenticate with Google API
-        credentials = service_account.Credentials.from_service_account_file(
-            service_account_file_path,
-            scopes=["https://www.googleapis.com/auth/drive"]
-        )
+async def init_google_drive_service_for_system():
+    """Build the process-wide Drive service once; called from lifespan at startup."""
+    global _system_drive_service
+    if _system_drive_service is None:
+        async with _system_drive_service_lock:
+            if _system_drive_service is None:
+                _system_drive_service = await asyncio.to_thread(build_google_drive_service_for_system)
+    return _system_drive_service
 
-        service = build("drive", "v3", credentials=credentials)
 
-        return service
+def download_drive_file(service, file_id: str) -> bytes:
+    """
+    Download a file's content. Run it on a worker thread: the request is built and executed there, so it
+    goes out on that thread's own Http (requests built on the event loop would share the loop thread's).
+    """
+    return service.files().get_media(fileId=file_id).execute()
+
 
+async def get_google_drive_service_for_system():
+    """Get the shared, authenticated Google Drive service for the service account."""
+    try:
+        return await init_google_drive_service_for_system()
     except Exception as e:
         raise InternalServerErrorException(f"Google Drive Authentication Failed: {str(e)}")
 
@@ -99,43 +150,10 @@ async def get_google_drive_service_for_system():
 #
 
 async def get_folder_id_by_name(service, folder_name):
-    """Retrieve Google Drive folder ID by folder name asynchronously."""
+    """Retrieve Google Drive folder ID by folder path asynchronously, from the cached folder index."""
 
     try:
-        if not folder_name:
-            return None
-
-        parts = folder_name.strip("/").split("/")
-
-        # Get all folders
-        result = await asyncio.to_thread(
-            lambda: service.files().list(
-                q="mimeType = 'application/vnd.google-apps.folder' and trashed = false",
-                fields="files(id, name, parents)",
-                supportsAllDrives=True,
-                includeItemsFromAllDrives=True
-            ).execute()
-        )
-        folders = result.get("files", [])
-
-        if not folders:
-            return None
-
-        parent_id = "root"
-        for part in parts:
-            found = False
-            for folder in folders:
-                folder_parents = folder.get("parents", [])
-                if folder["name"].strip() == part and (
-                        not folder_parents and parent_id == "root" or parent_id in folder_parents):
-                    parent_id = folder["id"]
-                    found = True
-                    break
-            if not found:
-                print(f"Folder not found in path: {part}")
-                return None
-
-        return parent_id
+        return await drive_folder_index.get_folder_id(service, folder_name)
     except HttpError as e:
         raise InternalServerErrorException(f"Google Drive Error: {str(e)}")
 
@@ -149,19 +167,13 @@ async def fetch_drive_file_content(service, file_name, folder_name):
             raise ResourceNotFoundException(f"Folder '{folder_name}' not found.")
 
         # Get file ID
-        file_query = f"'{folder_id}' in parents and name = '{file_name}' and trashed = false"
-        # file_results = await asyncio.to_thread(service.files().list, q=file_query, fields="files(id)").execute()
-        file_results = await asyncio.to_thread(
-            lambda: service.files().list(q=file_query, fields="files(id)").execute()
-        )
-        file_id = file_results["files"][0]["id"] if file_results["files"] else None
+        file_id = await drive_folder_index.get_file_id(service, folder_id, file_name)
 
         if not file_id:
             raise ResourceNotFoundException(f"File '{file_name}' not found in folder '{folder_name}'.")
 
         # Retrieve file content
-        request = service.files().get_media(fileId=file_id)
-        file_content = await asyncio.to_thread(request.execute)
+        file_content = await asyncio.to_thread(download_drive_file, service, file_id)
 
         return file_content.decode("utf-8")
 
@@ -236,17 +248,7 @@ async def fetch_all_image_links_from_drive_folder(service, folder_path: str, all
         if not folder_id:
             raise ResourceNotFoundException(f"Folder '{folder_path}' not found.")
 
-        query = f"'{folder_id}' in parents and trashed = false"
-        results = await asyncio.to_thread(
-            lambda: service.files().list(
-                q=query,
-                fields="files(id, name, mimeType)",
-                supportsAllDrives=True,
-                includeItemsFromAllDrives=True
-            ).execute()
-        )
-
-        files = results.get("files", [])
+        files = (await drive_folder_index.list_files(service, folder_id)).values()
         image_links = []
 
         for file in files:
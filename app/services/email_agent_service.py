@@ -7,15 +7,17 @@ from phi.agent import Agent
 # from phi.memory import AgentMemory
 # from phi.memory.agent import MemoryRetrieval
 # from phi.memory.db.postgres import PgMemoryDb
-from phi.model.openai import OpenAIChat
 from phi.knowledge.agent import AgentKnowledge
 # from phi.storage.agent.postgres import PgAgentStorage
 from phi.vectordb.pgvector import SearchType
 from app.core.context import loggedin_user_var
-from app.services.drive_service import fetch_drive_file_content, fetch_all_image_links_from_drive_folder
+from app.services.drive_service import fetch_all_image_links_from_drive_folder
+from app.services.redis_service import load_cached_templates, register_template_files
 from app.core import settings
+from app.utils.agent_templates import agent_templates
 from app.services.storage_cache import get_cached_storage, get_cached_custom_vector_db
-from app.utils import redis_client
+from app.services.CustomPgVectorDb import VectorSearchQuery
+from app.utils import template_cache, iterate_in_thread, JsonArrayStreamParser, memory_profiler, arun_agent, openai_models
 from app.core.exceptions import InternalServerErrorException, ResourceNotFoundException
 
 # import time
@@ -41,6 +43,7 @@ CACHED_FILES = {
     # "email_agent_context": "agent_context.md",
     "email_agent_additional_context": "agent_additional_context.md"
 }
+register_template_files(INSTRUCTION_COMMAND_FOLDER_NAME, CACHED_FILES)
 folder_names = settings.EMAIL_FOLDERS
 
 
@@ -48,23 +51,14 @@ folder_names = settings.EMAIL_FOLDERS
 async def load_instructions_and_commands(drive_service):
     """Load instructions and commands from Google Drive or Redis Cache asynchronously."""
 
-    content = {}
-    for key, file_name in CACHED_FILES.items():
-        cached_content = await redis_client.get_value_async(key)
-        if cached_content is None:
-            cached_content = await fetch_drive_file_content(drive_service, file_name,
-                                                            f"{INSTRUCTION_COMMAND_FOLDER_NAME}")
-            await redis_client.set_value_async(key, cached_content)
-        content[key] = cached_content
-
-    return content
+    return await load_cached_templates(drive_service, CACHED_FILES, INSTRUCTION_COMMAND_FOLDER_NAME)
 
 
 async def load_sop_templates(drive_service, folder_name: str):
     """Load base64 images from Redis Cache or Google Drive asynchronously."""
 
     redis_key = f"email_sop_templates_{folder_name}"
-    cached_images = await redis_client.get_value_async(redis_key)
+    cached_images = await template_cache.get_async(redis_key)
 
     if cached_images is not None:
         try:
@@ -75,13 +69,34 @@ async def load_sop_templates(drive_service, folder_name: str):
         images = await fetch_all_image_links_from_drive_folder(
             drive_service, f"{INSTRUCTION_COMMAND_FOLDER_NAME}/{folder_name}"
         )
-        await redis_client.set_value_async(redis_key, json.dumps(images))
+        await template_cache.set_async(redis_key, json.dumps(images))
 
     return images
 
 
 # -------------------- Initialize AI Agent --------------------
 
+agent_templates.register(
+    "email",
+    Agent,
+    name="email_ui_component_generator",
+    description="Generates structured UI components from promotional email layout images.",
+    task="Extract atomic UI blocks from uploaded email templates using predefined internal component schema.",
+    prevent_hallucinations=True,
+    add_context=True,
+    # search_knowledge=False,
+    markdown=True,
+    add_chat_history_to_messages=False,
+    read_chat_history=False,
+    # update_knowledge=True,
+    num_history_responses=0,
+    debug_mode=not IS_PROD,
+    prevent_prompt_leakage=True,
+    parse_response=True,
+    structured_outputs=True
+)
+
+
 async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> Agent:
     """Initialize the AI Agent asynchronously with knowledge and memory."""
 
@@ -91,27 +106,13 @@ async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> Agent
     vector_db = get_cached_custom_vector_db(dim3_value, SYNC_DB_STR, SearchType.vector, VECTOR_SEARCH_LIMIT)
     storage = get_cached_storage(dim3_value)
 
-    return Agent(
-        name="email_ui_component_generator",
-        description="Generates structured UI components from promotional email layout images.",
-        task="Extract atomic UI blocks from uploaded email templates using predefined internal component schema.",
-        prevent_hallucinations=True,
+    return agent_templates.create(
+        "email",
         knowledge=AgentKnowledge(vector_db=vector_db),
         storage=storage,
         session_id=session_id,
         user_id=user_id,
-        agent_id=agent_id,
-        add_context=True,
-        # search_knowledge=False,
-        markdown=True,
-        add_chat_history_to_messages=False,
-        read_chat_history=False,
-        # update_knowledge=True,
-        num_history_responses=0,
-        debug_mode=not IS_PROD,
-        prevent_prompt_leakage=True,
-        parse_response=True,
-        structured_outputs=True
+        agent_id=agent_id
     )
 
 
@@ -127,12 +128,10 @@ async def prepare_agent_and_prompt(drive_service, **kwargs):
 
     agent, sop_images_links = await asyncio.gather(agent_task, images_task)
 
-    agent.model = OpenAIChat(
-        id=OPENAI_MODEL,
-        model=OPENAI_MODEL,
+    agent.model = openai_models.get(
+        OPENAI_MODEL,
         max_completion_tokens=2000,
         temperature=OPENAI_TEMP,
-        api_key=OPENAI_API_KEY,
         top_p=TOP_P,
         user=user_id,
         session_id=kwargs.get("session_id"),
@@ -261,27 +260,15 @@ async def fetch_filtered_knowledge(filters=None, is_vector_search=False, vector_
     try:
         async def search_knowledge():
             if is_vector_search:
-                vector_db.default_limit = 1
-                vector_db.search_type = SearchType.vector
-                vector_db.vector_score_weight = 1.0
-                vector_db.filters_args = filters
-                return await asyncio.to_thread(vector_db.vector_search, query=vector_search_by)
-            else:
-                vector_db.default_limit = settings.VECTOR_SEARCH_LIMIT
-                vector_db.search_type = SearchType.keyword
-                vector_db.vector_score_weight = 0.0
-                vector_db.filters_args = filters
-                return await asyncio.to_thread(vector_db.keyword_search, query="")
-                # if results and len(results) > 0:
-                #     first_doc_name = results[0].name
-                #     filtered_docs = [doc for doc in results if doc.name == first_doc_name]
-                #     return sorted(filtered_docs, key=lambda d: d.meta_data.get("chunk", 0))
-                # else:
-                #     return []
+                search_query = VectorSearchQuery(query=vector_search_by, search_type=SearchType.vector, limit=1,
+                                                 filters=filters, vector_score_weight=1.0)
+                return [r.content for r in await vector_db.arun_projected_query(search_query)]
+            # filter-only lookup, no ranking needed
+            return await vector_db.afetch_by_filters(filters, limit=settings.VECTOR_SEARCH_LIMIT)
 
         search_results = await search_knowledge()
 
-        return "\n".join([doc.content for doc in search_results if hasattr(doc, "content")]) or ""
+        return "\n".join(search_results) or ""
 
     except Exception as e:
         raise InternalServerErrorException(f"Error fetching knowledge: {str(e)}")
@@ -329,66 +316,27 @@ async def execute_search_and_generate_response_stream(knowledge_context: Optiona
         del knowledge_context
         del combined_prompt
         del best_practise_context
-        import gc
-        gc.collect()
-        print("Memory clean up before streaming")
 
         component_library_link = "https://fouray-development.s3.us-east-1.amazonaws.com/Email/Component_Reference.png"
 
         images = [template_link, component_library_link] + sop_images_links
 
-        buffer = ""
-        inside_array = False
-        brace_depth = 0
-        object_buffer = ""
-        # This will return an iterator (not async)
-        for chunk in agent.run(prompt, images=images, stream=True):
-            # do not remove below comments, they are useful for debugging
-            # if hasattr(chunk, "content"):
-            #     yield chunk.content  # Working
-            # await asyncio.sleep(0)  # Let the event loop breathe
-            value = getattr(chunk, "content", chunk)
-            if not isinstance(value, str):
-                continue
-
-            buffer += value
-
-            # Wait until we find the start of the "response": [ section
-            if not inside_array and "[" in buffer:
-                inside_array = True
-                buffer = buffer.split("[", 1)[1]
-                continue
-
-            if inside_array:
-                for char in value:
-                    if char == "{":
-                        if brace_depth == 0:
-                            object_buffer = ""
-                        brace_depth += 1
-                        object_buffer += char
-                    elif char == "}":
-                        brace_depth -= 1
-                        object_buffer += char
-                        if brace_depth == 0:
-                            try:
-                                obj = json.loads(object_buffer)
-                                yield f"data: {json.dumps(obj)}\n\n"
-                                await asyncio.sleep(0.01)
-                            except json.JSONDecodeError:
-                                # malformed or partial
-                                pass
-                            object_buffer = ""
-                    elif brace_depth > 0:
-                        object_buffer += char
-
-            await asyncio.sleep(0)
-        del prompt
-        del buffer
-        del inside_array
-        del brace_depth
-        del object_buffer
-        gc.collect()
-        print("Memory cleaned up")
+        with memory_profiler.track("email"):
+            parser = JsonArrayStreamParser()
+            # agent.run is a blocking iterator; drive it on a worker thread so the event loop stays free
+            async for chunk in iterate_in_thread(lambda: agent.run(prompt, images=images, stream=True)):
+                # do not remove below comments, they are useful for debugging
+                # if hasattr(chunk, "content"):
+                #     yield chunk.content  # Working
+                # await asyncio.sleep(0)  # Let the event loop breathe
+                value = getattr(chunk, "content", chunk)
+                if not isinstance(value, str):
+                    continue
+
+                for obj in parser.feed(value):
+                    yield json.dumps(obj)
+            for obj in parser.close():
+                yield json.dumps(obj)
 
     except Exception as e:
         raise InternalServerErrorException(f"Streaming error: {str(e)}")
@@ -413,7 +361,7 @@ async def execute_search_and_generate_response(knowledge_context: Optional[str]
 
     try:
         # Run the agent asynchronously
-        result = await asyncio.to_thread(agent.run, prompt, images=images)
+        result = await arun_agent(agent, prompt, images=images)
         if not IS_PROD:
             print(result.content)
     except Exception as e:
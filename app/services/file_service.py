@@ -5,7 +5,7 @@ import asyncio
 import pandas as pd
 from PIL import Image, ImageEnhance, ImageFilter
 from app.services.knowledge_base_service import load_knowledge_base
-from app.utils import save_file, preprocess_markdown, preprocess_text_using_openai, AgentManager
+from app.utils import save_file, preprocess_markdown, preprocess_text_using_openai, agent_manager, arun_agent
 from app.utils.file_helper import remove_file, extract_docx_text_and_images_async, convert_image_to_base64
 from docx import Document
 import fitz
@@ -13,8 +13,6 @@ from PIL import Image
 import os
 import base64
 
-manager_agent = AgentManager()
-
 
 async def process_file(file, file_extension, is_file_already_saved=False, filters=None, dim3_value: str = None) -> None:
     path_name = file if is_file_already_saved else await save_file(file)
@@ -76,7 +74,7 @@ async def process_file(file, file_extension, is_file_already_saved=False, filter
 
 
     elif file_extension in {'mp3', 'mp4', 'mpeg', 'mpga', 'wav', 'webm', 'm4a'}:
-        summary = await manager_agent.summarize_audio(path_name)
+        summary = await agent_manager.summarize_audio(path_name)
         txt_path = path_name.replace(Path(path_name).suffix, '.txt')
         async with aiofiles.open(txt_path, 'w', encoding='utf-8') as temp_file:
             await temp_file.write(summary)
@@ -93,13 +91,13 @@ async def process_image(dim3_value, filters, path_name, base64_image=None):
     if base64_image is None:
         base64_image = await asyncio.to_thread(convert_image_to_base64, Path(path_name))
 
-    agent = await manager_agent.get_image_to_text_agent()
+    agent = await agent_manager.get_image_to_text_agent()
     response = None
     for _ in range(2):
-        response = await asyncio.to_thread(agent.run,
-                                           message="Analyze this image and return a description, extracted text, and any meaning or logic if present.",
-                                           images=[base64_image]
-                                           )
+        response = await arun_agent(agent,
+                                    message="Analyze this image and return a description, extracted text, and any meaning or logic if present.",
+                                    images=[base64_image]
+                                    )
         if response.content and "unable to assist" not in response.content.lower():
             break
         await asyncio.sleep(1)
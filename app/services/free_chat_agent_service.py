@@ -1,15 +1,16 @@
 import json
-import asyncio
 import re
 from typing import Optional
 from phi.agent import Agent
-from phi.model.openai import OpenAIChat
 from phi.knowledge.agent import AgentKnowledge
 from phi.vectordb.pgvector import SearchType
 from app.core.context import loggedin_user_var
 from app.core import settings
+from app.utils.agent_templates import agent_templates
 from app.services.storage_cache import get_cached_storage, get_cached_custom_vector_db
+from app.services.CustomPgVectorDb import VectorSearchQuery
 from app.core.exceptions import InternalServerErrorException
+from app.utils import iterate_in_thread, JsonArrayStreamParser, memory_profiler, arun_agent, openai_models
 
 # -------------------- Environment Variables --------------------
 OPENAI_API_KEY = settings.OPENAI_API_KEY
@@ -25,6 +26,26 @@ IS_PROD = settings.ENV == "prod"
 
 # -------------------- Initialize AI Agent --------------------
 
+agent_templates.register(
+    "free_chat",
+    Agent,
+    name="free_chat_assistant",
+    description="A general purpose AI assistant for free-form conversations with vector search capabilities.",
+    task="Provide helpful responses to user queries using knowledge base search when appropriate.",
+    prevent_hallucinations=True,
+    add_context=True,
+    search_knowledge=True,
+    markdown=True,
+    add_chat_history_to_messages=True,
+    read_chat_history=True,
+    num_history_responses=NUM_HISTORY_RESPONSES,
+    debug_mode=not IS_PROD,
+    prevent_prompt_leakage=True,
+    parse_response=True,
+    structured_outputs=True
+)
+
+
 async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> Agent:
     """Initialize the AI Agent asynchronously with knowledge and memory."""
 
@@ -34,26 +55,13 @@ async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> Agent
     vector_db = get_cached_custom_vector_db(dim3_value, SYNC_DB_STR, SearchType.vector, VECTOR_SEARCH_LIMIT)
     storage = get_cached_storage(dim3_value)
 
-    return Agent(
-        name="free_chat_assistant",
-        description="A general purpose AI assistant for free-form conversations with vector search capabilities.",
-        task="Provide helpful responses to user queries using knowledge base search when appropriate.",
-        prevent_hallucinations=True,
+    return agent_templates.create(
+        "free_chat",
         knowledge=AgentKnowledge(vector_db=vector_db),
         storage=storage,
         session_id=session_id,
         user_id=user_id,
-        agent_id=agent_id,
-        add_context=True,
-        search_knowledge=True,
-        markdown=True,
-        add_chat_history_to_messages=True,
-        read_chat_history=True,
-        num_history_responses=NUM_HISTORY_RESPONSES,
-        debug_mode=not IS_PROD,
-        prevent_prompt_leakage=True,
-        parse_response=True,
-        structured_outputs=True
+        agent_id=agent_id
     )
 
 
@@ -71,12 +79,10 @@ async def ask_fouray_free_chat_stream(drive_service, **kwargs):
         current_user = loggedin_user_var.get()
         user_id = str(current_user.id)
 
-        agent.model = OpenAIChat(
-            id=OPENAI_MODEL,
-            model=OPENAI_MODEL,
+        agent.model = openai_models.get(
+            OPENAI_MODEL,
             max_completion_tokens=2000,
             temperature=OPENAI_TEMP,
-            api_key=OPENAI_API_KEY,
             top_p=TOP_P,
             user=user_id,
             session_id=kwargs.get("session_id"),
@@ -116,12 +122,10 @@ async def ask_fouray_free_chat(drive_service, **kwargs):
         current_user = loggedin_user_var.get()
         user_id = str(current_user.id)
 
-        agent.model = OpenAIChat(
-            id=OPENAI_MODEL,
-            model=OPENAI_MODEL,
+        agent.model = openai_models.get(
+            OPENAI_MODEL,
             max_completion_tokens=2000,
             temperature=OPENAI_TEMP,
-            api_key=OPENAI_API_KEY,
             top_p=TOP_P,
             user=user_id,
             session_id=kwargs.get("session_id"),
@@ -159,20 +163,14 @@ async def fetch_filtered_knowledge(filters=None, is_vector_search=False, vector_
     try:
         async def search_knowledge():
             if is_vector_search:
-                vector_db.default_limit = 5
-                vector_db.search_type = SearchType.vector
-                vector_db.vector_score_weight = 1.0
-                vector_db.filters_args = filters
-                return await asyncio.to_thread(vector_db.vector_search, query=vector_search_by)
-            else:
-                vector_db.default_limit = settings.VECTOR_SEARCH_LIMIT
-                vector_db.search_type = SearchType.keyword
-                vector_db.vector_score_weight = 0.0
-                vector_db.filters_args = filters
-                return await asyncio.to_thread(vector_db.keyword_search, query="")
+                search_query = VectorSearchQuery(query=vector_search_by, search_type=SearchType.vector, limit=5,
+                                                 filters=filters, vector_score_weight=1.0)
+                return [r.content for r in await vector_db.arun_projected_query(search_query)]
+            # filter-only lookup, no ranking needed
+            return await vector_db.afetch_by_filters(filters, limit=settings.VECTOR_SEARCH_LIMIT)
 
         search_results = await search_knowledge()
-        return "\n".join([doc.content for doc in search_results if hasattr(doc, "content")]) or ""
+        return "\n".join(search_results) or ""
 
     except Exception as e:
         raise InternalServerErrorException(f"Error fetching knowledge: {str(e)}")
@@ -218,59 +216,19 @@ async def execute_search_and_generate_response_stream(agent: Agent = None, promp
     agent.search_knowledge = False
 
     try:
-        import gc
-        gc.collect()
-        print("Memory clean up before streaming")
-
-        buffer = ""
-        inside_array = False
-        brace_depth = 0
-        object_buffer = ""
-        # This will return an iterator (not async)
-        for chunk in agent.run(prompt, images=images, stream=True):
-
-            value = getattr(chunk, "content", chunk)
-            if not isinstance(value, str):
-                continue
-
-            buffer += value
-
-            # Wait until we find the start of the "response": [ section
-            if not inside_array and "[" in buffer:
-                inside_array = True
-                buffer = buffer.split("[", 1)[1]
-                continue
-
-            if inside_array:
-                for char in value:
-                    if char == "{":
-                        if brace_depth == 0:
-                            object_buffer = ""
-                        brace_depth += 1
-                        object_buffer += char
-                    elif char == "}":
-                        brace_depth -= 1
-                        object_buffer += char
-                        if brace_depth == 0:
-                            try:
-                                obj = json.loads(object_buffer)
-                                yield f"data: {json.dumps(obj)}\n\n"
-                                await asyncio.sleep(0.01)
-                            except json.JSONDecodeError:
-                                # malformed or partial
-                                pass
-                            object_buffer = ""
-                    elif brace_depth > 0:
-                        object_buffer += char
-
-            await asyncio.sleep(0)
-        del prompt
-        del buffer
-        del inside_array
-        del brace_depth
-        del object_buffer
-        gc.collect()
-        print("Memory cleaned up")
+        with memory_profiler.track("free_chat"):
+            parser = JsonArrayStreamParser()
+            # agent.run is a blocking iterator; drive it on a worker thread so the event loop stays free
+            async for chunk in iterate_in_thread(lambda: agent.run(prompt, images=images, stream=True)):
+
+                value = getattr(chunk, "content", chunk)
+                if not isinstance(value, str):
+                    continue
+
+                for obj in parser.feed(value):
+                    yield json.dumps(obj)
+            for obj in parser.close():
+                yield json.dumps(obj)
 
     except Exception as e:
         raise InternalServerErrorException(f"Streaming error: {str(e)}")
@@ -282,7 +240,7 @@ async def execute_search_and_generate_response(agent: Agent, prompt: str, images
     """
     try:
         # Run the agent asynchronously
-        result = await asyncio.to_thread(agent.run, prompt, images=images or [])
+        result = await arun_agent(agent, prompt, images=images or [])
         if not IS_PROD:
             print(result.content)
         return extract_json(result.content)
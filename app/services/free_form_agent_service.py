@@ -1,19 +1,18 @@
 import json
-import asyncio
 import re
 from typing import Optional
 from phi.agent import Agent
 from phi.memory import AgentMemory
 from phi.memory.agent import MemoryRetrieval
-from phi.model.openai import OpenAIChat
 from phi.knowledge.agent import AgentKnowledge
 from phi.vectordb.pgvector import SearchType
 from app.core.context import loggedin_user_var
-from app.services.drive_service import fetch_drive_file_content
+from app.services.redis_service import load_cached_templates, register_template_files
 from app.core import settings
+from app.utils.agent_templates import agent_templates
 from app.services.storage_cache import get_cached_storage, get_cached_memory_db, get_cached_custom_vector_db
-from app.utils import redis_client
 from app.core.exceptions import InternalServerErrorException
+from app.utils import iterate_in_thread, memory_profiler, openai_models
 
 # -------------------- Environment Variables --------------------
 OPENAI_API_KEY = settings.OPENAI_API_KEY
@@ -28,26 +27,38 @@ IS_PROD = settings.ENV == "prod"
 CACHED_FILES = {
     "free_form_commands_content": "free_form_commands.md"
 }
+register_template_files(FOLDER_NAME, CACHED_FILES)
 
 
 # -------------------- Async Load Instructions, Commands and SOPs --------------------
 async def load_instructions_and_commands(drive_service):
     """Load instructions and commands from Google Drive or Redis Cache asynchronously."""
 
-    content = {}
-    for key, file_name in CACHED_FILES.items():
-        cached_content = await redis_client.get_value_async(key)
-        if cached_content is None:
-            cached_content = await fetch_drive_file_content(drive_service, file_name,
-                                                            f"{FOLDER_NAME}")
-            await redis_client.set_value_async(key, cached_content)
-        content[key] = cached_content
-
-    return content
+    return await load_cached_templates(drive_service, CACHED_FILES, FOLDER_NAME)
 
 
 # -------------------- Initialize AI Agent --------------------
 
+agent_templates.register(
+    "free_form",
+    Agent,
+    name="ayurvedic_content_generator ",
+    description="Expert Ayurvedic practitioner that generates professional HTML-formatted content for any Ayurvedic question or topic, from simple answers to comprehensive guides, optimized for React.js rendering.",
+    task="Create accurate, culturally-sensitive Ayurvedic content in professional HTML format with inline CSS styling, adapting response length and structure based on user queries while maintaining educational value and safety considerations.",
+    prevent_hallucinations=True,
+    add_context=False,
+    markdown=True,
+    add_chat_history_to_messages=False,
+    read_chat_history=False,
+    num_history_responses=0,
+    debug_mode=not IS_PROD,
+    prevent_prompt_leakage=True,
+    search_knowledge=False,
+    structured_outputs=True,
+    parse_response=True
+)
+
+
 async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> Agent:
     """Initialize the AI Agent asynchronously with knowledge and memory."""
 
@@ -57,26 +68,13 @@ async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> Agent
     vector_db = get_cached_custom_vector_db(dim3_value, SYNC_DB_STR, SearchType.vector, VECTOR_SEARCH_LIMIT)
     storage = get_cached_storage(dim3_value)
 
-    return Agent(
-        name="ayurvedic_content_generator ",
-        description="Expert Ayurvedic practitioner that generates professional HTML-formatted content for any Ayurvedic question or topic, from simple answers to comprehensive guides, optimized for React.js rendering.",
-        task="Create accurate, culturally-sensitive Ayurvedic content in professional HTML format with inline CSS styling, adapting response length and structure based on user queries while maintaining educational value and safety considerations.",
-        prevent_hallucinations=True,
+    return agent_templates.create(
+        "free_form",
         knowledge=AgentKnowledge(vector_db=vector_db),
         storage=storage,
         session_id=session_id,
         user_id=user_id,
-        agent_id=agent_id,
-        add_context=False,
-        markdown=True,
-        add_chat_history_to_messages=False,
-        read_chat_history=False,
-        num_history_responses=0,
-        debug_mode=not IS_PROD,
-        prevent_prompt_leakage=True,
-        search_knowledge=False,
-        structured_outputs=True,
-        parse_response=True
+        agent_id=agent_id
     )
 
 
@@ -88,12 +86,10 @@ async def prepare_agent_and_prompt(drive_service, **kwargs):
 
     agent = await get_agent(kwargs.get("session_id"), kwargs.get("agent_id"))
 
-    agent.model = OpenAIChat(
-        id="gpt-4o-mini",
-        model="gpt-4o-mini",
+    agent.model = openai_models.get(
+        "gpt-4o-mini",
         max_completion_tokens=5000,
         temperature=OPENAI_TEMP,
-        api_key=OPENAI_API_KEY,
         top_p=TOP_P,
         user=user_id,
         session_id=kwargs.get("session_id"),
@@ -158,32 +154,25 @@ async def execute_search_and_generate_response_stream(knowledge_context: Optiona
 
         del knowledge_context
         del combined_prompt
-        import gc
-        gc.collect()
-        print("Memory clean up before streaming")
-
-        # This will return an iterator (not async)
-        for chunk in agent.run(prompt, stream=True, images=images if images else None):
-            value = getattr(chunk, "content", chunk)
-
-            try:
-                # First try to parse it as JSON
-                parsed = json.loads(value) if isinstance(value, str) else value
-            except json.JSONDecodeError:
-                parsed = value  # fallback if it's not valid JSON
-
-            if isinstance(parsed, dict) and "response" in parsed:
-                for item in parsed["response"]:
-                    yield json.dumps(item)
-            elif isinstance(parsed, list):
-                for item in parsed:
-                    yield json.dumps(item)
-            else:
-                yield str(parsed)
-
-            await asyncio.sleep(0)
-        del prompt
-        gc.collect()
-        print("Memory cleaned up")
+
+        with memory_profiler.track("free_form"):
+            # agent.run is a blocking iterator; drive it on a worker thread so the event loop stays free
+            async for chunk in iterate_in_thread(lambda: agent.run(prompt, stream=True, images=images if images else None)):
+                value = getattr(chunk, "content", chunk)
+
+                try:
+                    # First try to parse it as JSON
+                    parsed = json.loads(value) if isinstance(value, str) else value
+                except json.JSONDecodeError:
+                    parsed = value  # fallback if it's not valid JSON
+
+                if isinstance(parsed, dict) and "response" in parsed:
+                    for item in parsed["response"]:
+                        yield json.dumps(item)
+                elif isinstance(parsed, list):
+                    for item in parsed:
+                        yield json.dumps(item)
+                else:
+                    yield str(parsed)
     except Exception as e:
         raise InternalServerErrorException(f"Streaming error: {str(e)}")
@@ -56,3 +56,8 @@ async def load_knowledge_base(path_name, db_name, file_type, urls=None, filters=
 
     # ✅ Async wrapper for IO-bound loading operation
     await asyncio.to_thread(knowledge_base.load, upsert=True, filters=filters)
+    # Build the tenant's ANN index once the table is large enough (no-op when it already exists)
+    try:
+        await asyncio.to_thread(vector_db.ensure_vector_index)
+    except Exception as e:
+        print(f"❌ Error building vector index for {db_name}: {str(e)}")
@@ -1,5 +1,4 @@
 import json
-import asyncio
 import re
 from typing import Optional
 from phi.agent import Agent
@@ -8,17 +7,18 @@ from phi.memory.agent import MemoryRetrieval
 # from phi.memory import AgentMemory
 # from phi.memory.agent import MemoryRetrieval
 # from phi.memory.db.postgres import PgMemoryDb
-from phi.model.openai import OpenAIChat
 from phi.knowledge.agent import AgentKnowledge
 # from phi.reranker.cohere import CohereReranker
 # from phi.storage.agent.postgres import PgAgentStorage
 from phi.vectordb.pgvector import SearchType
 from app.core.context import loggedin_user_var
 from app.services.LegalGVAgent import LegalGVAgent
-from app.services.drive_service import fetch_drive_file_content
+from app.services.redis_service import load_cached_templates, register_template_files
 from app.core import settings
+from app.utils.agent_templates import agent_templates
 from app.services.storage_cache import get_cached_storage, get_cached_custom_vector_db, get_cached_memory_db
-from app.utils import redis_client, AgentManager
+from app.services.CustomPgVectorDb import VectorSearchQuery
+from app.utils import iterate_in_thread, JsonArrayStreamParser, memory_profiler, arun_agent, openai_models
 from app.core.exceptions import InternalServerErrorException
 
 # import time
@@ -34,6 +34,13 @@ TOP_P = 0.9
 NUM_HISTORY_RESPONSES = settings.NUM_HISTORY_RESPONSES
 VECTOR_SEARCH_LIMIT = 45
 IS_PROD = settings.ENV == "prod"
+CACHED_FILES = {
+    "gv_instructions_content": settings.INSTRUCTIONS_FILE_NAME,
+    "gv_commands_content": settings.COMMANDS_FILE_NAME,
+    "gv_agent_config_key": settings.AGENT_CONFIG_FILE_NAME,
+}
+# Niche-specific context files are added to the sync manifest as they are first loaded
+register_template_files(INSTRUCTION_COMMAND_FOLDER_NAME, CACHED_FILES)
 
 
 # -------------------- Async Load Instructions & Commands --------------------
@@ -42,26 +49,38 @@ async def load_instructions_and_commands(drive_service, niche: str):
     """Load instructions and commands from Google Drive or Redis Cache asynchronously."""
 
     key_files = {
-        "gv_instructions_content": settings.INSTRUCTIONS_FILE_NAME,
-        "gv_commands_content": settings.COMMANDS_FILE_NAME,
-        "gv_agent_config_key": settings.AGENT_CONFIG_FILE_NAME,
+        **CACHED_FILES,
         f"gv_agent_{niche}_context_key": settings.AGENT_CONTEXT_FILE_NAME.format(niche=niche),
         f"gv_agent_{niche}_additional_context_key": settings.AGENT_ADDITIONAL_CONTEXT_FILE_NAME.format(niche=niche),
     }
 
-    content = {}
-    for key, file_name in key_files.items():
-        cached_content = await redis_client.get_value_async(key)
-        if cached_content is None:
-            cached_content = await fetch_drive_file_content(drive_service, file_name, INSTRUCTION_COMMAND_FOLDER_NAME)
-            await redis_client.set_value_async(key, cached_content)
-        content[key] = cached_content
-
-    return content
+    return await load_cached_templates(drive_service, key_files, INSTRUCTION_COMMAND_FOLDER_NAME)
 
 
 # -------------------- Initialize AI Agent --------------------
 
+agent_templates.register(
+    "legal_gv",
+    LegalGVAgent,
+    name="far_function_mapper",
+    description="AI agent designed to assist with legal and financial document analysis, function mapping, and knowledge extraction.",
+    task="Analyze provided documents and generate structured insights for legal, compliance, or regulatory use cases.",
+    prevent_hallucinations=True,
+    add_context=True,
+    search_knowledge=False,
+    markdown=True,
+    add_chat_history_to_messages=False,
+    read_chat_history=False,
+    update_knowledge=True,
+    num_history_responses=0,
+    debug_mode=not IS_PROD,
+    # reasoning=True,
+    prevent_prompt_leakage=True,
+    parse_response=True,
+    structured_outputs=True
+)
+
+
 async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> LegalGVAgent:
     """Initialize the AI Agent asynchronously with knowledge and memory."""
 
@@ -84,29 +103,14 @@ async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> Legal
         num_memories=5,
     )
 
-    return LegalGVAgent(
-        name="far_function_mapper",
-        description="AI agent designed to assist with legal and financial document analysis, function mapping, and knowledge extraction.",
-        task="Analyze provided documents and generate structured insights for legal, compliance, or regulatory use cases.",
-        prevent_hallucinations=True,
+    return agent_templates.create(
+        "legal_gv",
         knowledge=AgentKnowledge(vector_db=vector_db),
         memory=memory,
         storage=storage,
         session_id=session_id,
         user_id=user_id,
-        agent_id=agent_id,
-        add_context=True,
-        search_knowledge=False,
-        markdown=True,
-        add_chat_history_to_messages=False,
-        read_chat_history=False,
-        update_knowledge=True,
-        num_history_responses=0,
-        debug_mode=not IS_PROD,
-        # reasoning=True,
-        prevent_prompt_leakage=True,
-        parse_response=True,
-        structured_outputs=True
+        agent_id=agent_id
     )
 
 
@@ -117,16 +121,14 @@ async def prepare_agent_and_prompt(drive_service, **kwargs):
     user_id = str(current_user.id)
 
     agent = await get_agent(kwargs.get("session_id"), kwargs.get("agent_id"))
-    agent.model = OpenAIChat(
-        id=OPENAI_MODEL,
-        model=OPENAI_MODEL,
+    agent.model = openai_models.get(
+        OPENAI_MODEL,
         max_completion_tokens=4000,
         temperature=OPENAI_TEMP,
-        api_key=OPENAI_API_KEY,
         top_p=TOP_P,
         user=user_id,
         session_id=kwargs.get("session_id"),
-        response_format={"type": "json_object"},
+        response_format={"type": "json_object"}
     )
 
     content = await load_instructions_and_commands(drive_service, kwargs.get("niche", ""))
@@ -167,7 +169,7 @@ async def ask_fouray_legal_gv_stream(drive_service, **kwargs):
 
         if section_name and user_input and previous_response:
             agent.previous_response = previous_response
-            agent.add_to_knowledge(section_name, user_input)
+            await agent.aadd_to_knowledge(section_name, user_input)
 
         knowledgebase_context = ""
         user_feedbacks = ""
@@ -198,7 +200,7 @@ async def ask_fouray_legal_gv(drive_service, **kwargs):
 
         if section_name and user_input and previous_response:
             agent.previous_response = previous_response
-            agent.add_to_knowledge(section_name, user_input)
+            await agent.aadd_to_knowledge(section_name, user_input)
 
         knowledgebase_context = ""
         user_feedbacks = ""
@@ -226,7 +228,6 @@ async def fetch_filtered_knowledge(prompt=""):
     current_user = loggedin_user_var.get()
     dim3_value = current_user.dim3
     vector_db = get_cached_custom_vector_db(dim3_value, SYNC_DB_STR, SearchType.vector, VECTOR_SEARCH_LIMIT)
-    agent_manager = AgentManager()
 
     try:
         async def search_knowledge():
@@ -235,10 +236,9 @@ async def fetch_filtered_knowledge(prompt=""):
             # prompt = response.content
             # print("- generated vector search: " + prompt)
             # prompt = "Function Analysis Report MNO Life science Private Limited (MNO India) and MNO Life science Inc. (MNO USA)."
-            vector_db.default_limit = VECTOR_SEARCH_LIMIT
-            vector_db.search_type = SearchType.vector
-            vector_db.vector_score_weight = 1.0
-            return await asyncio.to_thread(vector_db.vector_search, query=prompt)
+            search_query = VectorSearchQuery(query=prompt, search_type=SearchType.vector, limit=VECTOR_SEARCH_LIMIT,
+                                             vector_score_weight=1.0)
+            return await vector_db.arun_projected_query(search_query)
 
         search_results = await search_knowledge()
         chunks = []
@@ -297,50 +297,21 @@ async def execute_search_and_generate_response_stream(knowledge_context: Optiona
     prompt = format_prompt(knowledge_context, combined_prompt, user_feedbacks)
 
     try:
-        buffer = ""
-        inside_array = False
-        brace_depth = 0
-        object_buffer = ""
-        # This will return an iterator (not async)
-        for chunk in agent.run(prompt, stream=True):
-            # if hasattr(chunk, "content"):
-            #     yield chunk.content  # Working
-            # await asyncio.sleep(0)  # Let the event loop breathe
-            value = getattr(chunk, "content", chunk)
-            if not isinstance(value, str):
-                continue
-
-            buffer += value
-
-            # Check for beginning of array
-            if not inside_array and "[" in buffer:
-                inside_array = True
-                buffer = buffer.split("[", 1)[1]  # Drop everything before `[` (start of array)
-                continue
-
-            if inside_array:
-                for char in value:
-                    if char == "{":
-                        if brace_depth == 0:
-                            object_buffer = ""  # Start new object
-                        brace_depth += 1
-                        object_buffer += char
-                    elif char == "}":
-                        brace_depth -= 1
-                        object_buffer += char
-                        if brace_depth == 0:
-                            try:
-                                obj = json.loads(object_buffer)
-                                yield f"data: {json.dumps(obj)}\n\n"
-                                await asyncio.sleep(0.01)
-                            except json.JSONDecodeError:
-                                # Optional: log parsing error
-                                pass
-                            object_buffer = ""  # Reset for next object
-                    elif brace_depth > 0:
-                        object_buffer += char
-
-            await asyncio.sleep(0)  # Yield control to event loop
+        with memory_profiler.track("legal_gv"):
+            parser = JsonArrayStreamParser()
+            # agent.run is a blocking iterator; drive it on a worker thread so the event loop stays free
+            async for chunk in iterate_in_thread(lambda: agent.run(prompt, stream=True)):
+                # if hasattr(chunk, "content"):
+                #     yield chunk.content  # Working
+                # await asyncio.sleep(0)  # Let the event loop breathe
+                value = getattr(chunk, "content", chunk)
+                if not isinstance(value, str):
+                    continue
+
+                for obj in parser.feed(value):
+                    yield json.dumps(obj)
+            for obj in parser.close():
+                yield json.dumps(obj)
 
     except Exception as e:
         raise InternalServerErrorException(f"Streaming error: {str(e)}")
@@ -356,7 +327,7 @@ async def execute_search_and_generate_response(knowledge_context: Optional[str]
     prompt = format_prompt(knowledge_context, combined_prompt, user_feedbacks)
 
     # Run the agent asynchronously
-    result = await asyncio.to_thread(agent.run, prompt)
+    result = await arun_agent(agent, prompt)
     if not IS_PROD:
         print(result.content)
     try:
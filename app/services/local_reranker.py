@@ -0,0 +1,45 @@
+import math
+import re
+from collections import Counter
+from typing import List
+
+from phi.document import Document
+from phi.reranker.base import Reranker
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class LocalCrossEncoderReranker(Reranker):
+    """
+    Offline stand-in for CohereReranker: scores each (query, document) pair locally with a
+    BM25-style term overlap, so rerank policy and caching can be exercised without network calls.
+    """
+
+    model: str = "local-bm25"
+    k1: float = 1.2
+    b: float = 0.75
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        return _TOKEN_RE.findall(text.lower())
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        if not documents:
+            return []
+        query_terms = set(self._tokens(query))
+        doc_terms = [Counter(self._tokens(doc.content)) for doc in documents]
+        avg_len = (sum(sum(terms.values()) for terms in doc_terms) / len(doc_terms)) or 1.0
+        doc_freq = Counter(term for terms in doc_terms for term in query_terms if term in terms)
+
+        for doc, terms in zip(documents, doc_terms):
+            length = sum(terms.values())
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term, 0)
+                if not tf:
+                    continue
+                idf = math.log(1 + (len(documents) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_len))
+            doc.reranking_score = score
+
+        return sorted(documents, key=lambda d: d.reranking_score, reverse=True)
@@ -1,62 +1,188 @@
-import os
-import os
+from typing import Dict, Set
 from app.utils.redis_client import redis_client
+from app.utils.single_flight import template_flight, template_redis_flight
+from app.utils.template_cache import template_cache
 from app.core.exceptions import InternalServerErrorException
 import asyncio
 from app.core import settings
 
 
-async def update_redis_from_drive():
-    from app.services.drive_service import get_google_drive_service_for_system, fetch_drive_file_content
+# Drive folder -> {cache key: file name} of every template the services read, kept fresh by the scheduler
+TEMPLATE_MANIFEST: Dict[str, Dict[str, str]] = {}
+
+# Background revalidations are referenced here so they are not garbage collected mid-flight
+_revalidations: Set[asyncio.Task] = set()
+
+
+def register_template_files(folder_name: str, files: Dict[str, str]):
+    """
+    Add templates to the Drive -> Redis sync manifest.
+    """
+    TEMPLATE_MANIFEST.setdefault(folder_name, {}).update(files)
+
+
+async def reload_template(drive_service, key: str, file_name: str, folder_name: str) -> str:
     """
-    Update Redis asynchronously with the latest files from Google Drive.
+    Fetch one template from Drive and write it back to the cache. Concurrent reloads of the same key
+    are coalesced within the process and, through a Redis lock, across workers.
     """
-    # Environment variables
+    from app.services.drive_service import fetch_drive_file_content
+
+    async def load():
+        content = await fetch_drive_file_content(drive_service, file_name, folder_name)
+        await template_cache.set_many_async({key: content})
+        return content
+
+    async def probe():
+        values, _ = await redis_client.get_many_async([key])
+        return values.get(key)
+
+    return await template_flight.do(key, lambda: template_redis_flight.do(key, load, probe))
+
+
+def _finish_revalidation(task: asyncio.Task):
+    _revalidations.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ Error revalidating template: {str(task.exception())}")
+
+
+def revalidate_template(drive_service, key: str, file_name: str, folder_name: str):
+    """
+    Reload a template in the background unless a reload for it is already running.
+    """
+    if template_flight.in_flight(key):
+        return
+    task = asyncio.create_task(reload_template(drive_service, key, file_name, folder_name))
+    _revalidations.add(task)
+    task.add_done_callback(_finish_revalidation)
+
+
+async def load_cached_templates(drive_service, files: Dict[str, str], folder_name: str) -> Dict[str, str]:
+    """
+    Load templates by cache key with one batched lookup. Expired keys are served from their stale copy
+    while Drive is re-read in the background; keys with no copy at all are fetched from Drive
+    concurrently, one coalesced loader per key.
+
+    Args:
+        drive_service: Google Drive service used for misses.
+        files (Dict[str, str]): Cache key -> Drive file name.
+        folder_name (str): Drive folder holding the files.
+    Returns:
+        Dict[str, str]: Template content by cache key, in the order of ``files``.
+    """
+    register_template_files(folder_name, files)
+    content, missing = await template_cache.get_many_async(files.keys())
+    if missing:
+        stale = await template_cache.get_stale_many_async(missing)
+        for key, value in stale.items():
+            content[key] = value
+            revalidate_template(drive_service, key, files[key], folder_name)
+
+        cold = [key for key in missing if key not in stale]
+        if cold:
+            fetched = await asyncio.gather(
+                *(reload_template(drive_service, key, files[key], folder_name) for key in cold)
+            )
+            content.update(zip(cold, fetched))
+    return {key: content[key] for key in files}
+
+
+def _build_sync_manifest() -> Dict[str, Dict[str, str]]:
     instruction_command_folder_name = settings.INSTRUCTIONS_AND_COMMANDS_FOLDER_NAME
-    instructions_file_name = settings.INSTRUCTIONS_FILE_NAME
-    commands_file_name = settings.COMMANDS_FILE_NAME
-    product_sections = settings.PRODUCT_SECTIONS
+    files = {
+        "instructions_content": settings.INSTRUCTIONS_FILE_NAME,
+        "commands_content": settings.COMMANDS_FILE_NAME,
+    }
+    for section in settings.PRODUCT_SECTIONS.split(","):
+        section_name = section.strip()
+        if not section_name:
+            continue
+        files[f"{section_name}_instructions_content"] = f"{section_name}_instructions.md"
+        files[f"{section_name}_commands_content"] = f"{section_name}_commands.md"
+        files[f"product_{section_name}_commands_content"] = f"product_{section_name}_commands_content.md"
+
+    manifest = {folder_name: dict(folder_files) for folder_name, folder_files in TEMPLATE_MANIFEST.items()}
+    manifest.setdefault(instruction_command_folder_name, {}).update(files)
+    return manifest
+
+
+def _drive_version(file: Dict[str, str]) -> str:
+    # Native Google Docs have no md5Checksum; fall back to modifiedTime for those
+    return file.get("md5Checksum") or file.get("modifiedTime") or ""
+
+
+async def update_redis_from_drive() -> Dict[str, int]:
+    """
+    Change-aware Drive -> Redis sync of every registered template.
+
+    Each folder is listed once; only files whose md5Checksum/modifiedTime differs from the version
+    stored at the last sync (or whose cache key is gone) are downloaded, concurrently with a bounded
+    pool, and written back with their versions in one pipeline.
+
+    Returns:
+        Dict[str, int]: Folders listed and files checked, changed, missing, failed and bytes downloaded.
+    """
+    from app.services.drive_service import get_google_drive_service_for_system, get_folder_id_by_name, download_drive_file
+    from app.services.drive_index import drive_folder_index
 
+    summary = {"folders": 0, "checked": 0, "changed": 0, "missing": 0, "failed": 0, "bytes": 0}
     try:
         drive_service = await get_google_drive_service_for_system()
+        manifest = _build_sync_manifest()
 
-        instructions_key = "instructions_content"
-        commands_key = "commands_content"
-
-        cached_instructions_content = await fetch_drive_file_content(
-            drive_service, instructions_file_name, instruction_command_folder_name
-        )
-
-        cached_commands_content = await fetch_drive_file_content(
-            drive_service, commands_file_name, instruction_command_folder_name
-        )
-
-        # Async cache to Redis
-        await asyncio.gather(
-            redis_client.set_value_async(instructions_key, cached_instructions_content),
-            redis_client.set_value_async(commands_key, cached_commands_content)
-        )
-
-        # # Update section-wise content concurrently
-        sections = product_sections.split(",")
-        for section in sections:
-            section_name = section.strip()
-            sectional_instructions_key = f"{section_name}_instructions_content"
-            sectional_commands_key = f"{section_name}_commands_content"
-
-            # Fetch and cache section wise instructions content
-            sectional_cached_instructions_content = await fetch_drive_file_content(
-                drive_service, f"{section_name}_instructions.md", instruction_command_folder_name
-            )
+        async def list_folder(folder_name: str):
+            folder_id = await get_folder_id_by_name(drive_service, folder_name)
+            if not folder_id:
+                raise InternalServerErrorException(f"Folder '{folder_name}' not found.")
+            return await drive_folder_index.list_files(drive_service, folder_id, refresh=True)
 
-            # Fetch and cache section wise instructions content
-            sectional_cached_commands_content = await fetch_drive_file_content(
-                drive_service, f"{section_name}_commands.md", instruction_command_folder_name
-            )
-            await asyncio.gather(
-                redis_client.set_value_async(sectional_instructions_key, sectional_cached_instructions_content),
-                redis_client.set_value_async(sectional_commands_key, sectional_cached_commands_content)
-            )
+        listings = await asyncio.gather(*(list_folder(folder_name) for folder_name in manifest),
+                                        return_exceptions=True)
+
+        candidates = {}
+        for (folder_name, files), listing in zip(manifest.items(), listings):
+            summary["checked"] += len(files)
+            if isinstance(listing, Exception):
+                print(f"❌ Error listing Drive folder '{folder_name}': {str(listing)}")
+                summary["failed"] += len(files)
+                continue
+            summary["folders"] += 1
+            for key, file_name in files.items():
+                if file_name in listing:
+                    candidates[key] = listing[file_name]
+                else:
+                    print(f"❌ File '{file_name}' not found in Drive folder '{folder_name}'")
+                    summary["missing"] += 1
+
+        versions, present = await template_cache.get_sync_state_async(list(candidates))
+        changed = {key: file for key, file in candidates.items()
+                   if key not in present or versions.get(key) != _drive_version(file)}
+
+        semaphore = asyncio.Semaphore(settings.DRIVE_SYNC_CONCURRENCY)
+
+        async def download(file: Dict[str, str]) -> str:
+            async with semaphore:
+                return (await asyncio.to_thread(download_drive_file, drive_service, file["id"])).decode("utf-8")
+
+        results = await asyncio.gather(*(download(file) for file in changed.values()), return_exceptions=True)
+
+        values, source_versions = {}, {}
+        for (key, file), result in zip(changed.items(), results):
+            if isinstance(result, Exception):
+                print(f"❌ Error downloading '{file['name']}' from Drive: {str(result)}")
+                summary["failed"] += 1
+                continue
+            values[key] = result
+            source_versions[key] = _drive_version(file)
+            summary["bytes"] += len(result.encode("utf-8"))
+
+        await template_cache.set_many_async(values, source_versions)
+        summary["changed"] = len(values)
 
     except Exception as e:
         print(f"Error updating Redis from Drive: {str(e)}")
+
+    print(f"🔄 Drive sync: {summary['folders']} folders, {summary['checked']} files checked, "
+          f"{summary['changed']} changed, {summary['missing']} missing, {summary['failed']} failed, "
+          f"{summary['bytes']} bytes")
+    return summary
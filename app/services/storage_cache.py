@@ -1,45 +1,209 @@
+import json
+import threading
+import time
+from collections import OrderedDict
 from functools import lru_cache
-from typing import Any
+from typing import Any, Callable, Dict, Hashable
 
 from phi.embedder.openai import OpenAIEmbedder
 from phi.reranker.cohere import CohereReranker
 from phi.storage.agent.postgres import PgAgentStorage
 from phi.memory.db.postgres import PgMemoryDb
+from phi.vectordb.pgvector.index import HNSW, Ivfflat
 from phi.vectordb.search import SearchType
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 
 from app.core import settings
+from app.db.session import async_engine
 from app.services.CustomPgVectorDb import CustomPgVector
+from app.services.local_reranker import LocalCrossEncoderReranker
+from app.utils.embedding_cache import embedding_cache, query_embedding_cache
+from app.utils.rerank_cache import rerank_cache
+
+
+class TenantResourceRegistry:
+    """
+    Bounded TTL/LRU registry of per-tenant storage, memory and vector DB objects.
+
+    Every resource is built on one shared sync engine per database URL, so evicting a tenant only drops
+    its table handles and thread-local sessions; pooled connections are reused by the next tenant instead
+    of being reopened cold. Engines are disposed when the registry is closed.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, pool_size: int, max_overflow: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._engines: Dict[str, Engine] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_engine(self, db_url: str) -> Engine:
+        with self._lock:
+            engine = self._engines.get(db_url)
+            if engine is None:
+                engine = create_engine(
+                    db_url,
+                    pool_size=self.pool_size,
+                    max_overflow=self.max_overflow,
+                    pool_recycle=600,
+                    pool_timeout=30,
+                    pool_pre_ping=True,
+                )
+                self._engines[db_url] = engine
+            return engine
+
+    @staticmethod
+    def _release(resource: Any) -> None:
+        # Resources share the registry's engine, so only their own scoped sessions are released here
+        session = getattr(resource, "Session", None)
+        if session is not None and hasattr(session, "remove"):
+            session.remove()
+
+    def _evict(self, key: Hashable) -> None:
+        _, resource = self._entries.pop(key)
+        self.evictions += 1
+        self._release(resource)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                self._entries[key] = (now, entry[1])
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._evict(key)
+            self.misses += 1
+
+        # Build outside the lock; if another caller raced us, keep the first instance
+        resource = factory()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._release(resource)
+                return entry[1]
+            self._entries[key] = (now, resource)
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+        return resource
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            pools = {}
+            for index, engine in enumerate(self._engines.values()):
+                pool = engine.pool
+                pools[f"engine_{index}"] = {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": pool.overflow(),
+                }
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "connections": pools,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+
+
+tenant_registry = TenantResourceRegistry(
+    max_entries=settings.TENANT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.TENANT_CACHE_TTL_SECONDS,
+    pool_size=settings.SYNC_DB_POOL_SIZE,
+    max_overflow=settings.SYNC_DB_MAX_OVERFLOW,
+)
 
 
-@lru_cache(maxsize=10)
 def get_cached_storage(dim3_value: str):
-    return PgAgentStorage(
-        db_url=settings.SYNC_DB_STR,
+    return tenant_registry.get_or_create(("storage", dim3_value), lambda: PgAgentStorage(
+        db_engine=tenant_registry.get_engine(settings.SYNC_DB_STR),
         table_name=f"{dim3_value}_h",
         schema="ai"
-    )
+    ))
 
 
-@lru_cache(maxsize=10)
 def get_cached_memory_db(dim3_value: str):
-    return PgMemoryDb(
-        db_url=settings.SYNC_DB_STR,
+    return tenant_registry.get_or_create(("memory", dim3_value), lambda: PgMemoryDb(
+        db_engine=tenant_registry.get_engine(settings.SYNC_DB_STR),
         table_name=f"{dim3_value}_m",
         schema='ai',
+    ))
 
-    )
 
+def get_vector_index_config(dim3_value: str):
+    """
+    Build the ANN index config for a tenant table, applying any per-tenant ef_search/probes override.
+    """
+    tuning = settings.VECTOR_INDEX_TUNING.get(dim3_value, {})
+    if settings.VECTOR_INDEX_TYPE.lower() == "ivfflat":
+        return Ivfflat(probes=tuning.get("probes", settings.VECTOR_IVFFLAT_PROBES))
+    return HNSW(ef_search=tuning.get("ef_search", settings.VECTOR_HNSW_EF_SEARCH),
+                m=tuning.get("m", 16), ef_construction=tuning.get("ef_construction", 200))
 
-@lru_cache(maxsize=10)
-def get_cached_custom_vector_db(dim3_value: str, sync_db_str: str, search_type: SearchType, limit: int = 10,
-                                filters: Any = None):
+
+@lru_cache(maxsize=1)
+def get_reranker():
+    """
+    Build the configured search reranker once per process (None disables reranking).
+    """
+    reranker = settings.RERANKER.lower()
+    if reranker == "none":
+        return None
+    if reranker == "local":
+        return LocalCrossEncoderReranker()
+    return CohereReranker(api_key=settings.COHERE_API_KEY)
+
+
+def build_custom_vector_db(dim3_value: str, sync_db_str: str, search_type: SearchType, limit: int = 10,
+                           filters: Any = None) -> CustomPgVector:
+    """
+    Build a tenant vector DB on the shared engine without caching it, e.g. for background maintenance
+    that should not push live tenants out of the registry. Call ``Session.remove()`` on the thread that
+    used it when done.
+    """
     return CustomPgVector(
         table_name=dim3_value,
-        db_url=sync_db_str,
+        db_engine=tenant_registry.get_engine(sync_db_str),
         schema="ai",
         search_type=search_type,
         embedder=OpenAIEmbedder(model="text-embedding-3-large"),
         default_limit=limit,
         filters=filters,
-        reranker=CohereReranker(api_key=settings.COHERE_API_KEY)
+        upsert_concurrency=settings.VECTOR_UPSERT_CONCURRENCY,
+        embedding_cache=embedding_cache,
+        async_engine=async_engine,
+        vector_index=get_vector_index_config(dim3_value),
+        index_min_rows=settings.VECTOR_INDEX_MIN_ROWS,
+        rerank_min_candidates=settings.RERANK_MIN_CANDIDATES,
+        rerank_cache=rerank_cache,
+        query_embedding_cache=query_embedding_cache,
+        reranker=get_reranker()
     )
+
+
+def get_cached_custom_vector_db(dim3_value: str, sync_db_str: str, search_type: SearchType, limit: int = 10,
+                                filters: Any = None):
+    filters_key = json.dumps(filters, sort_keys=True, default=str) if filters is not None else None
+    key = ("vector_db", dim3_value, sync_db_str, search_type, limit, filters_key)
+    return tenant_registry.get_or_create(
+        key, lambda: build_custom_vector_db(dim3_value, sync_db_str, search_type, limit, filters))
@@ -1,20 +1,19 @@
 import json
-import asyncio
 from typing import Optional
 from phi.agent import Agent
 from phi.memory import AgentMemory
 from phi.memory.agent import MemoryRetrieval
-from phi.model.openai import OpenAIChat
 from phi.knowledge.agent import AgentKnowledge
 from phi.vectordb.pgvector import SearchType
 
 from app.core.context import loggedin_user_var
 from app.services.ProductAgent import ProductDescriptionAgent
-from app.services.drive_service import fetch_drive_file_content
+from app.services.redis_service import load_cached_templates, register_template_files
 from app.core import settings
+from app.utils.agent_templates import agent_templates
 from app.services.storage_cache import get_cached_custom_vector_db, get_cached_storage, get_cached_memory_db
-from app.utils import redis_client
 from app.core.exceptions import InternalServerErrorException
+from app.utils import iterate_in_thread, memory_profiler, openai_models
 
 # -------------------- Environment Variables --------------------
 OPENAI_API_KEY = settings.OPENAI_API_KEY
@@ -27,26 +26,33 @@ IS_PROD = settings.ENV == "prod"
 CACHED_FILES = {
     "translate_content_commands_content": "translate_commands_content.md"
 }
+register_template_files(FOLDER_NAME, CACHED_FILES)
 
 
 # -------------------- Async Load Instructions & Commands --------------------
 async def load_instructions_and_commands(drive_service):
     """Load instructions and commands from Google Drive or Redis Cache asynchronously."""
 
-    content = {}
-    for key, file_name in CACHED_FILES.items():
-        cached_content = await redis_client.get_value_async(key)
-        if cached_content is None:
-            cached_content = await fetch_drive_file_content(drive_service, file_name,
-                                                            f"{FOLDER_NAME}")
-            await redis_client.set_value_async(key, cached_content)
-        content[key] = cached_content
-
-    return content
+    return await load_cached_templates(drive_service, CACHED_FILES, FOLDER_NAME)
 
 
 # -------------------- Initialize AI Agent --------------------
 
+agent_templates.register(
+    "translate",
+    ProductDescriptionAgent,
+    name="multilingual_content_translator",
+    description="Translates JSON-structured content across languages while maintaining data integrity, applying regional compliance, and preserving exact structural formatting.",
+    task="Convert JSON data from source language to target language with regional localization, ensuring zero structural changes while applying cultural and regulatory adaptations.",
+    prevent_hallucinations=True,
+    markdown=True,
+    debug_mode=not IS_PROD,
+    prevent_prompt_leakage=True,
+    parse_response=True,
+    structured_outputs=True
+)
+
+
 async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> ProductDescriptionAgent:
     """Initialize the AI Agent asynchronously with knowledge and memory."""
 
@@ -55,20 +61,12 @@ async def get_agent(session_id: Optional[str], agent_id: Optional[str]) -> Produ
     dim3_value = current_user.dim3
     storage = get_cached_storage(dim3_value)
 
-    return ProductDescriptionAgent(
-        name="multilingual_content_translator",
-        description="Translates JSON-structured content across languages while maintaining data integrity, applying regional compliance, and preserving exact structural formatting.",
-        task="Convert JSON data from source language to target language with regional localization, ensuring zero structural changes while applying cultural and regulatory adaptations.",
-        prevent_hallucinations=True,
+    return agent_templates.create(
+        "translate",
         storage=storage,
         session_id=session_id,
         user_id=user_id,
-        agent_id=agent_id,
-        markdown=True,
-        debug_mode=not IS_PROD,
-        prevent_prompt_leakage=True,
-        parse_response=True,
-        structured_outputs=True,
+        agent_id=agent_id
     )
 
 
@@ -80,16 +78,14 @@ async def prepare_agent_and_prompt(drive_service, **kwargs):
 
     agent = await get_agent(kwargs.get("session_id"), kwargs.get("agent_id"))
 
-    agent.model = OpenAIChat(
-        id=OPENAI_MODEL,
-        model=OPENAI_MODEL,
+    agent.model = openai_models.get(
+        OPENAI_MODEL,
         max_completion_tokens=10000,
         temperature=OPENAI_TEMP,
-        api_key=OPENAI_API_KEY,
         top_p=TOP_P,
         user=user_id,
         session_id=kwargs.get("session_id"),
-        response_format={"type": "json_object"},
+        response_format={"type": "json_object"}
     )
 
     cached_content = await load_instructions_and_commands(drive_service)
@@ -141,32 +137,25 @@ async def execute_search_and_generate_response_stream(combined_prompt: Optional[
     try:
 
         del combined_prompt
-        import gc
-        gc.collect()
-        print("Memory clean up before streaming")
-
-        # This will return an iterator (not async)
-        for chunk in agent.run(prompt, stream=True):
-            value = getattr(chunk, "content", chunk)
-
-            try:
-                # First try to parse it as JSON
-                parsed = json.loads(value) if isinstance(value, str) else value
-            except json.JSONDecodeError:
-                parsed = value  # fallback if it's not valid JSON
-
-            if isinstance(parsed, dict) and "response" in parsed:
-                for item in parsed["response"]:
-                    yield json.dumps(item)
-            elif isinstance(parsed, list):
-                for item in parsed:
-                    yield json.dumps(item)
-            else:
-                yield str(parsed)
-
-            await asyncio.sleep(0)
-        del prompt
-        gc.collect()
-        print("Memory cleaned up")
+
+        with memory_profiler.track("translate"):
+            # agent.run is a blocking iterator; drive it on a worker thread so the event loop stays free
+            async for chunk in iterate_in_thread(lambda: agent.run(prompt, stream=True)):
+                value = getattr(chunk, "content", chunk)
+
+                try:
+                    # First try to parse it as JSON
+                    parsed = json.loads(value) if isinstance(value, str) else value
+                except json.JSONDecodeError:
+                    parsed = value  # fallback if it's not valid JSON
+
+                if isinstance(parsed, dict) and "response" in parsed:
+                    for item in parsed["response"]:
+                        yield json.dumps(item)
+                elif isinstance(parsed, list):
+                    for item in parsed:
+                        yield json.dumps(item)
+                else:
+                    yield str(parsed)
     except Exception as e:
         raise InternalServerErrorException(f"Streaming error: {str(e)}")
@@ -0,0 +1,82 @@
+import asyncio
+
+from phi.vectordb.search import SearchType
+from sqlalchemy import text
+
+from app.core import settings
+from app.db.session import async_engine
+from app.services.storage_cache import build_custom_vector_db
+
+# pg_advisory_lock key held for the duration of a maintenance run, so only one uvicorn worker (or host)
+# maintains the indexes at a time
+VECTOR_INDEX_MAINTENANCE_LOCK_ID = 4_046_201_733
+
+
+async def list_vector_tables(schema: str = "ai") -> list:
+    """
+    List tenant tables in ``schema`` that carry a pgvector ``embedding`` column.
+    """
+    async with async_engine.connect() as conn:
+        result = await conn.execute(text(
+            "SELECT table_name FROM information_schema.columns "
+            "WHERE table_schema = :schema AND column_name = 'embedding' AND udt_name = 'vector'"
+        ), {"schema": schema})
+        return [row.table_name for row in result]
+
+
+def maintain_table_vector_index(table_name: str) -> dict:
+    """
+    Maintain one tenant table on an uncached vector DB, so idle tables don't evict live tenants from the
+    registry. Runs on a worker thread; the scoped session is removed on that same thread.
+    """
+    vector_db = build_custom_vector_db(table_name, settings.SYNC_DB_STR, SearchType.vector,
+                                       settings.VECTOR_SEARCH_LIMIT)
+    try:
+        return vector_db.maintain_vector_index()
+    finally:
+        vector_db.Session.remove()
+
+
+async def maintain_vector_indexes():
+    """
+    Scheduler entry point: build missing or invalid ANN indexes and rebuild drifted IVFFlat indexes
+    for every tenant table. Tables are processed one at a time to bound maintenance_work_mem usage.
+    Every worker schedules this job; a Postgres advisory lock lets only one of them run it.
+    """
+    try:
+        async with async_engine.connect() as lock_conn:
+            acquired = (await lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"),
+                                                {"key": VECTOR_INDEX_MAINTENANCE_LOCK_ID})).scalar()
+            await lock_conn.commit()
+            if not acquired:
+                print("🧭 Vector index maintenance already running in another worker, skipping")
+                return []
+            try:
+                return await _maintain_vector_indexes()
+            finally:
+                await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"),
+                                        {"key": VECTOR_INDEX_MAINTENANCE_LOCK_ID})
+                await lock_conn.commit()
+    except Exception as e:
+        print(f"❌ Error running vector index maintenance: {str(e)}")
+        return []
+
+
+async def _maintain_vector_indexes():
+    try:
+        tables = await list_vector_tables()
+    except Exception as e:
+        print(f"❌ Error listing vector tables: {str(e)}")
+        return []
+
+    summary = []
+    for table_name in tables:
+        try:
+            summary.append(await asyncio.to_thread(maintain_table_vector_index, table_name))
+        except Exception as e:
+            print(f"❌ Error maintaining vector index for {table_name}: {str(e)}")
+            summary.append({"table": table_name, "rows": None, "action": "failed"})
+
+    changed = [s for s in summary if s["action"] != "skipped"]
+    print(f"🧭 Vector index maintenance: {len(summary)} tables checked, {len(changed)} changed")
+    return summary
@@ -2,12 +2,11 @@ import aiofiles.os
 import asyncio
 from app.core.exceptions import InternalServerErrorException
 from app.services.knowledge_base_service import load_knowledge_base
-from app.utils import AgentManager
+from app.utils import agent_manager, arun_agent
 from app.utils.file_helper import remove_file
 import tempfile
 
 TEMP_FOLDER = "app/temp_files"
-manager_agent = AgentManager()
 unwanted_phrases = [
     "i'm unable to access external",
     "unable to access external",
@@ -23,13 +22,13 @@ unwanted_phrases = [
 async def process_web_urls(url, filters=None, dim3_value: str = None) -> None:
     try:
 
-        agent = await manager_agent.get_webpage_summary_agent()
+        agent = await agent_manager.get_webpage_summary_agent()
         content = ""
         max_retries = 3
 
         for attempt in range(max_retries):
-            response = await asyncio.to_thread(agent.run,
-                                               message=f"Use trafilatura_tools tool to scrape and extract content from and return only page related data not any in starting and ending : {url}")
+            response = await arun_agent(agent,
+                                        message=f"Use trafilatura_tools tool to scrape and extract content from and return only page related data not any in starting and ending : {url}")
             content = response.content or ""
             if not any(phrase in content.lower() for phrase in unwanted_phrases):
                 break
@@ -2,10 +2,22 @@ import base64
 import os
 import asyncio
 
+from celery.signals import worker_process_init
+
 from app.celery_app import mk_celery
 from app.services.file_service import process_file
 
 from app.utils.file_helper import remove_file
+from app.utils.agent_manager import agent_manager
+from app.utils.openai_clients import openai_client_pool
+
+
+@worker_process_init.connect
+def warmup_agents(**kwargs):
+    """
+    Build the utility agents once per worker process, before the first task needs them.
+    """
+    agent_manager.warmup()
 
 
 @mk_celery.task(name="app.tasks.process_file_task")
@@ -42,6 +54,7 @@ def process_file_task(file_content: str, file_path: str, file_extension: str,
     )
 
     loop.run_until_complete(remove_file(file_path))  # Cleanup after processing
+    loop.run_until_complete(openai_client_pool.aclose())  # Connections are bound to this loop
     loop.close()
 
     # Clean up the file after processing
@@ -0,0 +1,71 @@
+import importlib
+import time
+
+from phi.agent import Agent
+
+from app.utils.agent_manager import agent_manager
+from app.utils.agent_templates import AgentTemplateRegistry, agent_templates
+
+SERVICE_TEMPLATES = {"product_description", "blog", "dosha_quiz", "email", "free_chat", "free_form", "legal_gv",
+                     "translate"}
+UTILITY_AGENTS = {"vision", "audio_summary", "vector_query", "webpage_summary"}
+
+# Importing a service registers its template
+for service in ("agent_service", "blog_agent_service", "dosha_quiz_agent_service", "email_agent_service",
+                "free_chat_agent_service", "free_form_agent_service", "legal_gv_agent_service",
+                "translate_agent_service"):
+    importlib.import_module(f"app.services.{service}")
+
+
+def test_every_service_template_builds_and_clones():
+    assert SERVICE_TEMPLATES <= set(agent_templates.stats())
+    agent_templates.warmup()
+    for key in SERVICE_TEMPLATES:
+        agent = agent_templates.create(key, session_id="session", user_id="user")
+        assert agent.session_id == "session" and agent.user_id == "user"
+        assert agent.name  # The agent's own name= config no longer collides with the registry key
+        assert agent_templates.stats()[key]["builds"] == 1
+
+
+def test_every_utility_agent_builds_and_clones():
+    assert set(agent_manager.stats()) == UTILITY_AGENTS
+    agent_manager.warmup()
+    for key in UTILITY_AGENTS:
+        agent = agent_manager.get_agent(key)
+        assert agent.model is not None
+    assert agent_manager.get_agent(agent_manager.WEBPAGE_SUMMARY).name == "web researcher and content extractor"
+
+
+def test_clones_do_not_share_run_state():
+    templates = AgentTemplateRegistry()
+    templates.register("notes", Agent, name="notes", instructions=["Be brief."], markdown=True)
+    first, second = templates.create("notes"), templates.create("notes")
+    first.memory.messages.append(None)
+    first.instructions = ["Changed."]
+    assert second.memory.messages == [] and first.memory is not second.memory
+    assert second.instructions == ["Be brief."] and first.session_id != second.session_id
+    assert templates.stats() == {"notes": {"builds": 1, "clones": 2}}
+
+
+def test_template_clone_benchmark():
+    """
+    Before/after: building the product description agent from its configuration per request vs cloning
+    the prebuilt template.
+    """
+    requests = 200
+    agent_class, config = agent_templates._factories["product_description"]
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        agent_class(**config)
+    built = time.perf_counter() - started
+
+    agent_templates.warmup()
+    started = time.perf_counter()
+    for _ in range(requests):
+        agent_templates.create("product_description")
+    cloned = time.perf_counter() - started
+
+    print(f"\n{requests} product description agents: construct {built * 1000:.1f}ms, "
+          f"clone {cloned * 1000:.1f}ms")
+    assert cloned < built
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+from app.utils.agent_manager import agent_manager
+from app.utils.audio_transcriber import AudioTranscriber, stitch_transcripts
+
+# Simulated transcription speed: seconds of API latency per second of audio
+LATENCY_PER_AUDIO_SECOND = 0.0001
+
+
+def test_stitch_drops_the_repeated_overlap():
+    parts = [
+        "first part and then we agreed that the budget for Q3 will incre",
+        "agreed that the budget for Q3 will increase by ten percent. Next item.",
+    ]
+    assert stitch_transcripts(parts) == ("first part and then we agreed that the budget for Q3 will increase "
+                                         "by ten percent. Next item.")
+
+
+def test_stitch_ignores_case_and_punctuation_in_the_overlap():
+    assert stitch_transcripts(["we will ship it on Monday, then", "ship it on monday then review"]) == \
+        "we will ship it on Monday, then review"
+
+
+def test_stitch_concatenates_parts_without_overlap():
+    assert stitch_transcripts(["a b c", "x y z"]) == "a b c x y z"
+    assert stitch_transcripts(["one two", "two three"]) == "one two two three"  # below min_match_words
+    assert stitch_transcripts([]) == ""
+
+
+class FakeTranscriber(AudioTranscriber):
+    """
+    AudioTranscriber with ffprobe/ffmpeg and the Whisper call replaced: each "segment" file records its
+    time range, and transcription takes time proportional to its audio length and returns one word per
+    audio second, so overlaps repeat exactly.
+    """
+
+    def __init__(self, duration: float, **kwargs):
+        super().__init__("whisper-1", max_upload_bytes=1, **kwargs)
+        self.ffmpeg = self.ffprobe = "ffmpeg"
+        self.duration = duration
+        self.segments = {}
+
+    async def probe_duration(self, path):
+        return self.duration
+
+    async def _extract_segment(self, path, start, output_path):
+        self.segments[output_path] = (start, min(start + self.segment_seconds, self.duration))
+        open(output_path, "wb").close()
+
+    async def _transcribe_file(self, path):
+        start, end = self.segments.get(path, (0, self.duration))
+        await asyncio.sleep((end - start) * LATENCY_PER_AUDIO_SECOND)
+        return " ".join(f"w{second}" for second in range(int(start), int(end)))
+
+
+def test_segments_cover_the_recording_and_stitch_back(tmp_path):
+    audio = tmp_path / "meeting.mp3"
+    audio.write_bytes(b"0" * 16)
+    transcriber = FakeTranscriber(1300, segment_seconds=600, overlap_seconds=5, concurrency=4)
+    transcript = asyncio.run(transcriber.transcribe(str(audio)))
+    assert sorted(start for start, _ in transcriber.segments.values()) == [0, 595, 1190]
+    assert transcript == " ".join(f"w{second}" for second in range(1300))
+
+
+def test_chunked_transcription_benchmark(tmp_path):
+    """
+    Before/after for an hour-long recording: one request for the whole file (the old path, which also
+    blocked the loop) vs 10-minute overlapping segments transcribed four at a time.
+    """
+    audio = tmp_path / "meeting.mp3"
+    audio.write_bytes(b"0" * 16)
+    transcriber = FakeTranscriber(3600, segment_seconds=600, overlap_seconds=5, concurrency=4)
+
+    started = time.perf_counter()
+    whole = asyncio.run(transcriber._transcribe_file(str(audio)))
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    chunked = asyncio.run(transcriber.transcribe(str(audio)))
+    segmented = time.perf_counter() - started
+
+    assert chunked == whole
+    print(f"\n3600s of audio: single request {single:.3f}s, {len(transcriber.segments)} segments "
+          f"x{transcriber.concurrency} {segmented:.3f}s")
+    assert segmented < single
+
+
+def test_long_transcripts_are_summarized_map_reduce(monkeypatch):
+    prompts = []
+
+    async def transcribe(path):
+        return " ".join(f"Sentence number {i} of the meeting." for i in range(3000))
+
+    async def summarize(prompt):
+        prompts.append(prompt)
+        return "summary " * 50
+
+    monkeypatch.setattr(agent_manager, "transcribe_audio", transcribe)
+    monkeypatch.setattr(agent_manager, "_summarize", summarize)
+    assert asyncio.run(agent_manager.summarize_audio("meeting.mp3")) == "summary " * 50
+
+    maps = [prompt for prompt in prompts if "Summarize part" in prompt]
+    reduces = [prompt for prompt in prompts if "Combine them" in prompt]
+    assert len(maps) > 1 and len(reduces) == 1
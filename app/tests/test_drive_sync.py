@@ -0,0 +1,117 @@
+import asyncio
+import json
+import threading
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from googleapiclient.http import HttpRequest
+
+from app.services import drive_service, redis_service
+from app.services.drive_index import drive_folder_index
+from app.utils.template_cache import template_cache
+
+
+class FakeRequest:
+    """
+    Mirrors how the real service builds requests: the Http is the building thread's. Executing records
+    which thread ran it and whether that thread owns the Http, and holds the "connection" for a moment so
+    downloads overlap.
+    """
+
+    def __init__(self, files: "FakeFiles", file_id: str):
+        self.files = files
+        self.file_id = file_id
+        self.http = files.thread_http()
+
+    def execute(self):
+        owner = self.files.owners[id(self.http)]
+        self.files.executions.append((threading.get_ident(), owner))
+        time.sleep(0.02)
+        return f"content of {self.file_id}".encode("utf-8")
+
+
+class FakeFiles:
+    def __init__(self):
+        self._local = threading.local()
+        self.owners = {}
+        self.executions = []
+
+    def thread_http(self):
+        if not hasattr(self._local, "http"):
+            self._local.http = object()
+            self.owners[id(self._local.http)] = threading.get_ident()
+        return self._local.http
+
+    def get_media(self, fileId):
+        return FakeRequest(self, fileId)
+
+
+class FakeDriveService:
+    def __init__(self):
+        self._files = FakeFiles()
+
+    def files(self):
+        return self._files
+
+
+def test_concurrent_sync_downloads_use_their_own_thread_http(monkeypatch):
+    service = FakeDriveService()
+    files = {f"key_{i}": {"id": f"file_{i}", "name": f"file_{i}.txt", "md5Checksum": str(i)} for i in range(12)}
+    written = {}
+
+    async def get_service():
+        return service
+
+    async def get_folder_id(drive, folder_name):
+        return "folder"
+
+    async def list_files(drive, folder_id, refresh=False):
+        return {file["name"]: file for file in files.values()}
+
+    async def get_sync_state(keys):
+        return {}, set()
+
+    async def set_many(values, source_versions=None):
+        written.update(values)
+
+    monkeypatch.setattr(drive_service, "get_google_drive_service_for_system", get_service)
+    monkeypatch.setattr(drive_service, "get_folder_id_by_name", get_folder_id)
+    monkeypatch.setattr(drive_folder_index, "list_files", list_files)
+    monkeypatch.setattr(redis_service, "_build_sync_manifest",
+                        lambda: {"templates": {key: file["name"] for key, file in files.items()}})
+    monkeypatch.setattr(template_cache, "get_sync_state_async", get_sync_state)
+    monkeypatch.setattr(template_cache, "set_many_async", set_many)
+
+    summary = asyncio.run(redis_service.update_redis_from_drive())
+
+    assert summary["changed"] == len(files) and summary["failed"] == 0
+    assert written == {key: f"content of {file['id']}" for key, file in files.items()}
+    executions = service.files().executions
+    assert len(executions) == len(files)
+    assert all(thread == owner for thread, owner in executions), "a request ran on another thread's Http"
+    assert len({thread for thread, _ in executions}) > 1  # downloads did run concurrently
+
+
+def test_system_service_executes_on_the_calling_threads_http(monkeypatch):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()).decode()
+    monkeypatch.setenv("SERVICE_ACCOUNT_JSON", json.dumps({
+        "type": "service_account", "project_id": "test", "private_key_id": "test", "private_key": key,
+        "client_email": "test@test.iam.gserviceaccount.com", "token_uri": "https://oauth2.googleapis.com/token",
+    }))
+    used = []
+    monkeypatch.setattr(HttpRequest, "execute", lambda self, http=None, num_retries=0: used.append(http))
+
+    service = drive_service.build_google_drive_service_for_system()
+    # Built on this thread, executed on workers: each execution must use the worker's Http
+    requests = [service.files().get_media(fileId=f"file_{i}") for i in range(2)]
+    workers = [threading.Thread(target=request.execute) for request in requests]
+    for worker in workers:
+        worker.start()
+        worker.join()
+    requests[0].execute()
+
+    assert used[0] is not used[1] and used[0] is not used[2] and used[1] is not used[2]
+    assert requests[0].http is used[2]  # the building thread keeps using its own Http
+    assert service.files().get_media(fileId="again").http is used[2]  # and reuses it across requests
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from phi.agent import Agent
+from phi.agent.session import AgentSession
+from phi.knowledge import AgentKnowledge
+from phi.model.openai import OpenAIChat
+from phi.storage.agent.base import AgentStorage
+
+from app.core import settings
+from app.utils import openai_clients
+from app.utils.openai_clients import arun_agent, runs_blocking_io
+
+LATENCY = 0.05
+COMPLETION = {
+    "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4o",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}
+
+
+def _sync_handler(request: httpx.Request) -> httpx.Response:
+    time.sleep(LATENCY)
+    return httpx.Response(200, content=json.dumps(COMPLETION), headers={"content-type": "application/json"})
+
+
+async def _async_handler(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(LATENCY)
+    return httpx.Response(200, content=json.dumps(COMPLETION), headers={"content-type": "application/json"})
+
+
+def _make_agent(client: OpenAI, async_client: AsyncOpenAI) -> Agent:
+    # No phi telemetry: it posts every run to phidata's API, which is not what is being measured
+    return Agent(model=OpenAIChat(id="gpt-4o", api_key="sk-test", client=client, async_client=async_client),
+                 telemetry=False)
+
+
+def test_plain_agent_runs_on_the_loop():
+    assert not runs_blocking_io(Agent())
+
+
+def test_tools_knowledge_and_storage_run_on_a_thread():
+    def lookup(query: str) -> str:
+        """Look something up."""
+        return query
+
+    assert runs_blocking_io(Agent(tools=[lookup]))
+    # phi adds search_knowledge_base as a tool whenever knowledge is set and search_knowledge is left on
+    assert runs_blocking_io(Agent(knowledge=AgentKnowledge()))
+    assert not runs_blocking_io(Agent(knowledge=AgentKnowledge(), search_knowledge=False))
+    assert runs_blocking_io(Agent().model_copy(update={"storage": object()}))
+
+
+class SlowMemoryStorage(AgentStorage):
+    """
+    Session storage with a fixed sync round trip per read/write, standing in for the services' PgAgentStorage.
+    """
+
+    def __init__(self, latency: float = 0.005):
+        self.latency = latency
+        self.sessions: Dict[str, AgentSession] = {}
+        self.lock = threading.Lock()
+
+    def create(self) -> None:
+        pass
+
+    def read(self, session_id: str, user_id: Optional[str] = None) -> Optional[AgentSession]:
+        time.sleep(self.latency)
+        with self.lock:
+            return self.sessions.get(session_id)
+
+    def get_all_session_ids(self, user_id: Optional[str] = None, agent_id: Optional[str] = None) -> List[str]:
+        return list(self.sessions)
+
+    def get_all_sessions(self, user_id: Optional[str] = None, agent_id: Optional[str] = None) -> List[AgentSession]:
+        return list(self.sessions.values())
+
+    def upsert(self, session: AgentSession) -> Optional[AgentSession]:
+        time.sleep(self.latency)
+        with self.lock:
+            self.sessions[session.session_id] = session
+        return session
+
+    def delete_session(self, session_id: Optional[str] = None):
+        self.sessions.pop(session_id, None)
+
+    def drop(self) -> None:
+        self.sessions.clear()
+
+    def upgrade_schema(self) -> None:
+        pass
+
+
+def _make_service_agent(client: OpenAI, storage: AgentStorage) -> Agent:
+    # Configured like the email/free_chat executors: session storage plus a knowledge base searched as a tool
+    agent = _make_agent(client, None)
+    agent.storage = storage
+    agent.knowledge = AgentKnowledge()
+    return agent
+
+
+def test_service_agents_capacity_benchmark():
+    """
+    Before/after for agents configured the way the services build them (session storage, knowledge
+    search), which must run on a thread: asyncio.to_thread on the default executor at Python's default
+    size (the old path) vs arun_agent on the dedicated AGENT_WORKER_THREADS pool.
+    """
+    calls = 128
+    default_workers = min(32, (os.cpu_count() or 1) + 4)
+    client = OpenAI(api_key="sk-test", http_client=httpx.Client(transport=httpx.MockTransport(_sync_handler),
+                                                                limits=httpx.Limits(max_connections=calls)))
+    storage = SlowMemoryStorage()
+
+    async def run(use_arun_agent: bool) -> float:
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=default_workers))
+        agents = [_make_service_agent(client, storage) for _ in range(calls)]
+        assert all(runs_blocking_io(agent) for agent in agents)
+        started = time.perf_counter()
+        if use_arun_agent:
+            responses = await asyncio.gather(*(arun_agent(agent, message="hi") for agent in agents))
+        else:
+            responses = await asyncio.gather(*(asyncio.to_thread(agent.run, "hi") for agent in agents))
+        assert all(response.content == "ok" for response in responses)
+        return time.perf_counter() - started
+
+    before = asyncio.run(run(False))
+    after = asyncio.run(run(True))
+    assert len(storage.sessions) == 2 * calls
+    print(f"\n{calls} service agent calls, {LATENCY}s latency: default executor ({default_workers} threads) "
+          f"{before:.3f}s ({calls / before:.0f}/s), agent pool ({settings.AGENT_WORKER_THREADS} threads) "
+          f"{after:.3f}s ({calls / after:.0f}/s)")
+    assert after < before
+
+
+def test_utility_agents_capacity_benchmark(monkeypatch):
+    """
+    Before/after for agents without storage, knowledge or tools (the vision, vector query and summary
+    utility agents): to_thread on a small pool vs natively async through the shared async client.
+    """
+    calls, workers = 32, 4
+    client = OpenAI(api_key="sk-test", http_client=httpx.Client(transport=httpx.MockTransport(_sync_handler)))
+    async def run_on_threads() -> float:
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+        agents = [_make_agent(client, None) for _ in range(calls)]
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(asyncio.to_thread(agent.run, "hi") for agent in agents))
+        assert all(response.content == "ok" for response in responses)
+        return time.perf_counter() - started
+
+    async def run_async() -> float:
+        async_client = AsyncOpenAI(api_key="sk-test",
+                                   http_client=httpx.AsyncClient(transport=httpx.MockTransport(_async_handler)))
+        monkeypatch.setattr(openai_clients.openai_client_pool, "get_async_client", lambda: async_client)
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+        agents = [_make_agent(client, async_client) for _ in range(calls)]
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(arun_agent(agent, message="hi") for agent in agents))
+        assert all(response.content == "ok" for response in responses)
+        return time.perf_counter() - started
+
+    threaded = asyncio.run(run_on_threads())
+    native = asyncio.run(run_async())
+    print(f"\n{calls} calls, {workers} worker threads, {LATENCY}s latency: "
+          f"to_thread {threaded:.3f}s ({calls / threaded:.0f}/s), arun {native:.3f}s ({calls / native:.0f}/s)")
+    assert native < threaded
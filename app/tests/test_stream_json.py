@@ -0,0 +1,160 @@
+import json
+import random
+import time
+
+import pytest
+
+from app.utils.stream_json import JsonArrayStreamParser
+
+DOCUMENTS = [
+    '{"response": []}',
+    '{"response": [{"a": 1}]}',
+    '{"response": [{"a": 1}, {"b": [1, 2, {"c": null}]}, {"d": {"e": {"f": true}}}]}',
+    # Structural characters and escaped quotes inside strings
+    '{"response": [{"text": "braces { } and brackets [ ] inside"}, {"q": "say \\"hi\\" {now}"}]}',
+    '{"response": [{"path": "C:\\\\dir\\\\", "next": "}"}, {"tab": "\\t\\n\\u00e9\\ud83d\\ude00"}]}',
+    # Keys before the array may contain brackets too
+    '{"title [draft]": "x [y]", "response": [{"id": 1}, {"id": 2}]}',
+    # Scalars, nested arrays and whitespace between elements
+    '{"response": [ 1 , -2.5e3,"s",true ,false, null, [1, [2]], {} ,\n\t[] ]}',
+    # Anything after the array is ignored
+    '{"response": [{"id": 1}], "other": [{"id": 2}]} trailing text',
+]
+
+
+def _expected(document: str):
+    decoder = json.JSONDecoder()
+    return decoder.raw_decode(document)[0]["response"]
+
+
+def _parse(chunks):
+    parser = JsonArrayStreamParser()
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    items.extend(parser.close())
+    assert parser.malformed == 0
+    return items
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_whole_document(document):
+    assert _parse([document]) == _expected(document)
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_every_single_split(document):
+    expected = _expected(document)
+    for i in range(len(document) + 1):
+        assert _parse([document[:i], document[i:]]) == expected, f"split at {i}"
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_every_split_pair(document):
+    expected = _expected(document)
+    for i in range(len(document) + 1):
+        for j in range(i, len(document) + 1):
+            assert _parse([document[:i], document[i:j], document[j:]]) == expected, f"splits at {i}, {j}"
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_one_character_chunks(document):
+    assert _parse(list(document)) == _expected(document)
+
+
+def _random_element(rng: random.Random, depth: int = 0):
+    kind = rng.randrange(7 if depth < 3 else 4)
+    if kind == 0:
+        return rng.choice([0, -1, 3.25, 1e10, True, False, None])
+    if kind in (1, 2, 3):
+        alphabet = 'ab {}[],:"\\/\n\té😀'
+        return "".join(rng.choice(alphabet) for _ in range(rng.randrange(12)))
+    if kind in (4, 5):
+        return {f"k{i}{rng.choice('{}[]\"')}": _random_element(rng, depth + 1) for i in range(rng.randrange(4))}
+    return [_random_element(rng, depth + 1) for _ in range(rng.randrange(4))]
+
+
+def test_random_documents_random_splits():
+    rng = random.Random(18)
+    for _ in range(500):
+        expected = [_random_element(rng) for _ in range(rng.randrange(6))]
+        document = json.dumps({"response": expected}, ensure_ascii=rng.random() < 0.5,
+                              indent=rng.choice([None, 2]))
+        cuts = sorted(rng.sample(range(len(document) + 1), min(rng.randrange(1, 8), len(document) + 1)))
+        chunks = [document[a:b] for a, b in zip([0] + cuts, cuts + [len(document)])]
+        assert _parse(chunks) == expected, document
+
+
+def test_truncated_element_is_counted_as_malformed():
+    parser = JsonArrayStreamParser()
+    assert parser.feed('{"response": [{"id": 1}, {"id": ') == [{"id": 1}]
+    assert parser.close() == []
+    assert parser.malformed == 1
+
+
+def test_invalid_element_is_skipped_and_counted():
+    parser = JsonArrayStreamParser()
+    assert parser.feed('{"response": [{"id": 1,}, {"id": 2}]}') == [{"id": 2}]
+    assert parser.malformed == 1
+
+
+def _legacy_extract(chunks):
+    """
+    The character-by-character brace loop the services used before JsonArrayStreamParser.
+    """
+    items = []
+    buffer = ""
+    inside_array = False
+    brace_depth = 0
+    object_buffer = ""
+    for value in chunks:
+        buffer += value
+        if not inside_array and "[" in buffer:
+            inside_array = True
+            buffer = buffer.split("[", 1)[1]
+            continue
+        if inside_array:
+            for char in value:
+                if char == "{":
+                    if brace_depth == 0:
+                        object_buffer = ""
+                    brace_depth += 1
+                    object_buffer += char
+                elif char == "}":
+                    brace_depth -= 1
+                    object_buffer += char
+                    if brace_depth == 0:
+                        try:
+                            items.append(json.loads(object_buffer))
+                        except json.JSONDecodeError:
+                            pass
+                        object_buffer = ""
+                elif brace_depth > 0:
+                    object_buffer += char
+    return items
+
+
+def test_parser_micro_benchmark():
+    """
+    Before/after: a 500-element response streamed in 8-character chunks (typical token sizes), parsed
+    with the old brace loop and with JsonArrayStreamParser.
+    """
+    elements = [{"section": f"Section {i}", "content": "Lorem ipsum dolor sit amet, consectetur adipiscing. " * 8,
+                 "tags": ["a", "b", "c"]} for i in range(500)]
+    # The old loop drops the rest of the chunk holding '[', so start the array on its own chunk
+    prefix = '{"response": ['
+    body = json.dumps(elements)[1:]
+    chunks = [prefix] + [body[i:i + 8] for i in range(0, len(body), 8)]
+
+    started = time.perf_counter()
+    legacy = _legacy_extract(chunks)
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    parsed = _parse(chunks)
+    parser_time = time.perf_counter() - started
+
+    assert parsed == legacy == elements
+    size = len(prefix) + len(body)
+    print(f"\n{size} bytes in {len(chunks)} chunks: brace loop {legacy_time * 1000:.1f}ms, "
+          f"JsonArrayStreamParser {parser_time * 1000:.1f}ms ({size / parser_time / 1e6:.1f} MB/s)")
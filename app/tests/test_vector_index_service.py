@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+
+from app.services import vector_index_service
+from app.services.storage_cache import tenant_registry
+
+TABLES = [f"tenant_{i}" for i in range(4)]
+
+
+class FakeLockConnection:
+    def __init__(self, locks: set):
+        self.locks = locks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params):
+        sql, key = str(statement), params["key"]
+        if "pg_try_advisory_lock" in sql:
+            acquired = key not in self.locks
+            self.locks.add(key)
+            return FakeResult(acquired)
+        self.locks.discard(key)
+        return FakeResult(True)
+
+    async def commit(self):
+        pass
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeEngine:
+    """One Postgres server shared by every worker: advisory locks are server-wide."""
+
+    def __init__(self):
+        self.locks = set()
+
+    def connect(self):
+        return FakeLockConnection(self.locks)
+
+
+class FakeSession:
+    def __init__(self, removed: list):
+        self.removed = removed
+
+    def remove(self):
+        self.removed.append(threading.get_ident())
+
+
+class FakeVectorDb:
+    def __init__(self, table_name, maintained: list, removed: list):
+        self.table_name = table_name
+        self.maintained = maintained
+        self.Session = FakeSession(removed)
+
+    def maintain_vector_index(self):
+        self.maintained.append((self.table_name, threading.get_ident()))
+        time.sleep(0.01)
+        return {"table": self.table_name, "rows": 100, "action": "skipped"}
+
+
+def test_only_one_worker_maintains_and_the_registry_is_untouched(monkeypatch):
+    maintained, removed = [], []
+
+    async def list_tables():
+        return TABLES
+
+    monkeypatch.setattr(vector_index_service, "async_engine", FakeEngine())
+    monkeypatch.setattr(vector_index_service, "list_vector_tables", list_tables)
+    monkeypatch.setattr(vector_index_service, "build_custom_vector_db",
+                        lambda table_name, *args: FakeVectorDb(table_name, maintained, removed))
+    registry_before = tenant_registry.stats()
+
+    async def run_workers():
+        # Three uvicorn workers firing the same scheduled job at once
+        return await asyncio.gather(*(vector_index_service.maintain_vector_indexes() for _ in range(3)))
+
+    results = asyncio.run(run_workers())
+
+    assert sorted(len(summary) for summary in results) == [0, 0, len(TABLES)]
+    assert [table for table, _ in maintained] == TABLES  # each table maintained once
+    assert sorted(removed) == sorted(thread for _, thread in maintained)  # session removed on its thread
+    assert tenant_registry.stats() == registry_before
+    # The lock is released: the next run maintains again
+    assert len(asyncio.run(vector_index_service.maintain_vector_indexes())) == len(TABLES)
@@ -1,5 +1,17 @@
 from .redis_client import redis_client
 from .file_helper import save_file, preprocess_markdown, preprocess_text_using_openai
-from .agent_manager import AgentManager
+from .agent_manager import AgentManager, agent_manager
+from .embedding_cache import embedding_cache, query_embedding_cache
+from .rerank_cache import rerank_cache
+from .template_cache import template_cache
+from .stream_bridge import iterate_in_thread
+from .stream_json import JsonArrayStreamParser
+from .memory_profiler import memory_profiler
+from .sse import sse_response, sse_metrics
+from .openai_clients import openai_client_pool, openai_models, arun_agent
+from .audio_transcriber import audio_transcriber
 
-__all__ = ['redis_client', "save_file", "preprocess_markdown", "preprocess_text_using_openai", "AgentManager"]
+__all__ = ['redis_client', "save_file", "preprocess_markdown", "preprocess_text_using_openai", "AgentManager", "agent_manager", "embedding_cache",
+           "query_embedding_cache", "rerank_cache", "template_cache",
+           "iterate_in_thread", "JsonArrayStreamParser", "memory_profiler", "sse_response", "sse_metrics", "openai_client_pool", "openai_models", "arun_agent",
+           "audio_transcriber"]
@@ -1,49 +1,59 @@
+import asyncio
+import re
+from threading import Lock
+from typing import Any, Dict, List
+
 from phi.agent import Agent
-from phi.model.openai import OpenAIChat
 from app.core import settings
-import asyncio
-import openai
 from phi.tools.firecrawl import FirecrawlTools
 from textwrap import dedent
 
+from app.utils.agent_templates import AgentTemplateRegistry
+from app.utils.audio_transcriber import audio_transcriber
 from app.utils.trafilatura_tool import TrafilaturaTools
+from app.utils.openai_clients import arun_agent, openai_models
 
 
 class AgentManager:
-    def __init__(self):
-        self.agent = None
+    """
+    Keyed registry of the utility agents used by ingestion and helpers (vision, audio summary, vector query
+    rewriting, webpage summary).
 
-    async def get_image_to_text_agent(self):
-        if self.agent is None:
-            self.agent = Agent(
-                system_prompt="""
-                                You are a vision and reasoning expert. When analyzing an image:
-                                
-                                1. Describe all visible elements — people, objects, handwriting, background, layout, etc.
-                                2. Extract any visible text, whether typed or handwritten.
-                                3. If the image contains diagrams, equations, or logical steps, summarize and explain the reasoning.
-                                4. If no meaningful content is found, clearly say so — do not guess.
-                                
-                                Always answer clearly using plain language. Be accurate, structured, and helpful.
-                                """,
-                markdown=True,
-            )
-
-            self.agent.model = OpenAIChat(
-                id=settings.OPENAI_MODEL,
-                model=settings.OPENAI_MODEL,
-                max_completion_tokens=2000,
-                temperature=0.3,
-                api_key=settings.OPENAI_API_KEY,
-                top_p=1.0
-            )
-        return self.agent
+    Each agent is registered under its own key and built once, at ``warmup()`` or on first use. Every
+    ``get_*_agent`` call returns a fresh clone of that template bound to a pooled model, so callers
+    never get another kind of agent and concurrent callers never share run state or memory.
+    Builds and clones are counted per key in ``stats()``.
+    """
 
-    async def get_audio_to_text_summary_agent(self):
-        if self.agent is None:
-            # Agent responsible for generating summaries from transcripts
-            self.agent = Agent(
-                system_prompt="""
+    VISION = "vision"
+    AUDIO_SUMMARY = "audio_summary"
+    VECTOR_QUERY = "vector_query"
+    WEBPAGE_SUMMARY = "webpage_summary"
+
+    def __init__(self):
+        self.templates = AgentTemplateRegistry()
+        self._model_params: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+        self._register(
+            self.VISION,
+            {"max_completion_tokens": 2000, "temperature": 0.3, "top_p": 1.0},
+            system_prompt="""
+                        You are a vision and reasoning expert. When analyzing an image:
+                        
+                        1. Describe all visible elements — people, objects, handwriting, background, layout, etc.
+                        2. Extract any visible text, whether typed or handwritten.
+                        3. If the image contains diagrams, equations, or logical steps, summarize and explain the reasoning.
+                        4. If no meaningful content is found, clearly say so — do not guess.
+                        
+                        Always answer clearly using plain language. Be accurate, structured, and helpful.
+                        """,
+            markdown=True,
+        )
+        # Agent responsible for generating summaries from transcripts
+        self._register(
+            self.AUDIO_SUMMARY,
+            {"max_completion_tokens": 2000, "temperature": 0.2, "top_p": 1.0},
+            system_prompt="""
                 You are an expert conversation summarization assistant.
 
                 You will receive a transcript generated from recorded conversations such as:
@@ -61,105 +71,137 @@ class AgentManager:
                 Format your output as a **clear and structured summary**, using bullets or short paragraphs as appropriate.
                 Always be concise, accurate, and context-aware.
                 """,
-                markdown=True,
-            )
+            markdown=True,
+        )
+        self._register(
+            self.VECTOR_QUERY,
+            {"max_completion_tokens": 50, "temperature": 0.1, "top_p": 1.0},
+            system_prompt="""
+                        You are an expert at transforming user prompts into precise, targeted vector search queries. 
+                        Your primary task is to identify and distill the core intent or main subject from natural language inputs.
+
+                        Instructions:
+                        - Clearly pinpoint the central topic or intent of each prompt.
+                        - Omit all greetings, pleasantries, and unnecessary context.
+                        - Ensure queries remain concise, specific, and directly searchable within a vector database.
+                        - Do not add explanations, examples, or extraneous information—only output the refined query.
+                        
+                        You will get user prompt as input and you need to transform it into a vector search query to search vector chunks from database.
+                        
+                        Example: Function Analysis Report for XYZ Solutions Private Limited, India and XYZ Solutions LLC, UAE
+                        """,
+            markdown=True,
+        )
+        self._register(
+            self.WEBPAGE_SUMMARY,
+            {"max_completion_tokens": 2000, "temperature": 0.3, "top_p": 1.0},
+            name="web researcher and content extractor",
+            system_prompt=dedent("""
+                        You are an expert web researcher and content extractor.
+                        Extract comprehensive, structured information from the provided webpage. Focus on:
+
+                        1. Accurately capturing the page title, description, and key features
+                        2. Identifying and extracting main content sections with their headings
+                        3. Finding important links to related pages or resources
+                        4. Locating contact information if available
+                        5. Extracting relevant metadata that provides context about the site
+                        """),
+            markdown=True,
+            tools=[TrafilaturaTools()]
+        )
+
+    def _register(self, key: str, model_params: Dict[str, Any], /, **config) -> None:
+        self._model_params[key] = model_params
+        self.templates.register(key, Agent, **config)
+
+    def get_agent(self, key: str) -> Agent:
+        agent = self.templates.create(key)
+        agent.model = openai_models.get(settings.OPENAI_MODEL, **self._model_params[key])
+        return agent
+
+    def warmup(self) -> None:
+        """
+        Build every utility agent template, e.g. when an API or Celery worker process starts.
+        """
+        with self._lock:
+            self.templates.warmup()
 
-            self.agent.model = OpenAIChat(
-                id=settings.OPENAI_MODEL,
-                model=settings.OPENAI_MODEL,
-                max_completion_tokens=2000,
-                temperature=0.2,
-                api_key=settings.OPENAI_API_KEY,
-                top_p=1.0
-            )
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return self.templates.stats()
 
-        return self.agent
+    async def get_image_to_text_agent(self):
+        return self.get_agent(self.VISION)
+
+    async def get_audio_to_text_summary_agent(self):
+        return self.get_agent(self.AUDIO_SUMMARY)
 
     @staticmethod
     async def transcribe_audio(audio_file_path):
-        client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-
-        with open(audio_file_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                file=audio_file,
-                model="whisper-1"
-            )
-
-        return transcript.text
+        return await audio_transcriber.transcribe(audio_file_path)
 
-    async def summarize_audio(self, audio_file_path):
+    @staticmethod
+    def _pack(pieces: List[str], max_chars: int, separator: str) -> List[str]:
+        """
+        Greedily join consecutive pieces into groups of at most ``max_chars`` (a longer piece stays alone).
+        """
+        groups, current, size = [], [], 0
+        for piece in pieces:
+            if current and size + len(piece) > max_chars:
+                groups.append(separator.join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + len(separator)
+        if current:
+            groups.append(separator.join(current))
+        return groups
+
+    async def _summarize(self, prompt: str) -> str:
+        # Each call gets its own clone, so map steps can run concurrently
         agent = await self.get_audio_to_text_summary_agent()
+        response = await arun_agent(agent, message=prompt)
+        return response.content
 
-        # # Step 1: Transcribe audio using Whisper
+    async def summarize_audio(self, audio_file_path):
+        # Step 1: Transcribe audio using Whisper
         transcript = await self.transcribe_audio(audio_file_path)
 
-        summary_prompt = f"""
+        chunks = self._pack(re.split(r"(?<=[.!?])\s+", transcript), settings.AUDIO_SUMMARY_CHUNK_CHARS, " ")
+        if len(chunks) <= 1:
+            return await self._summarize(f"""
         Summarize the following audio transcript:
         \"\"\"
         {transcript}
         \"\"\"
-        """
+        """)
 
-        # Step 2: Generate summary using the agent
-        response = await asyncio.to_thread(agent.run,
-                                           message=summary_prompt
-                                           )
-        return response.content
+        # Step 2 (map): summarize consecutive parts of a long recording concurrently
+        summaries = await asyncio.gather(*(self._summarize(f"""
+        Summarize part {i + 1} of {len(chunks)} of an audio transcript:
+        \"\"\"
+        {chunk}
+        \"\"\"
+        """) for i, chunk in enumerate(chunks)))
+
+        # Step 3 (reduce): merge the partial summaries, in groups if they are still too long
+        while len(summaries) > 1:
+            groups = self._pack(summaries, settings.AUDIO_SUMMARY_CHUNK_CHARS, "\n\n")
+            if len(groups) == len(summaries):
+                groups = ["\n\n".join(summaries)]  # Summaries too long to pair up: merge them in one call
+            summaries = await asyncio.gather(*(self._summarize(f"""
+        The following are summaries of consecutive parts of one recording, in order.
+        Combine them into a single summary of the whole recording, merging repeated points:
+        \"\"\"
+        {group}
+        \"\"\"
+        """) for group in groups))
+        return summaries[0]
 
     async def get_vector_query_agent(self):
-        if self.agent is None:
-            self.agent = Agent(
-                system_prompt="""
-                                You are an expert at transforming user prompts into precise, targeted vector search queries. 
-                                Your primary task is to identify and distill the core intent or main subject from natural language inputs.
-
-                                Instructions:
-                                - Clearly pinpoint the central topic or intent of each prompt.
-                                - Omit all greetings, pleasantries, and unnecessary context.
-                                - Ensure queries remain concise, specific, and directly searchable within a vector database.
-                                - Do not add explanations, examples, or extraneous information—only output the refined query.
-                                
-                                You will get user prompt as input and you need to transform it into a vector search query to search vector chunks from database.
-                                
-                                Example: Function Analysis Report for XYZ Solutions Private Limited, India and XYZ Solutions LLC, UAE
-                                """,
-                markdown=True,
-            )
-
-            self.agent.model = OpenAIChat(
-                id=settings.OPENAI_MODEL,
-                model=settings.OPENAI_MODEL,
-                max_completion_tokens=50,
-                temperature=0.1,
-                api_key=settings.OPENAI_API_KEY,
-                top_p=1.0
-            )
-        return self.agent
+        return self.get_agent(self.VECTOR_QUERY)
 
     async def get_webpage_summary_agent(self):
-        if self.agent is None:
-            self.agent = Agent(
-                name="web researcher and content extractor",
-                system_prompt=dedent("""
-                                You are an expert web researcher and content extractor.
-                                Extract comprehensive, structured information from the provided webpage. Focus on:
-
-                                1. Accurately capturing the page title, description, and key features
-                                2. Identifying and extracting main content sections with their headings
-                                3. Finding important links to related pages or resources
-                                4. Locating contact information if available
-                                5. Extracting relevant metadata that provides context about the site
-                                """),
-                markdown=True,
-                tools=[TrafilaturaTools()]
-            )
-
-            self.agent.model = OpenAIChat(
-                id=settings.OPENAI_MODEL,
-                model=settings.OPENAI_MODEL,
-                max_completion_tokens=2000,
-                temperature=0.3,
-                api_key=settings.OPENAI_API_KEY,
-                top_p=1.0
-            )
-        return self.agent
+        return self.get_agent(self.WEBPAGE_SUMMARY)
+
+
+# Create a global instance shared by the API and ingestion workers
+agent_manager = AgentManager()
@@ -0,0 +1,89 @@
+import copy
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Tuple, Type
+from uuid import uuid4
+
+from phi.agent import Agent
+from pydantic import BaseModel
+
+
+class AgentTemplateRegistry:
+    """
+    Prebuilt agent templates per request type, cloned cheaply for each request.
+
+    Each service registers its agent class and static configuration (name, description, task,
+    guidelines, flags) once at import. The template is built on first use or at ``warmup()``.
+    ``create()`` returns a shallow copy that shares that immutable configuration. Per-request handles
+    (session, user, memory, knowledge, storage) are bound on the copy. Every other mutable field (run
+    response, model, lists and dicts phi fills during a run) is reset to a fresh default, so concurrent
+    requests never share run state. Services only ever reassign fields on their copy (system_prompt,
+    instructions, guidelines, context, model), which leaves the template untouched.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Tuple[Type[Agent], Dict[str, Any]]] = {}
+        self._templates: Dict[str, Agent] = {}
+        self._fresh_fields: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self.builds = Counter()
+        self.clones = Counter()
+
+    def register(self, key: str, agent_class: Type[Agent], /, **config) -> None:
+        with self._lock:
+            self._factories[key] = (agent_class, config)
+            self._templates.pop(key, None)
+
+    def _template(self, key: str) -> Agent:
+        template = self._templates.get(key)
+        if template is not None:
+            return template
+        with self._lock:
+            if key not in self._templates:
+                agent_class, config = self._factories[key]
+                template = agent_class(**config)
+                fields = type(template).model_fields
+                # Everything mutable that is not static configuration gets a fresh value per clone
+                self._fresh_fields[key] = [
+                    field for field in fields
+                    if field not in config and isinstance(getattr(template, field), (list, dict, set, BaseModel))
+                ]
+                self._templates[key] = template
+                self.builds[key] += 1
+            return self._templates[key]
+
+    def warmup(self) -> None:
+        """
+        Build every registered template up front, e.g. at process start.
+        """
+        for key in list(self._factories):
+            self._template(key)
+
+    def create(self, key: str, /, **bindings) -> Agent:
+        """
+        Return a per-request agent for ``key`` with ``bindings`` (session_id, user_id, agent_id, memory,
+        knowledge, storage, ...) applied on top of the shared template.
+        """
+        template = self._template(key)
+        fields = type(template).model_fields
+        update = {field: fields[field].get_default(call_default_factory=True)
+                  for field in self._fresh_fields[key] if field not in bindings}
+        # Attributes set by agent subclasses outside the declared fields (e.g. filters_ags)
+        for attr, value in (template.__pydantic_extra__ or {}).items():
+            if attr not in bindings:
+                update[attr] = copy.copy(value)
+        update.update(bindings)
+        # Same defaults the Agent validators apply when these are missing
+        update["session_id"] = update.get("session_id") or str(uuid4())
+        update["agent_id"] = update.get("agent_id") or str(uuid4())
+        with self._lock:
+            self.clones[key] += 1
+        return template.model_copy(update=update)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {key: {"builds": self.builds[key], "clones": self.clones[key]} for key in self._factories}
+
+
+# Create a global instance
+agent_templates = AgentTemplateRegistry()
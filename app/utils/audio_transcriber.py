@@ -0,0 +1,138 @@
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+from difflib import SequenceMatcher
+from typing import List, Optional
+
+import aiofiles
+from phi.utils.log import logger
+
+from app.core import settings
+from app.utils.openai_clients import model_limiter, openai_client_pool
+
+_WORD = re.compile(r"\w+")
+
+
+def stitch_transcripts(parts: List[str], min_match_words: int = 3, window_words: int = 60) -> str:
+    """
+    Join transcripts of overlapping segments, dropping the words repeated in each overlap.
+
+    The overlap is found as the longest run of matching words (case and punctuation ignored) between the
+    tail of one part and the head of the next; words cut off at either segment edge are dropped with it.
+    Parts without a match of at least ``min_match_words`` words are simply concatenated.
+    """
+    words: List[str] = []
+    for part in parts:
+        part_words = part.split()
+        if not words:
+            words = part_words
+            continue
+        tail_start = max(len(words) - window_words, 0)
+        tail = [_normalize(word) for word in words[tail_start:]]
+        head = [_normalize(word) for word in part_words[:window_words]]
+        match = SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(0, len(tail), 0, len(head))
+        if match.size >= min_match_words:
+            words = words[:tail_start + match.a + match.size] + part_words[match.b + match.size:]
+        else:
+            words.extend(part_words)
+    return " ".join(words)
+
+
+def _normalize(word: str) -> str:
+    return "".join(_WORD.findall(word.lower()))
+
+
+class AudioTranscriber:
+    """
+    Transcribes audio/video uploads through the shared async OpenAI client without blocking the loop.
+
+    Files short and small enough go up in a single request. Longer ones are cut with ffmpeg into
+    ``segment_seconds`` segments overlapping by ``overlap_seconds`` (mono 16 kHz mp3, well under the
+    upload limit), which are extracted and transcribed ``concurrency`` at a time within the model's
+    concurrency limit and stitched back in order. Without ffmpeg on PATH only files under the upload
+    limit can be transcribed.
+    """
+
+    def __init__(self, model: str, segment_seconds: int, overlap_seconds: int, concurrency: int,
+                 max_upload_bytes: int):
+        self.model = model
+        self.segment_seconds = segment_seconds
+        self.overlap_seconds = min(overlap_seconds, segment_seconds // 2)
+        self.concurrency = concurrency
+        self.max_upload_bytes = max_upload_bytes
+        self.ffmpeg = shutil.which("ffmpeg")
+        self.ffprobe = shutil.which("ffprobe")
+
+    @staticmethod
+    async def _run(*args: str) -> bytes:
+        process = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.PIPE)
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"{os.path.basename(args[0])} failed: {stderr.decode(errors='ignore')[-500:]}")
+        return stdout
+
+    async def probe_duration(self, path: str) -> Optional[float]:
+        if self.ffprobe is None:
+            return None
+        try:
+            output = await self._run(self.ffprobe, "-v", "error", "-show_entries", "format=duration",
+                                     "-of", "default=noprint_wrappers=1:nokey=1", path)
+            return float(output.strip())
+        except (RuntimeError, ValueError) as e:
+            logger.warning(f"Could not read duration of {path}: {str(e)}")
+            return None
+
+    async def _extract_segment(self, path: str, start: float, output_path: str) -> None:
+        await self._run(self.ffmpeg, "-nostdin", "-y", "-v", "error", "-ss", str(start), "-t", str(self.segment_seconds),
+                        "-i", path, "-vn", "-ac", "1", "-ar", "16000", "-b:a", "64k", output_path)
+
+    async def _transcribe_file(self, path: str) -> str:
+        async with aiofiles.open(path, "rb") as audio_file:
+            data = await audio_file.read()
+        async with model_limiter.limit(self.model):
+            transcript = await openai_client_pool.get_async_client().audio.transcriptions.create(
+                file=(os.path.basename(path), data),
+                model=self.model
+            )
+        return transcript.text
+
+    async def transcribe(self, path: str) -> str:
+        size = os.path.getsize(path)
+        duration = await self.probe_duration(path)
+        if size <= self.max_upload_bytes and (duration is None or duration <= self.segment_seconds):
+            return await self._transcribe_file(path)
+        if self.ffmpeg is None or duration is None:
+            raise ValueError(f"Audio file is {size} bytes, above the {self.max_upload_bytes} byte upload limit, "
+                             f"and ffmpeg/ffprobe are not available to split it")
+
+        step = self.segment_seconds - self.overlap_seconds
+        starts = [i * step for i in range(max(int((duration - self.overlap_seconds - 1e-6) // step) + 1, 1))]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        with tempfile.TemporaryDirectory() as workdir:
+            async def transcribe_segment(index: int, start: float) -> str:
+                async with semaphore:
+                    segment_path = os.path.join(workdir, f"segment_{index}.mp3")
+                    await self._extract_segment(path, start, segment_path)
+                    try:
+                        return await self._transcribe_file(segment_path)
+                    finally:
+                        os.remove(segment_path)
+
+            parts = await asyncio.gather(*(transcribe_segment(i, start) for i, start in enumerate(starts)))
+
+        logger.info(f"Transcribed {path}: {round(duration)}s in {len(parts)} segments")
+        return stitch_transcripts(parts)
+
+
+# Create a global instance
+audio_transcriber = AudioTranscriber(
+    settings.AUDIO_TRANSCRIPTION_MODEL,
+    segment_seconds=settings.AUDIO_SEGMENT_SECONDS,
+    overlap_seconds=settings.AUDIO_SEGMENT_OVERLAP_SECONDS,
+    concurrency=settings.AUDIO_TRANSCRIBE_CONCURRENCY,
+    max_upload_bytes=settings.AUDIO_MAX_UPLOAD_BYTES,
+)
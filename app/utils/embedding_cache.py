@@ -0,0 +1,210 @@
+import re
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Dict, Iterable, List, Optional
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.core import settings
+
+
+class EmbeddingCache:
+    """
+    Redis-backed content hash -> embedding cache shared across tenants.
+
+    Embeddings are stored as packed float32 bytes, keyed by embedder model, dimensions and the
+    md5 content hash that CustomPgVector already computes for every chunk.
+    """
+
+    def __init__(self, redis_url: str, expiry_seconds: int, prefix: str = "emb"):
+        self.redis_url = redis_url
+        self.expiry_seconds = expiry_seconds
+        self.prefix = prefix
+        self.client: Optional[Redis] = None
+
+    def _get_client(self) -> Redis:
+        # Sync client: upserts run on worker threads (asyncio.to_thread / Celery), not on the event loop
+        if self.client is None:
+            self.client = Redis.from_url(self.redis_url, decode_responses=False)
+        return self.client
+
+    def _key(self, model: str, dimensions: int, content_hash: str) -> str:
+        return f"{self.prefix}:{model}:{dimensions}:{content_hash}"
+
+    @staticmethod
+    def encode(embedding: List[float]) -> bytes:
+        return array("f", embedding).tobytes()
+
+    @staticmethod
+    def decode(value: bytes) -> List[float]:
+        embedding = array("f")
+        embedding.frombytes(value)
+        return embedding.tolist()
+
+    def get_many(self, model: str, dimensions: int, content_hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Fetch cached embeddings for the given content hashes with a single MGET.
+        Returns:
+            Dict[str, List[float]]: Embeddings for the hashes that were found.
+        """
+        content_hashes = list(dict.fromkeys(content_hashes))
+        if not content_hashes:
+            return {}
+        try:
+            values = self._get_client().mget([self._key(model, dimensions, h) for h in content_hashes])
+        except Exception as e:
+            print(f"❌ Error fetching embeddings from Redis: {str(e)}")
+            return {}
+        return {h: self.decode(v) for h, v in zip(content_hashes, values) if v}
+
+    def set_many(self, model: str, dimensions: int, embeddings: Dict[str, List[float]]) -> None:
+        """
+        Store embeddings keyed by content hash in a single pipeline.
+        """
+        if not embeddings:
+            return
+        try:
+            pipe = self._get_client().pipeline(transaction=False)
+            for content_hash, embedding in embeddings.items():
+                pipe.setex(self._key(model, dimensions, content_hash), self.expiry_seconds, self.encode(embedding))
+            pipe.execute()
+        except Exception as e:
+            print(f"❌ Error storing embeddings in Redis: {str(e)}")
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier (process LRU + Redis) cache for search query embeddings.
+
+    Keys are the embedder model id, dimensions and a hash of the normalized query text, so repeated
+    prompts skip the embedding API call. Redis values use the same float32 encoding as EmbeddingCache.
+    """
+
+    _WHITESPACE_RE = re.compile(r"\s+")
+
+    def __init__(self, redis_url: Optional[str], expiry_seconds: int, max_entries: int = 2048,
+                 prefix: str = "qemb"):
+        self.redis_url = redis_url
+        self.expiry_seconds = expiry_seconds
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.client: Optional[Redis] = None
+        self.async_client: Optional[AsyncRedis] = None
+        self._local: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        return cls._WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+    def key(self, model: str, dimensions: int, text: str) -> str:
+        digest = sha256(self.normalize(text).encode()).hexdigest()
+        return f"{self.prefix}:{model}:{dimensions}:{digest}"
+
+    def _get_client(self) -> Optional[Redis]:
+        if self.client is None and self.redis_url:
+            self.client = Redis.from_url(self.redis_url, decode_responses=False)
+        return self.client
+
+    def _get_async_client(self) -> Optional[AsyncRedis]:
+        if self.async_client is None and self.redis_url:
+            self.async_client = AsyncRedis.from_url(self.redis_url, decode_responses=False)
+        return self.async_client
+
+    def _get_local(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._local.get(key)
+            if embedding is not None:
+                self._local.move_to_end(key)
+                self.local_hits += 1
+            return embedding
+
+    def _remember(self, key: str, embedding: List[float]) -> None:
+        with self._lock:
+            self._local[key] = embedding
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _record_redis_result(self, key: str, value: Optional[bytes]) -> Optional[List[float]]:
+        if not value:
+            with self._lock:
+                self.misses += 1
+            return None
+        embedding = EmbeddingCache.decode(value)
+        self._remember(key, embedding)
+        with self._lock:
+            self.redis_hits += 1
+        return embedding
+
+    def get(self, key: str) -> Optional[List[float]]:
+        embedding = self._get_local(key)
+        if embedding is not None:
+            return embedding
+        try:
+            client = self._get_client()
+            value = client.get(key) if client is not None else None
+        except Exception as e:
+            print(f"❌ Error fetching query embedding from Redis: {str(e)}")
+            value = None
+        return self._record_redis_result(key, value)
+
+    async def get_async(self, key: str) -> Optional[List[float]]:
+        embedding = self._get_local(key)
+        if embedding is not None:
+            return embedding
+        try:
+            client = self._get_async_client()
+            value = await client.get(key) if client is not None else None
+        except Exception as e:
+            print(f"❌ Error fetching query embedding from Redis: {str(e)}")
+            value = None
+        return self._record_redis_result(key, value)
+
+    def set(self, key: str, embedding: List[float]) -> None:
+        self._remember(key, embedding)
+        try:
+            client = self._get_client()
+            if client is not None:
+                client.setex(key, self.expiry_seconds, EmbeddingCache.encode(embedding))
+        except Exception as e:
+            print(f"❌ Error storing query embedding in Redis: {str(e)}")
+
+    async def set_async(self, key: str, embedding: List[float]) -> None:
+        self._remember(key, embedding)
+        try:
+            client = self._get_async_client()
+            if client is not None:
+                await client.setex(key, self.expiry_seconds, EmbeddingCache.encode(embedding))
+        except Exception as e:
+            print(f"❌ Error storing query embedding in Redis: {str(e)}")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.local_hits + self.redis_hits + self.misses
+            return {
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_rate": (self.local_hits + self.redis_hits) / lookups if lookups else 0.0,
+                "local_size": len(self._local),
+            }
+
+
+# Create a global instance (None when the shared cache is disabled)
+embedding_cache = EmbeddingCache(
+    settings.REDIS_URL, settings.EMBEDDING_CACHE_EXPIRY_SECONDS
+) if settings.EMBEDDING_CACHE_ENABLED else None
+
+query_embedding_cache = QueryEmbeddingCache(
+    settings.REDIS_URL if settings.QUERY_EMBEDDING_CACHE_REDIS_ENABLED else None,
+    settings.EMBEDDING_CACHE_EXPIRY_SECONDS,
+    max_entries=settings.QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+) if settings.QUERY_EMBEDDING_CACHE_ENABLED else None
@@ -3,16 +3,15 @@ from typing import Tuple, List
 
 import aiofiles
 import markdown
-from phi.model.openai import OpenAIChat
 from phi.model.message import Message
 import asyncio
 import aiofiles.os
 from app.core import settings
+from app.utils.openai_clients import openai_models, model_limiter
 from docx import Document
 import base64
 
 TEMP_FOLDER = './temp_files'
-openai_api_key = settings.OPENAI_API_KEY
 ALLOWED_EXTENSIONS = {'pdf', 'txt', 'doc', 'docx', 'md', 'jpg', 'jpeg', 'png', 'csv', 'xls', 'xlsx', 'mp3', 'mp4',
                       'mpeg', 'mpga', 'wav', 'webm', 'm4a'}
 ALLOWED_MIMETYPES = {'application/pdf', 'text/plain', 'application/msword',
@@ -43,16 +42,15 @@ async def preprocess_text_using_openai(plain_text):
     openai_model = settings.OPENAI_MODEL
     openai_temp = settings.OPENAI_TEMP
 
-    openai_chat = OpenAIChat(
-        api_key=openai_api_key, id=openai_model, max_tokens=2000, temperature=openai_temp
-    )
+    openai_chat = openai_models.get(openai_model, max_tokens=2000, temperature=openai_temp)
 
     messages = [
         Message(role="system", content="Clean and clarify text for a knowledge base."),
         Message(role="user", content=f"Clean and clarify:\n\n{plain_text}")
     ]
 
-    response = await asyncio.to_thread(openai_chat.invoke, messages=messages)
+    async with model_limiter.limit(openai_model):
+        response = await openai_chat.ainvoke(messages=messages)
     return response.choices[0].message.content
 
 
@@ -0,0 +1,124 @@
+import gc
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from phi.utils.log import logger
+
+from app.core import settings
+
+
+def read_rss_bytes() -> Optional[int]:
+    """
+    Current resident set size of this process, or None when /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryProfiler:
+    """
+    Opt-in per-request memory instrumentation for finding leaks without a forced GC per request.
+
+    When enabled, ``track(request_type)`` records the RSS delta, a tracemalloc snapshot diff (top
+    allocation sites) and, when ``watch_types`` is set, instance-count deltas of those types (e.g. Agent,
+    Session) around a block, aggregated per request type. Deltas of concurrent requests overlap, so read
+    them as trends across many requests rather than exact per-request figures. When disabled ``track`` is
+    a no-op.
+    """
+
+    def __init__(self, enabled: bool, trace_frames: int = 1, top_allocations: int = 10,
+                 watch_types: Iterable[str] = ()):
+        self.enabled = enabled
+        self.trace_frames = trace_frames
+        self.top_allocations = top_allocations
+        self.watch_types = set(watch_types)
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_tracing(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+
+    def _count_watched(self) -> Counter:
+        # Walks every tracked object: debug-only cost, paid only when watch types are configured
+        if not self.watch_types:
+            return Counter()
+        return Counter(name for name in (type(obj).__name__ for obj in gc.get_objects())
+                       if name in self.watch_types)
+
+    @contextmanager
+    def track(self, request_type: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        self._ensure_tracing()
+        started = time.monotonic()
+        rss_before = read_rss_bytes()
+        objects_before = self._count_watched()
+        snapshot_before = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            snapshot_after = tracemalloc.take_snapshot()
+            rss_after = read_rss_bytes()
+            objects_delta = self._count_watched()
+            objects_delta.subtract(objects_before)
+            diff = snapshot_after.compare_to(snapshot_before, "lineno")
+            self._record(request_type, {
+                "duration_seconds": round(time.monotonic() - started, 3),
+                "rss_delta_bytes": rss_after - rss_before if rss_after is not None and rss_before is not None else None,
+                "traced_delta_bytes": sum(stat.size_diff for stat in diff),
+                "object_deltas": {name: delta for name, delta in objects_delta.items() if delta},
+                "top_allocations": [str(stat) for stat in diff[:self.top_allocations]],
+            })
+
+    def _record(self, request_type: str, sample: Dict[str, Any]) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(request_type, {
+                "requests": 0, "rss_delta_total_bytes": 0, "object_deltas_total": Counter(), "last": None,
+            })
+            stats["requests"] += 1
+            stats["rss_delta_total_bytes"] += sample["rss_delta_bytes"] or 0
+            stats["object_deltas_total"].update(sample["object_deltas"])
+            stats["last"] = sample
+        logger.info(f"Memory [{request_type}]: rss {sample['rss_delta_bytes']} B, "
+                    f"traced {sample['traced_delta_bytes']} B, objects {sample['object_deltas']}")
+
+    def stats(self) -> Dict[str, Any]:
+        traced, traced_peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "rss_bytes": read_rss_bytes(),
+                "peak_rss_bytes": peak_rss_bytes(),
+                "traced_bytes": traced,
+                "traced_peak_bytes": traced_peak,
+                "gc_counts": gc.get_count(),
+                "request_types": {
+                    name: {**stats, "object_deltas_total": dict(stats["object_deltas_total"])}
+                    for name, stats in self._stats.items()
+                },
+            }
+
+
+# Create a global instance
+memory_profiler = MemoryProfiler(
+    settings.MEMORY_PROFILING_ENABLED,
+    trace_frames=settings.MEMORY_PROFILING_TRACE_FRAMES,
+    watch_types=[name.strip() for name in settings.MEMORY_PROFILING_WATCH_TYPES.split(",") if name.strip()],
+)
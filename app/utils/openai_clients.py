@@ -0,0 +1,219 @@
+import asyncio
+import contextvars
+import functools
+import importlib.util
+import json
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from phi.agent import Agent
+from phi.model.openai import OpenAIChat
+
+from app.core import settings
+
+
+class OpenAIClientPool:
+    """
+    Shared OpenAI clients over pooled httpx connection pools (HTTP/2 when ``h2`` is installed).
+
+    The sync client (used by streams driven on worker threads) is process-wide. httpx async connections
+    belong to the event loop that opened them, so there is one async client per running loop: the API
+    process has a single loop, Celery tasks run on their own short-lived loops and should ``aclose()``
+    before closing them. Requests and newly opened connections are counted, so ``stats()`` shows how
+    often keep-alive connections were reused.
+    """
+
+    def __init__(self, api_key: str, http2: bool, max_connections: int, max_keepalive_connections: int):
+        self.api_key = api_key
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            print("❌ HTTP/2 requested for OpenAI but the 'h2' package is not installed, using HTTP/1.1")
+        self.max_connections = max_connections
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections)
+        self._client: Optional[OpenAI] = None
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    # -------------------- Connection accounting --------------------
+
+    def _count_connection(self, event_name: str) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+
+    def _on_request(self, request: httpx.Request) -> None:
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = lambda event_name, info: self._count_connection(event_name)
+
+    async def _aon_request(self, request: httpx.Request) -> None:
+        with self._lock:
+            self.requests += 1
+
+        async def trace(event_name, info):
+            self._count_connection(event_name)
+
+        request.extensions["trace"] = trace
+
+    # -------------------- Clients --------------------
+
+    def get_client(self) -> OpenAI:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = OpenAI(api_key=self.api_key, http_client=httpx.Client(
+                        http2=self.http2, limits=self.limits, event_hooks={"request": [self._on_request]}))
+        return self._client
+
+    def get_async_client(self) -> AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(api_key=self.api_key, http_client=httpx.AsyncClient(
+                http2=self.http2, limits=self.limits, event_hooks={"request": [self._aon_request]}))
+            self._clients[loop] = client
+        return client
+
+    @staticmethod
+    def _pool_usage(client) -> Dict[str, int]:
+        # httpx does not expose pool state publicly; read httpcore's pool defensively
+        pool = getattr(getattr(getattr(client, "_client", None), "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests, opened = self.requests, self.connections_opened
+        pools = ([self._client] if self._client is not None else []) + list(self._clients.values())
+        usage = [self._pool_usage(client) for client in pools]
+        active = sum(u["active"] for u in usage)
+        return {
+            "http2": self.http2,
+            "requests": requests,
+            "connections_opened": opened,
+            "connection_reuse_rate": 1 - opened / requests if requests else 0.0,
+            "pools": len(pools),
+            "open_connections": sum(u["open"] for u in usage),
+            "active_connections": active,
+            "pool_utilization": active / (self.max_connections * len(pools)) if pools else 0.0,
+        }
+
+    async def aclose(self) -> None:
+        """
+        Close the client bound to the running loop.
+        """
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+
+class ModelConcurrencyLimiter:
+    """
+    Caps in-flight LLM calls per model id (``OPENAI_MODEL_CONCURRENCY``, else the default), so one busy
+    model cannot take every connection or trip its rate limit for the others.
+    """
+
+    def __init__(self, limits: Dict[str, int], default_limit: int):
+        self.limits = limits
+        self.default_limit = default_limit
+        # Semaphores are bound to the loop they are first awaited on
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = \
+            weakref.WeakKeyDictionary()
+
+    def _semaphore(self, model_id: str) -> asyncio.Semaphore:
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if model_id not in semaphores:
+            semaphores[model_id] = asyncio.Semaphore(self.limits.get(model_id, self.default_limit))
+        return semaphores[model_id]
+
+    @asynccontextmanager
+    async def limit(self, model_id: str) -> AsyncIterator[None]:
+        async with self._semaphore(model_id):
+            yield
+
+
+# Dedicated pool for agents that do sync I/O, so they neither queue behind nor starve asyncio.to_thread work
+_agent_executor = ThreadPoolExecutor(max_workers=settings.AGENT_WORKER_THREADS, thread_name_prefix="agent")
+
+
+def runs_blocking_io(agent: Agent) -> bool:
+    """
+    Whether ``agent.arun`` would do synchronous I/O on the event loop: phi executes every tool call
+    synchronously (including the ``search_knowledge_base`` tool it adds for a knowledge base, i.e. an
+    embedding call plus a vector search) and reads/writes session storage and memory with sync drivers.
+    """
+    return bool(agent.get_tools()) or agent.storage is not None or agent.memory.db is not None
+
+
+async def arun_agent(agent: Agent, message: Optional[Any] = None, **kwargs) -> Any:
+    """
+    Run an agent within its model's concurrency limit: on the event loop through the shared async OpenAI
+    client, or, when it would block the loop (see ``runs_blocking_io``, e.g. every agent with session
+    storage), on the dedicated agent pool. That pool is sized by ``AGENT_WORKER_THREADS`` rather than the
+    small default executor, so the model limit, not the thread count, caps concurrent calls.
+    """
+    model_id = agent.model.id if agent.model is not None else settings.OPENAI_MODEL
+    async with model_limiter.limit(model_id):
+        if runs_blocking_io(agent):
+            # Run with the caller's context so context vars (e.g. the logged-in user) are visible to tools
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(
+                _agent_executor, functools.partial(context.run, agent.run, message, **kwargs))
+        if agent.model is not None:
+            agent.model.async_client = openai_client_pool.get_async_client()
+        return await agent.arun(message, **kwargs)
+
+
+class OpenAIModelRegistry:
+    """
+    Hands out OpenAIChat models wired to the shared pooled clients, keyed by model id and parameters.
+
+    phi keeps per-run state (tools, functions, metrics) on the model object, so each request still gets
+    its own lightweight OpenAIChat; what is shared is the HTTP clients and their keep-alive connections.
+    ``user`` and ``session_id`` are per-request fields and are not part of the key.
+    """
+
+    def __init__(self, pool: OpenAIClientPool):
+        self.pool = pool
+        self._models: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_id: str, user: Optional[str] = None, session_id: Optional[str] = None,
+            **params) -> OpenAIChat:
+        key = (model_id, json.dumps(params, sort_keys=True, default=str))
+        with self._lock:
+            entry = self._models.setdefault(key, {"model": model_id, "params": params, "uses": 0})
+            entry["uses"] += 1
+        model = OpenAIChat(id=model_id, api_key=self.pool.api_key, user=user, session_id=session_id,
+                           client=self.pool.get_client(), **params)
+        try:
+            model.async_client = self.pool.get_async_client()
+        except RuntimeError:
+            pass  # No running loop; arun_agent attaches the loop's client before async calls
+        return model
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = [{"model": entry["model"], "params": entry["params"], "uses": entry["uses"]}
+                      for entry in self._models.values()]
+        return {"models": models, "clients": self.pool.stats()}
+
+
+# Create global instances
+openai_client_pool = OpenAIClientPool(
+    settings.OPENAI_API_KEY,
+    http2=settings.OPENAI_HTTP2,
+    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+)
+model_limiter = ModelConcurrencyLimiter(settings.OPENAI_MODEL_CONCURRENCY, settings.OPENAI_DEFAULT_MODEL_CONCURRENCY)
+openai_models = OpenAIModelRegistry(openai_client_pool)
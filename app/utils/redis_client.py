@@ -1,5 +1,5 @@
 from redis.asyncio import Redis
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from app.core import settings
 
 
@@ -44,6 +44,41 @@ class AsyncRedisClient:
             print(f"❌ Error fetching value from Redis: {str(e)}")
             return None
 
+    async def get_many_async(self, keys: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Retrieve several values with a single MGET.
+        Args:
+            keys (List[str]): The keys to fetch.
+        Returns:
+            Tuple[Dict[str, str], List[str]]: The values found, and the keys that missed (all keys on error).
+        """
+        if not keys:
+            return {}, []
+        try:
+            values = await self.client.mget(keys)
+        except Exception as e:
+            print(f"❌ Error fetching values from Redis: {str(e)}")
+            return {}, list(keys)
+        found = {key: value for key, value in zip(keys, values) if value}
+        return found, [key for key in keys if key not in found]
+
+    async def set_many_async(self, values: Dict[str, str], expiry_seconds: Optional[int] = None):
+        """
+        Store several values with their expiry in a single pipeline round trip.
+        Args:
+            values (Dict[str, str]): Key/value pairs to store.
+            expiry_seconds (Optional[int]): Expiry override, CACHE_EXPIRY_SECONDS by default.
+        """
+        if not values:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipe.setex(key, expiry_seconds or self.CACHE_EXPIRY_SECONDS, value)
+            await pipe.execute()
+        except Exception as e:
+            print(f"❌ Error setting values in Redis: {str(e)}")
+
     async def close_async(self):
         """
         Close the Redis connection.
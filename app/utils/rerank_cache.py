@@ -0,0 +1,80 @@
+import json
+import threading
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Iterable, List, Optional, Tuple
+
+from redis import Redis
+
+from app.core import settings
+
+
+class RerankCache:
+    """
+    Two-level (process LRU + Redis) cache of rerank results.
+
+    Entries are keyed by reranker, query and the *set* of candidate content hashes, and hold the ranked
+    (content_hash, relevance_score) pairs so a hit can be mapped back onto freshly fetched candidates.
+    """
+
+    def __init__(self, redis_url: Optional[str], expiry_seconds: int, max_entries: int = 1024,
+                 prefix: str = "rerank"):
+        self.redis_url = redis_url
+        self.expiry_seconds = expiry_seconds
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.client: Optional[Redis] = None
+        self._local: "OrderedDict[str, List[Tuple[str, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_client(self) -> Optional[Redis]:
+        # Sync client: reranking already runs on worker threads
+        if self.client is None and self.redis_url:
+            self.client = Redis.from_url(self.redis_url, decode_responses=True)
+        return self.client
+
+    def key(self, reranker_id: str, query: str, candidate_hashes: Iterable[str]) -> str:
+        digest = sha256("\0".join([reranker_id, query, ",".join(sorted(candidate_hashes))]).encode()).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    def _remember(self, key: str, ranking: List[Tuple[str, float]]) -> None:
+        with self._lock:
+            self._local[key] = ranking
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[Tuple[str, float]]]:
+        with self._lock:
+            ranking = self._local.get(key)
+            if ranking is not None:
+                self._local.move_to_end(key)
+                return ranking
+        try:
+            client = self._get_client()
+            value = client.get(key) if client is not None else None
+        except Exception as e:
+            print(f"❌ Error fetching rerank result from Redis: {str(e)}")
+            return None
+        if value is None:
+            return None
+        ranking = [(content_hash, score) for content_hash, score in json.loads(value)]
+        self._remember(key, ranking)
+        return ranking
+
+    def set(self, key: str, ranking: List[Tuple[str, float]]) -> None:
+        self._remember(key, ranking)
+        try:
+            client = self._get_client()
+            if client is not None:
+                client.setex(key, self.expiry_seconds, json.dumps(ranking))
+        except Exception as e:
+            print(f"❌ Error storing rerank result in Redis: {str(e)}")
+
+
+# Create a global instance (None when rerank caching is disabled)
+rerank_cache = RerankCache(
+    settings.REDIS_URL if settings.RERANK_CACHE_REDIS_ENABLED else None,
+    settings.RERANK_CACHE_EXPIRY_SECONDS,
+    max_entries=settings.RERANK_CACHE_MAX_ENTRIES,
+) if settings.RERANK_CACHE_ENABLED else None
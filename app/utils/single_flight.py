@@ -0,0 +1,93 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from uuid import uuid4
+
+from app.core import settings
+from app.utils.redis_client import AsyncRedisClient, redis_client
+
+T = TypeVar("T")
+
+# Delete the lock only if we still own it, so an expired lock re-acquired by another worker is left alone
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Process-local request coalescing: concurrent loads of the same key share one in-flight call.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one cancelled request does not cancel the load the others are waiting on
+        return await asyncio.shield(task)
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+
+class RedisSingleFlight:
+    """
+    Cross-worker request coalescing with a Redis lock per key.
+
+    The lock holder runs the loader (which is expected to write the result to Redis); other workers poll
+    ``probe`` until the value shows up, and load it themselves only if the holder does not finish within
+    ``wait_timeout`` seconds. Redis errors degrade to a direct load.
+    """
+
+    def __init__(self, redis: AsyncRedisClient, lock_timeout: float, wait_timeout: float,
+                 poll_interval: float = 0.1, prefix: str = "lock"):
+        self.redis = redis
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[T]],
+                 probe: Callable[[], Awaitable[Optional[T]]]) -> T:
+        lock_key = f"{self.prefix}:{key}"
+        token = uuid4().hex
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        while True:
+            try:
+                acquired = await self.redis.client.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000))
+            except Exception as e:
+                print(f"❌ Error acquiring Redis lock for {key}: {str(e)}")
+                return await loader()
+
+            if acquired:
+                try:
+                    return await loader()
+                finally:
+                    try:
+                        await self.redis.client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                    except Exception as e:
+                        print(f"❌ Error releasing Redis lock for {key}: {str(e)}")
+
+            value = await probe()
+            if value is not None:
+                return value
+            if loop.time() >= deadline:
+                return await loader()
+            await asyncio.sleep(self.poll_interval)
+
+
+# Create global instances for prompt template loading
+template_flight = SingleFlight()
+template_redis_flight = RedisSingleFlight(
+    redis_client,
+    lock_timeout=settings.TEMPLATE_LOCK_TIMEOUT_SECONDS,
+    wait_timeout=settings.TEMPLATE_LOCK_WAIT_SECONDS,
+)
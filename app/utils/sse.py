@@ -0,0 +1,179 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi.responses import StreamingResponse
+from phi.utils.log import logger
+
+from app.core import settings
+
+_END = object()
+
+
+class _StreamError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def format_sse(data: str, event: Optional[str] = None) -> str:
+    """
+    Frame one Server-Sent Event. Multi-line payloads become one ``data:`` line per line, as the spec
+    requires.
+    """
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+class SSEMetrics:
+    """
+    Per-stream-name latency stats: time to first event and the gaps between flushed events.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, ttfb: Optional[float], gaps: List[float], events: int, flushes: int) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                "streams": 0, "events": 0, "flushes": 0, "ttfb_total": 0.0, "ttfb_max": 0.0,
+                "gap_total": 0.0, "gap_count": 0, "gap_max": 0.0,
+            })
+            stats["streams"] += 1
+            stats["events"] += events
+            stats["flushes"] += flushes
+            if ttfb is not None:
+                stats["ttfb_total"] += ttfb
+                stats["ttfb_max"] = max(stats["ttfb_max"], ttfb)
+            if gaps:
+                stats["gap_total"] += sum(gaps)
+                stats["gap_count"] += len(gaps)
+                stats["gap_max"] = max(stats["gap_max"], max(gaps))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {
+                    "streams": stats["streams"],
+                    "events": stats["events"],
+                    "flushes": stats["flushes"],
+                    "ttfb_avg": stats["ttfb_total"] / stats["streams"] if stats["streams"] else 0.0,
+                    "ttfb_max": stats["ttfb_max"],
+                    "inter_event_avg": stats["gap_total"] / stats["gap_count"] if stats["gap_count"] else 0.0,
+                    "inter_event_max": stats["gap_max"],
+                }
+                for name, stats in self._stats.items()
+            }
+
+
+class SSEWriter:
+    """
+    Turn an async iterator of payload strings into a framed Server-Sent Events stream.
+
+    Each payload is framed exactly once. The first event is flushed immediately; later events are
+    coalesced until ``flush_interval`` seconds have passed since the first buffered one or
+    ``flush_bytes`` are buffered. A ``: keep-alive`` comment is sent after ``heartbeat_interval`` idle
+    seconds so proxies do not drop slow streams. An error from the source ends the stream with an
+    ``error`` event. Time to first event and inter-event gaps are logged and recorded in ``metrics``.
+    """
+
+    def __init__(self, source: AsyncIterator[str], name: str, metrics: Optional[SSEMetrics] = None,
+                 flush_interval: float = settings.SSE_FLUSH_INTERVAL_MS / 1000,
+                 flush_bytes: int = settings.SSE_FLUSH_BYTES,
+                 heartbeat_interval: float = settings.SSE_HEARTBEAT_SECONDS):
+        self.source = source
+        self.name = name
+        self.metrics = metrics
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.heartbeat_interval = heartbeat_interval
+        self.started = time.monotonic()
+
+    async def _pump(self, queue: asyncio.Queue) -> None:
+        try:
+            async for payload in self.source:
+                await queue.put(payload)
+            await queue.put(_END)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(_StreamError(e))
+
+    async def events(self) -> AsyncIterator[str]:
+        # Small bound: the source keeps producing while a flush is written, but never runs far ahead
+        queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+        pump = asyncio.create_task(self._pump(queue))
+        buffer: List[str] = []
+        buffered_bytes = 0
+        flush_at: Optional[float] = None
+        ttfb: Optional[float] = None
+        last_flush: Optional[float] = None
+        gaps: List[float] = []
+        events = flushes = 0
+
+        def flush() -> str:
+            nonlocal buffered_bytes, flush_at, ttfb, last_flush, flushes
+            now = time.monotonic()
+            if ttfb is None:
+                ttfb = now - self.started
+            if last_flush is not None:
+                gaps.append(now - last_flush)
+            last_flush = now
+            flushes += 1
+            data = "".join(buffer)
+            buffer.clear()
+            buffered_bytes = 0
+            flush_at = None
+            return data
+
+        try:
+            while True:
+                now = time.monotonic()
+                timeout = flush_at - now if flush_at is not None else self.heartbeat_interval
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=max(timeout, 0))
+                except asyncio.TimeoutError:
+                    yield flush() if buffer else ": keep-alive\n\n"
+                    continue
+
+                if item is _END:
+                    if buffer:
+                        yield flush()
+                    return
+                if isinstance(item, _StreamError):
+                    logger.error(f"Stream {self.name} failed: {str(item.error)}")
+                    buffer.append(format_sse(json.dumps({"error": str(item.error)}), event="error"))
+                    yield flush()
+                    return
+
+                frame = format_sse(item)
+                buffer.append(frame)
+                buffered_bytes += len(frame)
+                events += 1
+                if flush_at is None:
+                    flush_at = time.monotonic() + self.flush_interval
+                if ttfb is None or buffered_bytes >= self.flush_bytes or self.flush_interval <= 0:
+                    yield flush()
+        finally:
+            pump.cancel()
+            if self.metrics is not None:
+                self.metrics.record(self.name, ttfb, gaps, events, flushes)
+            logger.info(f"SSE {self.name}: {events} events in {flushes} flushes, "
+                        f"ttfb {ttfb if ttfb is None else round(ttfb, 3)}s, "
+                        f"max gap {round(max(gaps), 3) if gaps else 0}s")
+
+
+def sse_response(source: AsyncIterator[str], name: str) -> StreamingResponse:
+    """
+    Wrap an async iterator of payload strings in a ``text/event-stream`` StreamingResponse.
+    """
+    return StreamingResponse(SSEWriter(source, name, metrics=sse_metrics).events(),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# Create a global instance
+sse_metrics = SSEMetrics()
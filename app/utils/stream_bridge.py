@@ -0,0 +1,79 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import threading
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+
+from app.core import settings
+
+T = TypeVar("T")
+
+# Dedicated pool so long-running streams never starve asyncio.to_thread work (DB queries, Drive calls)
+_stream_executor = ThreadPoolExecutor(max_workers=settings.STREAM_WORKER_THREADS, thread_name_prefix="stream")
+_END = object()
+
+
+class _StreamError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def iterate_in_thread(make_iterator: Callable[[], Iterator[T]],
+                            max_buffer: int = settings.STREAM_QUEUE_SIZE) -> AsyncIterator[T]:
+    """
+    Drive a blocking iterator (e.g. phi's ``agent.run(..., stream=True)``) on a worker thread and yield
+    its items on the event loop.
+
+    Items pass through a bounded asyncio queue: when the consumer falls behind, the worker blocks on the
+    full queue instead of buffering the whole response. When the consumer stops early (client
+    disconnect, cancellation) the worker stops pulling and closes the iterator, which releases the
+    upstream HTTP stream. Exceptions raised by the iterator are re-raised to the consumer.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=0.5)
+                return True
+            except FutureTimeoutError:
+                if stopped.is_set():
+                    future.cancel()
+                    return False
+
+    def produce():
+        iterator = None
+        try:
+            iterator = make_iterator()
+            for item in iterator:
+                if stopped.is_set() or not put(item):
+                    return
+            put(_END)
+        except BaseException as e:
+            if not stopped.is_set():
+                put(_StreamError(e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+
+    # Run with the caller's context so context vars (e.g. the logged-in user) are visible to the agent
+    context = contextvars.copy_context()
+    loop.run_in_executor(_stream_executor, context.run, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, _StreamError):
+                raise item.error
+            yield item
+    finally:
+        # Not awaited: the worker may be blocked on the network until the next chunk arrives
+        stopped.set()
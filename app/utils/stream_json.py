@@ -0,0 +1,151 @@
+import json
+import re
+from typing import Any, List
+
+from phi.utils.log import logger
+
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser for streamed agent output of the form ``{"response": [ {...}, {...} ]}``.
+
+    Chunks are fed as they arrive and every element of the first JSON array is returned as soon as it
+    closes, so the caller can forward it without waiting for the whole response. Braces and brackets
+    inside JSON strings (including escaped quotes) are ignored, chunk boundaries may fall anywhere, and
+    an element is joined from its chunk slices once, when it completes. Anything after the array closes
+    is ignored. Elements that fail to decode are logged and counted in ``malformed``.
+    """
+
+    _BEFORE_ARRAY = re.compile(r'["\[]')
+    _IN_STRING = re.compile(r'["\\]')
+    _IN_CONTAINER = re.compile(r'["\[\]{}]')
+    _SCALAR_END = re.compile(r'[\s,\]]')
+    _WHITESPACE = " \t\r\n"
+
+    def __init__(self):
+        self.in_array = False
+        self.done = False
+        self.malformed = 0
+        self._in_string = False
+        self._escape = False
+        self._in_element = False
+        self._scalar = False
+        self._depth = 0
+        self._parts: List[str] = []
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        Consume the next chunk of output and return the array elements it completed.
+        """
+        items: List[Any] = []
+        pos, end = 0, len(text)
+        start = 0  # where the current element begins in this chunk
+        if self._escape and end:
+            self._escape = False
+            pos = 1
+
+        while pos < end and not self.done:
+            if self._in_string:
+                match = self._IN_STRING.search(text, pos)
+                if match is None:
+                    pos = end
+                elif match.group() == "\\":
+                    pos = match.start() + 2
+                    if pos > end:
+                        self._escape = True
+                else:
+                    self._in_string = False
+                    pos = match.end()
+                    if self._in_element and self._depth == 0:
+                        self._emit(items, text[start:pos])
+                continue
+
+            if not self.in_array:
+                match = self._BEFORE_ARRAY.search(text, pos)
+                if match is None:
+                    break
+                pos = match.end()
+                if match.group() == '"':
+                    self._in_string = True
+                else:
+                    self.in_array = True
+                continue
+
+            if not self._in_element:
+                char = text[pos]
+                if char in self._WHITESPACE or char == ",":
+                    pos += 1
+                    continue
+                if char == "]":
+                    self.done = True
+                    break
+                self._in_element = True
+                start = pos
+                pos += 1
+                if char in "{[":
+                    self._depth = 1
+                elif char == '"':
+                    self._in_string = True
+                else:
+                    self._scalar = True
+                continue
+
+            if self._scalar:
+                match = self._SCALAR_END.search(text, pos)
+                if match is None:
+                    pos = end
+                else:
+                    # Leave the delimiter for the array level to consume
+                    pos = match.start()
+                    self._emit(items, text[start:pos])
+                continue
+
+            match = self._IN_CONTAINER.search(text, pos)
+            if match is None:
+                pos = end
+                continue
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(items, text[start:pos])
+
+        if self._in_element:
+            self._parts.append(text[start:])
+        return items
+
+    def close(self) -> List[Any]:
+        """
+        Signal the end of the stream; returns a trailing scalar element if one was still open.
+        """
+        items: List[Any] = []
+        if self._in_element:
+            if self._scalar:
+                self._emit(items, "")
+            else:
+                self.malformed += 1
+                logger.warning(f"Stream ended inside a JSON array element: {''.join(self._parts)[:200]}")
+                self._reset_element()
+        self.done = True
+        return items
+
+    def _emit(self, items: List[Any], tail: str) -> None:
+        self._parts.append(tail)
+        raw = "".join(self._parts)
+        self._reset_element()
+        try:
+            items.append(json.loads(raw))
+        except json.JSONDecodeError as e:
+            self.malformed += 1
+            logger.warning(f"Skipping malformed JSON array element ({str(e)}): {raw[:200]}")
+
+    def _reset_element(self) -> None:
+        self._parts = []
+        self._in_element = False
+        self._scalar = False
+        self._depth = 0
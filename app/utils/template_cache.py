@@ -0,0 +1,212 @@
+import asyncio
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core import settings
+from app.utils.redis_client import AsyncRedisClient, redis_client
+
+
+class TemplateCache:
+    """
+    Process-local cache of prompt templates (instructions, commands, agent config) in front of Redis.
+
+    Hot-path reads are plain dictionary lookups. Every write bumps a global version in Redis and publishes
+    the changed keys on a pub/sub channel; each process listens and drops those keys locally. A value
+    read while an invalidation was in flight is returned but not cached, and a version mismatch after a
+    listener reconnect clears the whole cache, so missed messages cannot leave stale templates behind.
+
+    Every write also keeps a long-lived ``<key>:stale`` copy that loaders can serve while revalidating
+    after the primary key expires.
+    """
+
+    VERSION_KEY = "templates:version"
+    CHANNEL = "templates:invalidate"
+    STALE_SUFFIX = ":stale"
+    SOURCE_VERSIONS_KEY = "templates:drive_versions"
+
+    def __init__(self, redis: AsyncRedisClient, ttl_seconds: int, stale_expiry_seconds: int):
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.stale_expiry_seconds = stale_expiry_seconds
+        self.version = 0
+        self._values: Dict[str, Tuple[str, float]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    # -------------------- Reads / writes --------------------
+
+    def get_local(self, key: str) -> Optional[str]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, loaded_at = entry
+        # TTL is only a safety net for a dead listener; invalidation normally evicts first
+        if time.monotonic() - loaded_at > self.ttl_seconds:
+            self._values.pop(key, None)
+            return None
+        return value
+
+    def put_local(self, key: str, value: str, version: int) -> None:
+        if value is not None and version == self.version:
+            self._values[key] = (value, time.monotonic())
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """
+        Return a template from the local cache, falling back to Redis on a miss.
+        """
+        value = self.get_local(key)
+        if value is not None:
+            return value
+        version = self.version
+        value = await self.redis.get_value_async(key)
+        self.put_local(key, value, version)
+        return value
+
+    async def set_async(self, key: str, value: str) -> None:
+        """
+        Write a template to Redis and invalidate it in every process.
+        """
+        await self.set_many_async({key: value})
+
+    async def get_many_async(self, keys: Iterable[str]) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Return templates from the local cache, fetching all local misses with one MGET.
+        Returns:
+            Tuple[Dict[str, str], List[str]]: The templates found, and the keys missing from Redis too.
+        """
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        for key in keys:
+            value = self.get_local(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+        if missing:
+            version = self.version
+            values, missing = await self.redis.get_many_async(missing)
+            for key, value in values.items():
+                self.put_local(key, value, version)
+            found.update(values)
+        return found, missing
+
+    async def set_many_async(self, values: Dict[str, str], source_versions: Optional[Dict[str, str]] = None) -> None:
+        """
+        Write several templates (with their stale copies and, optionally, the Drive versions they were
+        read from) in one pipeline and invalidate them everywhere with one message.
+        """
+        if not values:
+            return
+        try:
+            pipe = self.redis.client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipe.setex(key, self.redis.CACHE_EXPIRY_SECONDS, value)
+                pipe.setex(f"{key}{self.STALE_SUFFIX}", self.stale_expiry_seconds, value)
+            if source_versions:
+                pipe.hset(self.SOURCE_VERSIONS_KEY, mapping=source_versions)
+            await pipe.execute()
+        except Exception as e:
+            print(f"❌ Error setting templates in Redis: {str(e)}")
+        await self.publish_invalidation(values.keys())
+        for key, value in values.items():
+            self.put_local(key, value, self.version)
+
+    async def get_sync_state_async(self, keys: List[str]) -> Tuple[Dict[str, str], set]:
+        """
+        Return the stored Drive version of each key and the set of keys currently present in Redis,
+        in one pipeline.
+        """
+        if not keys:
+            return {}, set()
+        pipe = self.redis.client.pipeline(transaction=False)
+        pipe.hmget(self.SOURCE_VERSIONS_KEY, keys)
+        for key in keys:
+            pipe.exists(key)
+        versions, *exists = await pipe.execute()
+        return ({key: version for key, version in zip(keys, versions) if version},
+                {key for key, present in zip(keys, exists) if present})
+
+    async def get_stale_many_async(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Fetch the last written copies of ``keys`` with one MGET, for stale-while-revalidate.
+        """
+        keys = list(keys)
+        values, _ = await self.redis.get_many_async([f"{key}{self.STALE_SUFFIX}" for key in keys])
+        return {key: values[f"{key}{self.STALE_SUFFIX}"] for key in keys if f"{key}{self.STALE_SUFFIX}" in values}
+
+    # -------------------- Invalidation --------------------
+
+    def invalidate_local(self, keys: Optional[Iterable[str]] = None) -> None:
+        if keys is None:
+            self._values.clear()
+        else:
+            for key in keys:
+                self._values.pop(key, None)
+
+    def _apply_invalidation(self, version: int, keys: Optional[Iterable[str]]) -> None:
+        self.version = max(self.version + 1, version)
+        self.invalidate_local(keys)
+
+    async def publish_invalidation(self, keys: Optional[Iterable[str]] = None) -> None:
+        """
+        Bump the template version and tell every process to drop ``keys`` (all templates when None).
+        """
+        keys = list(keys) if keys is not None else None
+        try:
+            version = await self.redis.client.incr(self.VERSION_KEY)
+            self._apply_invalidation(version, keys)
+            await self.redis.client.publish(self.CHANNEL, json.dumps({"version": version, "keys": keys}))
+        except Exception as e:
+            # Still drop our own copy so this process never serves what it just replaced
+            self._apply_invalidation(self.version, keys)
+            print(f"❌ Error publishing template invalidation: {str(e)}")
+
+    async def _sync_version(self) -> None:
+        remote = int(await self.redis.client.get(self.VERSION_KEY) or 0)
+        if remote != self.version:
+            self._apply_invalidation(remote, None)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.redis.client.pubsub()
+                await pubsub.subscribe(self.CHANNEL)
+                # Anything published while we were not subscribed is caught by the version check
+                await self._sync_version()
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    self._apply_invalidation(int(payload.get("version", 0)), payload.get("keys"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Template cache listener error, reconnecting: {str(e)}")
+                self.invalidate_local()
+                await asyncio.sleep(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self.invalidate_local()
+
+
+# Create a global instance
+template_cache = TemplateCache(redis_client, settings.TEMPLATE_CACHE_TTL_SECONDS,
+                               settings.TEMPLATE_STALE_EXPIRY_SECONDS)
@@ -54,7 +54,7 @@
 #     )
 
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.responses import FileResponse
 import os
 from fastapi.middleware.cors import CORSMiddleware
@@ -63,6 +63,10 @@ from app.core import settings
 from app.core import lifespan
 from app.api.router import api_router
 from app.core import register_exception_handlers
+from app.api.deps import require_auth
+from app.utils import memory_profiler, sse_metrics, openai_models, agent_manager, query_embedding_cache
+from app.utils.agent_templates import agent_templates
+from app.services.storage_cache import tenant_registry
 
 ALLOWED_ORIGINS = settings.ALLOWED_ORIGINS.split(",")
 
@@ -94,3 +98,38 @@ if not os.path.exists(TEMP_FOLDER):
 @app.get("/", response_class=FileResponse, include_in_schema=False)
 async def root():
     return FileResponse(HTML_FILE_PATH)
+
+
+# Memory instrumentation, only exposed when MEMORY_PROFILING_ENABLED is set
+if memory_profiler.enabled:
+    @app.get("/debug/memory", dependencies=[Depends(require_auth)], include_in_schema=False)
+    async def debug_memory():
+        return memory_profiler.stats()
+
+
+# Streaming latency (time to first event, inter-event gaps) per request type
+@app.get("/debug/streams", dependencies=[Depends(require_auth)], include_in_schema=False)
+async def debug_streams():
+    return sse_metrics.stats()
+
+
+# Shared OpenAI models, connection reuse and pool utilization
+@app.get("/debug/openai", dependencies=[Depends(require_auth)], include_in_schema=False)
+async def debug_openai():
+    return openai_models.stats()
+
+
+# Agent template builds vs per-request clones
+@app.get("/debug/agents", dependencies=[Depends(require_auth)], include_in_schema=False)
+async def debug_agents():
+    return {"templates": agent_templates.stats(), "utility_agents": agent_manager.stats()}
+
+
+# Cached tenant storage/memory/vector DB objects (size, hit rate, engine pool connections) and the shared
+# query embedding cache (LRU and Redis hits, misses)
+@app.get("/debug/tenants", dependencies=[Depends(require_auth)], include_in_schema=False)
+async def debug_tenants():
+    return {
+        "registry": tenant_registry.stats(),
+        "query_embeddings": query_embedding_cache.stats() if query_embedding_cache is not None else None,
+    }